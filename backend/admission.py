@@ -0,0 +1,187 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    def __init__(self, user: str, cost: int):
+        self.user = user
+        self.cost = cost
+        self.small = False
+        self.granted = threading.Event()
+
+
+class AdmissionController:
+    """
+    Per-worker admission control for analysis requests.
+    A request's cost is its code length. Requests are admitted while both the
+    concurrency limit and the in-flight cost budget allow it; otherwise they wait
+    in a per-user queue that is served round-robin, so one user bulk-submitting
+    large files cannot starve everyone else. Small requests skip the cost budget
+    and have one concurrency slot reserved for them.
+    """
+
+    def __init__(self, max_concurrency: int, cost_budget: int, small_cost: int,
+                 max_queue: int, max_wait: float):
+        self.max_concurrency = max_concurrency
+        self.cost_budget = cost_budget
+        self.small_cost = small_cost
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.max_user_queue = max(1, max_queue // 4)
+        self.large_concurrency = max(1, max_concurrency - 1)
+
+        self._lock = threading.Lock()
+        self._queues: "OrderedDict[str, Deque[_Ticket]]" = OrderedDict()
+        self._queued = 0
+        self._queued_cost = 0
+        self._in_flight = 0
+        self._in_flight_cost = 0
+        self._in_flight_large = 0
+
+        # Observed throughput in characters per second, used for Retry-After
+        self._throughput = 0.0
+
+        self.admitted_total = 0
+        self.shed_total = 0
+        self.shed_by_reason: Dict[str, int] = {}
+
+    def _fits(self, ticket: _Ticket) -> bool:
+        if self._in_flight >= self.max_concurrency:
+            return False
+        if ticket.small:
+            return True
+        if self._in_flight_large >= self.large_concurrency:
+            return False
+        if self._in_flight == 0:
+            return True
+        return self._in_flight_cost + ticket.cost <= self.cost_budget
+
+    def _grant(self, ticket: _Ticket):
+        self._in_flight += 1
+        self._in_flight_cost += ticket.cost
+        if not ticket.small:
+            self._in_flight_large += 1
+        self.admitted_total += 1
+        ticket.granted.set()
+
+    def _dispatch(self):
+        """Grant queued tickets round-robin across users while capacity allows"""
+        progressed = True
+        while progressed and self._queues and self._in_flight < self.max_concurrency:
+            progressed = False
+            for user in list(self._queues):
+                queue = self._queues[user]
+                ticket = queue[0]
+                if not self._fits(ticket):
+                    continue
+                queue.popleft()
+                self._queued -= 1
+                self._queued_cost -= ticket.cost
+                # Move the user to the back so the next grant goes to someone else
+                del self._queues[user]
+                if queue:
+                    self._queues[user] = queue
+                self._grant(ticket)
+                progressed = True
+                break
+
+    def _retry_after(self) -> int:
+        if self._throughput <= 0:
+            return 1
+        backlog = self._queued_cost + self._in_flight_cost
+        return max(1, math.ceil(backlog / self._throughput))
+
+    def _shed(self, reason: str) -> AdmissionRejected:
+        self.shed_total += 1
+        self.shed_by_reason[reason] = self.shed_by_reason.get(reason, 0) + 1
+        return AdmissionRejected(reason, self._retry_after())
+
+    def acquire(self, user: str, cost: int) -> _Ticket:
+        ticket = _Ticket(user, cost)
+        ticket.small = cost <= self.small_cost
+
+        with self._lock:
+            if (ticket.small or not self._queued) and self._fits(ticket):
+                self._grant(ticket)
+                return ticket
+            if self._queued >= self.max_queue:
+                raise self._shed("queue_full")
+            queue = self._queues.setdefault(user, deque())
+            if len(queue) >= self.max_user_queue:
+                raise self._shed("user_queue_full")
+            queue.append(ticket)
+            self._queued += 1
+            self._queued_cost += cost
+            self._dispatch()
+
+        if ticket.granted.wait(self.max_wait):
+            return ticket
+
+        with self._lock:
+            # The grant may have raced with the timeout
+            if ticket.granted.is_set():
+                return ticket
+            queue = self._queues.get(user)
+            if queue is not None:
+                queue.remove(ticket)
+                if not queue:
+                    del self._queues[user]
+            self._queued -= 1
+            self._queued_cost -= cost
+            raise self._shed("queue_timeout")
+
+    def release(self, ticket: _Ticket, elapsed: float):
+        with self._lock:
+            self._in_flight -= 1
+            self._in_flight_cost -= ticket.cost
+            if not ticket.small:
+                self._in_flight_large -= 1
+            if elapsed > 0 and ticket.cost:
+                rate = ticket.cost / elapsed
+                self._throughput = rate if not self._throughput else 0.8 * self._throughput + 0.2 * rate
+            self._dispatch()
+
+    def admit(self, user: str, cost: int) -> "_Admission":
+        return _Admission(self, user, cost)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "queue_depth": self._queued,
+                "queued_cost": self._queued_cost,
+                "queued_users": len(self._queues),
+                "in_flight": self._in_flight,
+                "in_flight_cost": self._in_flight_cost,
+                "admitted_total": self.admitted_total,
+                "shed_total": self.shed_total,
+                "shed_by_reason": dict(self.shed_by_reason),
+                "throughput_chars_per_sec": round(self._throughput, 1)
+            }
+
+
+class _Admission:
+    def __init__(self, controller: AdmissionController, user: str, cost: int):
+        self.controller = controller
+        self.user = user
+        self.cost = cost
+        self.ticket: Optional[_Ticket] = None
+        self.started = 0.0
+
+    def __enter__(self):
+        self.ticket = self.controller.acquire(self.user, self.cost)
+        self.started = time.monotonic()
+        return self.ticket
+
+    def __exit__(self, exc_type, exc, tb):
+        self.controller.release(self.ticket, time.monotonic() - self.started)
+        return False
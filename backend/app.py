@@ -1,10 +1,35 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
 import os
+import json
+import atexit
+import hashlib
+import time
 from datetime import datetime, timezone
+from urllib.parse import quote
 from lexical_analyzer import LexicalAnalyzer
+from bulk_lexer import BulkLexicalAnalyzer, numpy_available
 from syntax_analyzer import SyntaxAnalyzer
-from typing import Dict
+from semantic_analyzer import SemanticAnalyzer
+from admission import AdmissionController, AdmissionRejected
+from memory_budget import MemoryAccountant, MemoryBudgetExceeded, RequestBudget
+from traffic_capture import TrafficCapture
+from tracing import Tracer, Trace, Span, NO_TRACE, NO_SPAN
+from live import LiveChannel, SessionLimitReached
+from project import ProjectRegistry, ProjectTooLarge
+from lint import LintEngine
+from xref import XrefIndex, XrefCache
+from similarity import SimilarityIndex
+from soop_compiler import CompileCache, CompileError
+from sandbox import SandboxPool
+from java_transpiler import JavaTranspiler, BlockCache, TranspileError
+import report_export
+from static_assets import StaticAssets
+from warmup import warm_up
+from error import AnalysisCancelled, SyntaxError, SyntaxErrorType
+from typing import Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")  # Response type built by analyze_request's respond callback
 
 # Initialize Flask application
 app = Flask(__name__)
@@ -16,6 +41,10 @@ class Config:
     FRONTEND_FOLDER = os.path.join(os.getcwd(), "..", "frontend")
     DIST_FOLDER = os.path.join(FRONTEND_FOLDER, "dist")
     
+    # Static assets (indexed from DIST_FOLDER at startup)
+    STATIC_MEMORY_LIMIT = 1024 * 1024  # Files up to this size are served from memory
+    STATIC_COMPRESS_MIN_SIZE = 1024  # Smaller files get no gzip/brotli variant
+    
     # Server settings
     DEBUG = True
     HOST = '0.0.0.0'
@@ -23,16 +52,162 @@ class Config:
     
     # Analysis settings
     MAX_CODE_LENGTH = 1000000  # Maximum code length in characters
+    PARSE_DEADLINE = 2.0  # Seconds the syntax analyzer may spend on one request
+    BULK_LEXING_THRESHOLD = 100000  # Use the NumPy bulk lexer from this length (if numpy is installed); below it lexing takes under 0.1 s
+    
+    # Admission control (per worker process)
+    ADMISSION_MAX_CONCURRENCY = 4  # Analyses running at once
+    ADMISSION_COST_BUDGET = 2000000  # Total characters being analyzed at once
+    ADMISSION_SMALL_COST = 20000  # Requests up to this size skip the cost budget
+    ADMISSION_MAX_QUEUE = 64  # Waiting requests before shedding
+    ADMISSION_MAX_WAIT = 5.0  # Seconds a request may wait before shedding
+    
+    # asyncio serving path (asgi.py)
+    ASGI_MAX_STREAMS = 32  # /export downloads being streamed at once, apart from the analysis slots
+    
+    # Memory budget (per analysis, estimated from the token count)
+    MEMORY_BUDGET = 384 * 1024 * 1024  # Bytes one analysis may use including its response (0 disables)
+    MEMORY_TRACEMALLOC_SAMPLE_RATE = 0.0  # Fraction of analyses also measured with tracemalloc
+    
+    # Lint rules (findings are returned under 'lint' and do not affect status)
+    LINT_ENABLED = True
+    LINT_DISABLED_RULES = []  # Rule names to switch off, e.g. ["long-method"]
+    LINT_MAX_METHOD_LINES = 30
+    
+    # Cross-reference index
+    XREF_CACHE_SIZE = 64  # Indexes kept for /xref lookups
+    
+    # Multi-file projects
+    PROJECT_WORKERS = 0  # Processes analyzing the modules of one wave (0 analyzes them in the request thread)
+    PROJECT_CACHE_SIZE = 32  # Projects kept for incremental re-analysis
+    PROJECT_PARSE_DEADLINE = 2.0  # Seconds the parser may spend on one module
+    PROJECT_MAX_MODULES = 200  # Modules one project may hold
+    PROJECT_MAX_SIZE = 2000000  # Characters of all modules of one project together
+    
+    # Near-duplicate detection (/similarity)
+    SIMILARITY_INDEX = "similarity.sqlite3"  # Fingerprint index shared by all workers
+    SIMILARITY_MAX_CANDIDATES = 10
+    SIMILARITY_MIN_SCORE = 0.3  # Shared fraction of fingerprints from which a submission is reported
+    
+    # Program execution (/execute)
+    EXECUTION_WORKERS = 2  # Sandbox processes per worker
+    EXECUTION_MEMORY_LIMIT = 128 * 1024 * 1024  # Bytes of address space a program may add
+    EXECUTION_TIME_LIMIT = 2.0  # Wall-clock seconds per run
+    EXECUTION_STEP_LIMIT = 1000000  # Loop iterations plus function calls per run
+    EXECUTION_OUTPUT_LIMIT = 65536  # Characters a run may print
+    EXECUTION_MAX_INPUTS = 50  # Input sets per request
+    EXECUTION_CACHE_SIZE = 256  # Compiled programs kept
+    EXECUTION_MAX_CONCURRENCY = 4  # Requests running programs at once, apart from analysis admission
+    EXECUTION_MAX_QUEUE = 16  # Requests waiting to run programs before shedding
+    
+    # Java transpiler (/transpile)
+    TRANSPILE_CACHE_SIZE = 4096  # Translated top-level blocks kept
+    
+    # Live analysis channel
+    LIVE_DEBOUNCE = 0.3  # Seconds of quiet before a document version is analyzed
+    LIVE_SESSION_TIMEOUT = 300  # Seconds before an idle session is dropped
+    LIVE_MAX_SESSIONS = 256  # Open sessions per process; each one holds a thread
+    LIVE_MAX_SESSIONS_PER_USER = 4
+    
+    # Traffic capture for replay.py (opt-in; X-User is stored as a keyed hash)
+    CAPTURE_SAMPLE_RATE = 0.0  # Fraction of /analyze requests written to the capture
+    CAPTURE_FOLDER = "captures"
+    CAPTURE_SALT = ""  # Key for user pseudonyms; empty picks a random key per process
+    CAPTURE_MAX_BYTES = 256 * 1024 * 1024  # Uncompressed bytes per capture file
+    CAPTURE_MAX_FILES = 20  # Capture files of earlier worker processes kept
+    
+    # Request tracing (OTLP JSON lines, one file per worker; both 0 disables)
+    TRACE_SAMPLE_RATE = 0.0  # Fraction of /analyze requests traced regardless of latency
+    TRACE_SLOW_THRESHOLD = 0.0  # Seconds from which a request is always traced
+    TRACE_FOLDER = "traces"
+    TRACE_MAX_BYTES = 64 * 1024 * 1024  # Size at which the trace file is rotated
+    TRACE_BACKUPS = 3  # Rotated trace files kept
+    TRACE_MAX_FILES = 20  # Trace files of earlier worker processes kept
     
     # Logging
     LOG_FOLDER = "logs"
-    LOG_FILE = f"soop_analyzer_{datetime.now().strftime('%Y%m%d')}.log"
+    LOG_FILE_PATTERN = "soop_analyzer_%Y%m%d.log"  # strftime pattern, one file per day
 
 app.config.from_object(Config)
 
-# Ensure log directory exists
-if not os.path.exists(Config.LOG_FOLDER):
-    os.makedirs(Config.LOG_FOLDER)
+# Frontend assets are answered from memory before requests reach Flask routing
+static_assets = StaticAssets(
+    Config.DIST_FOLDER,
+    memory_limit=Config.STATIC_MEMORY_LIMIT,
+    compress_min_size=Config.STATIC_COMPRESS_MIN_SIZE
+)
+app.wsgi_app = static_assets.wrap(app.wsgi_app)
+
+admission = AdmissionController(
+    max_concurrency=Config.ADMISSION_MAX_CONCURRENCY,
+    cost_budget=Config.ADMISSION_COST_BUDGET,
+    small_cost=Config.ADMISSION_SMALL_COST,
+    max_queue=Config.ADMISSION_MAX_QUEUE,
+    max_wait=Config.ADMISSION_MAX_WAIT
+)
+
+memory_accountant = MemoryAccountant(Config.MEMORY_BUDGET, Config.MEMORY_TRACEMALLOC_SAMPLE_RATE)
+
+traffic_capture = TrafficCapture(
+    Config.CAPTURE_FOLDER,
+    Config.CAPTURE_SAMPLE_RATE,
+    salt=Config.CAPTURE_SALT,
+    max_bytes=Config.CAPTURE_MAX_BYTES,
+    max_files=Config.CAPTURE_MAX_FILES
+)
+atexit.register(traffic_capture.close)
+
+tracer = Tracer(
+    Config.TRACE_FOLDER,
+    Config.TRACE_SAMPLE_RATE,
+    Config.TRACE_SLOW_THRESHOLD,
+    max_bytes=Config.TRACE_MAX_BYTES,
+    backups=Config.TRACE_BACKUPS,
+    max_files=Config.TRACE_MAX_FILES
+)
+atexit.register(tracer.close)
+
+lint_engine = LintEngine(
+    options={"max_method_lines": Config.LINT_MAX_METHOD_LINES},
+    disabled=Config.LINT_DISABLED_RULES
+)
+
+xref_cache = XrefCache(Config.XREF_CACHE_SIZE)
+
+projects = ProjectRegistry(
+    Config.PROJECT_CACHE_SIZE,
+    workers=Config.PROJECT_WORKERS,
+    deadline=Config.PROJECT_PARSE_DEADLINE,
+    max_modules=Config.PROJECT_MAX_MODULES,
+    max_size=Config.PROJECT_MAX_SIZE
+)
+
+similarity_index = SimilarityIndex(Config.SIMILARITY_INDEX)
+atexit.register(similarity_index.close)
+
+compile_cache = CompileCache(Config.EXECUTION_CACHE_SIZE)
+
+execution_admission = AdmissionController(
+    max_concurrency=Config.EXECUTION_MAX_CONCURRENCY,
+    cost_budget=Config.EXECUTION_WORKERS * Config.EXECUTION_MAX_INPUTS,
+    small_cost=1,
+    max_queue=Config.EXECUTION_MAX_QUEUE,
+    max_wait=Config.ADMISSION_MAX_WAIT
+)
+
+sandbox_pool = SandboxPool(
+    Config.EXECUTION_WORKERS,
+    memory_limit=Config.EXECUTION_MEMORY_LIMIT,
+    time_limit=Config.EXECUTION_TIME_LIMIT,
+    step_limit=Config.EXECUTION_STEP_LIMIT,
+    output_limit=Config.EXECUTION_OUTPUT_LIMIT
+)
+atexit.register(sandbox_pool.shutdown)
+
+java_transpiler = JavaTranspiler(BlockCache(Config.TRANSPILE_CACHE_SIZE))
+
+def log_file_path() -> str:
+    return os.path.join(Config.LOG_FOLDER, datetime.now().strftime(Config.LOG_FILE_PATTERN))
 
 def log_analysis(code: str, result: Dict, user: str):
     """Log analysis requests and results"""
@@ -46,18 +221,66 @@ Tokens Found: {len(result.get('tokens', []))}
 Errors Found: {len(result.get('errors', []))}
 ------------------------
 """
-    log_path = os.path.join(Config.LOG_FOLDER, Config.LOG_FILE)
-    with open(log_path, 'a') as log_file:
+    with open(log_file_path(), 'a') as log_file:
         log_file.write(log_entry)
 
-def connect_analyzers(code: str) -> Dict:
+def parse_with_deadline(tokens, cancel_check: Optional[Callable[[], bool]] = None) -> list:
     """
-    Connect lexical and syntax analyzers and process the code
+    Run the syntax analyzer for at most Config.PARSE_DEADLINE seconds
+    An expired deadline becomes a syntax error; cancel_check firing still raises AnalysisCancelled
+    """
+    stop = time.monotonic() + Config.PARSE_DEADLINE
+    def parse_check() -> bool:
+        return (cancel_check is not None and cancel_check()) or time.monotonic() > stop
+    try:
+        return SyntaxAnalyzer(tokens, parse_check).analyze()
+    except AnalysisCancelled:
+        if cancel_check is not None and cancel_check():
+            raise
+        return [SyntaxError(
+            SyntaxErrorType.INCOMPLETE_STATEMENT, 0, f"Syntax analysis stopped after {Config.PARSE_DEADLINE} seconds"
+        ).to_dict()]
+
+def make_lexer(code: str, cancel_check: Optional[Callable[[], bool]] = None,
+               budget: Optional[RequestBudget] = None) -> LexicalAnalyzer:
+    """The lexer for code's length; with a budget, lexing stops once the tokens so far exceed it"""
+    if numpy_available() and len(code) >= Config.BULK_LEXING_THRESHOLD:
+        lexical_analyzer = BulkLexicalAnalyzer(code, cancel_check)
+    else:
+        lexical_analyzer = LexicalAnalyzer(code, cancel_check)
+    if budget is not None:
+        def budget_check() -> bool:
+            # The lexers call this once per line, so the budget sees the token count grow
+            budget.check("lexical", lexical_analyzer.token_count())
+            return cancel_check() if cancel_check else False
+        lexical_analyzer.cancel_check = budget_check
+    return lexical_analyzer
+
+def lex_within_budget(code: str, budget: RequestBudget):
+    """Tokens and lexical errors of code, charged to budget"""
+    tokens, lexical_errors = make_lexer(code, budget=budget).tokenize()
+    budget.charge_tokens(len(tokens), "lexical")
+    budget.charge_errors(len(lexical_errors), "lexical")
+    return tokens, lexical_errors
+
+def connect_analyzers(code: str, cancel_check: Optional[Callable[[], bool]] = None,
+                      budget: Optional[RequestBudget] = None, trace: Trace = NO_TRACE) -> Dict:
+    """
+    Connect lexical, syntax and semantic analyzers and process the code
     Returns a dictionary containing tokens and errors
+    Raises MemoryBudgetExceeded once the analysis goes over its budget
+    Each analyzer runs in its own span of trace
     """
     try:
-        lexical_analyzer = LexicalAnalyzer(code)
-        tokens, lexical_errors = lexical_analyzer.tokenize()
+        lexical_analyzer = make_lexer(code, cancel_check, budget)
+        with trace.span("lex") as span:
+            tokens, lexical_errors = lexical_analyzer.tokenize()
+            span["lexer"] = type(lexical_analyzer).__name__
+            span["tokens.count"] = len(tokens)
+            span["errors.count"] = len(lexical_errors)
+        if budget is not None:
+            budget.charge_tokens(len(tokens), "lexical")
+            budget.charge_errors(len(lexical_errors), "lexical")
         
         if lexical_errors:
             return {
@@ -70,15 +293,30 @@ def connect_analyzers(code: str) -> Dict:
                 "status": "error"
             }
         
-        syntax_analyzer = SyntaxAnalyzer(tokens)
-        syntax_errors = syntax_analyzer.analyze()
+        with trace.span("parse") as span:
+            syntax_errors = parse_with_deadline(tokens, cancel_check)
+            span["errors.count"] = len(syntax_errors)
+        if budget is not None:
+            budget.charge_errors(len(syntax_errors), "syntax")
+        with trace.span("semantic") as span:
+            semantic_errors = SemanticAnalyzer(tokens).analyze()
+            span["errors.count"] = len(semantic_errors)
+        if budget is not None:
+            budget.charge_errors(len(semantic_errors), "semantic")
+        errors = syntax_errors + semantic_errors
         
-        return {
+        result = {
             "tokens": tokens,
-            "errors": syntax_errors,
-            "status": "success" if not syntax_errors else "error"
+            "errors": errors,
+            "status": "success" if not errors else "error"
         }
+        if Config.LINT_ENABLED:
+            with trace.span("lint"):
+                result["lint"] = lint_engine.run(tokens)
+        return result
         
+    except (AnalysisCancelled, MemoryBudgetExceeded):
+        raise
     except Exception as e:
         return {
             "tokens": [],
@@ -90,11 +328,64 @@ def connect_analyzers(code: str) -> Dict:
             "status": "error"
         }
 
+def run_live_analysis(user: str, code: str, cancel_check: Callable[[], bool]) -> Dict:
+    """Analyze one live document version under admission control"""
+    if len(code) > Config.MAX_CODE_LENGTH:
+        return {
+            "tokens": [],
+            "errors": [{
+                "type": "System Error",
+                "line": 0,
+                "message": f"Code exceeds maximum length of {Config.MAX_CODE_LENGTH} characters"
+            }],
+            "status": "error"
+        }
+    try:
+        with admission.admit(user, len(code)), memory_accountant.request() as budget:
+            result = connect_analyzers(code, cancel_check, budget)
+    except MemoryBudgetExceeded as e:
+        return {"tokens": [], "errors": [e.to_dict()], "status": "error"}
+    except AdmissionRejected as e:
+        return {
+            "tokens": [],
+            "errors": [{
+                "type": "System Error",
+                "line": 0,
+                "message": f"Server busy ({e.reason}), retry after {e.retry_after} seconds"
+            }],
+            "status": "busy"
+        }
+    log_analysis(code, result, user)
+    return result
+
+live_channel = LiveChannel(
+    analyze=run_live_analysis,
+    debounce=Config.LIVE_DEBOUNCE,
+    session_timeout=Config.LIVE_SESSION_TIMEOUT,
+    max_sessions=Config.LIVE_MAX_SESSIONS,
+    max_sessions_per_user=Config.LIVE_MAX_SESSIONS_PER_USER
+)
+
+def create_app(production: bool = False) -> Flask:
+    """
+    Process-level setup kept out of import time: the log folder and the
+    static asset index. In production mode debug is off and the analyzers
+    are warmed up, so a preloading server forks workers that are ready to
+    answer their first request at full speed.
+    """
+    os.makedirs(Config.LOG_FOLDER, exist_ok=True)
+    static_assets.index()
+    if production:
+        Config.DEBUG = False
+        app.config["DEBUG"] = False
+        warm_up(app, connect_analyzers)
+    return app
+
 # Routes
 @app.route("/", defaults={"filename": ""})
 @app.route("/<path:filename>")
 def serve_frontend(filename):
-    """Serve frontend files"""
+    """Serve frontend files that were not in the startup asset index"""
     if not filename:
         filename = "index.html"
     try:
@@ -111,36 +402,95 @@ def analyze():
     Analyze SOOP code
     Expects JSON with 'code' field containing the code to analyze
     """
+    trace = tracer.start("POST /analyze")
+    try:
+        with trace.root() as root:
+            response = app.make_response(analyze_request(
+                load_json_span(trace),
+                request.headers.get('X-User', 'anonymous'),
+                flask_response,
+                trace,
+                root
+            ))
+            root["http.status_code"] = response.status_code
+        return response
+    finally:
+        trace.finish()
+
+def flask_response(body: Dict, status: int, headers: Dict[str, str]):
+    return jsonify(body), status, headers
+
+def load_json_span(trace: Trace) -> Callable[[], object]:
+    def load():
+        with trace.span("request.get_json") as span:
+            data = request.get_json()
+            span["http.request.body.size"] = request.content_length or 0
+        return data
+    return load
+
+def analyze_request(load: Callable[[], object], user: str, respond: Callable[[Dict, int, Dict[str, str]], T],
+                    trace: Trace = NO_TRACE, root: Span = NO_SPAN) -> T:
+    """
+    Body of /analyze, shared by the Flask view and the asyncio path (asgi.py)
+    load() returns the parsed request body; respond(body, status, headers)
+    builds the response and is called inside the memory budget
+    """
     try:
         # Get request data
-        data = request.get_json()
+        data = load()
         
-        if not data or 'code' not in data:
-            return jsonify({
+        if not isinstance(data, dict) or not isinstance(data.get('code'), str):
+            return respond({
                 "error": "No code provided",
                 "message": "Request must include 'code' field"
-            }), 400
+            }, 400, {})
             
         code = data['code']
         
         # Validate code length
         if len(code) > Config.MAX_CODE_LENGTH:
-            return jsonify({
+            return respond({
                 "error": "Code too long",
                 "message": f"Code exceeds maximum length of {Config.MAX_CODE_LENGTH} characters"
-            }), 400
+            }, 400, {})
             
-        # Process the code
-        result = connect_analyzers(code)
+        traffic_capture.maybe_record(user, data)
+        root["code.length"] = len(code)
         
-        # Log the analysis
-        user = request.headers.get('X-User', 'anonymous')
-        log_analysis(code, result, user)
+        # Process the code once admitted; the budget covers building the response too
+        with admission.admit(user, len(code)), memory_accountant.request() as budget:
+            result = connect_analyzers(code, budget=budget, trace=trace)
+            root["tokens.count"] = len(result["tokens"])
+            root["errors.count"] = len(result["errors"])
+            
+            # Log the analysis
+            with trace.span("log"):
+                log_analysis(code, result, user)
+            
+            with trace.span("serialize"):
+                response = respond(result, 200, {})
+        return response
         
-        return jsonify(result)
+    except MemoryBudgetExceeded as e:
+        return respond({
+            "error": "Memory budget exceeded",
+            "message": str(e),
+            "stage": e.stage,
+            "estimated_bytes": e.used,
+            "limit_bytes": e.limit,
+            "measured": e.measured,
+            "tokens": [],
+            "errors": [e.to_dict()]
+        }, 413, {})
+        
+    except AdmissionRejected as e:
+        return respond({
+            "error": "Server busy",
+            "message": f"Analysis rejected ({e.reason}), retry after {e.retry_after} seconds"
+        }, 503, {'Retry-After': str(e.retry_after)})
         
     except Exception as e:
-        return jsonify({
+        return respond({
             "error": "Analysis failed",
             "message": str(e),
             "tokens": [],
@@ -149,15 +499,544 @@ def analyze():
                 "line": 0,
                 "message": f"Server error: {str(e)}"
             }]
+        }, 500, {})
+
+@app.route('/project/<name>', methods=['POST'])
+def analyze_project(name):
+    """
+    Analyze a multi-file SOOP project
+    Expects JSON with 'modules' (path -> code of new or changed modules) and
+    optionally 'removed' (paths); unchanged modules may be omitted after the
+    first request, only changed modules and their importers are re-analyzed
+    """
+    try:
+        data = request.get_json(silent=True)
+        modules = data.get('modules', {}) if isinstance(data, dict) else None
+        removed = data.get('removed', []) if isinstance(data, dict) else None
+        if not isinstance(modules, dict) or not isinstance(removed, list) or not (modules or removed):
+            return jsonify({
+                "error": "No modules provided",
+                "message": "Request must include a 'modules' object mapping paths to code, or a 'removed' list"
+            }), 400
+            
+        cost = sum(len(code) for code in modules.values() if isinstance(code, str))
+        if cost > Config.MAX_CODE_LENGTH or not all(isinstance(code, str) for code in modules.values()):
+            return jsonify({
+                "error": "Invalid modules",
+                "message": f"Module sources must be strings totalling at most {Config.MAX_CODE_LENGTH} characters"
+            }), 400
+            
+        user = request.headers.get('X-User', 'anonymous')
+        
+        with admission.admit(user, cost), memory_accountant.request() as budget:
+            result = projects.get(user, name).update(modules, removed)
+            budget.charge_tokens(result.pop("token_count"), "project")
+            budget.charge_errors(sum(len(module["errors"]) for module in result["modules"].values()), "project")
+        
+        result["project"] = name
+        result["status"] = "success" if all(
+            module["status"] == "success" for module in result["modules"].values()
+        ) else "error"
+        return jsonify(result)
+        
+    except ProjectTooLarge as e:
+        return jsonify({
+            "error": "Project too large",
+            "message": e.message
+        }), 413
+        
+    except MemoryBudgetExceeded as e:
+        return jsonify({
+            "error": "Memory budget exceeded",
+            "message": str(e),
+            "stage": e.stage
+        }), 413
+        
+    except AdmissionRejected as e:
+        response = jsonify({
+            "error": "Server busy",
+            "message": f"Analysis rejected ({e.reason}), retry after {e.retry_after} seconds"
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+        
+    except Exception as e:
+        return jsonify({
+            "error": "Analysis failed",
+            "message": str(e)
+        }), 500
+
+@app.route('/xref', methods=['POST'])
+def build_xref():
+    """
+    Build the cross-reference index of SOOP code
+    Expects JSON with 'code'; returns the index in its compact encoding plus an
+    'id' for follow-up lookups through GET /xref/<id>
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data.get('code'), str):
+            return jsonify({
+                "error": "No code provided",
+                "message": "Request must include 'code' field"
+            }), 400
+            
+        code = data['code']
+        if len(code) > Config.MAX_CODE_LENGTH:
+            return jsonify({
+                "error": "Code too long",
+                "message": f"Code exceeds maximum length of {Config.MAX_CODE_LENGTH} characters"
+            }), 400
+            
+        digest = hashlib.sha256(code.encode("utf-8", "surrogatepass")).hexdigest()
+        index = xref_cache.get(digest)
+        if index is None:
+            user = request.headers.get('X-User', 'anonymous')
+            with admission.admit(user, len(code)), memory_accountant.request() as budget:
+                tokens, _ = lex_within_budget(code, budget)
+                index = XrefIndex()
+                SemanticAnalyzer(tokens, xref=index).analyze()
+            xref_cache.put(digest, index)
+            
+        return jsonify({"id": digest, **index.encode()})
+        
+    except MemoryBudgetExceeded as e:
+        return jsonify({
+            "error": "Memory budget exceeded",
+            "message": str(e),
+            "stage": e.stage
+        }), 413
+        
+    except AdmissionRejected as e:
+        response = jsonify({
+            "error": "Server busy",
+            "message": f"Analysis rejected ({e.reason}), retry after {e.retry_after} seconds"
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+        
+    except Exception as e:
+        return jsonify({
+            "error": "Analysis failed",
+            "message": str(e)
         }), 500
 
+@app.route('/xref/<index_id>', methods=['GET'])
+def query_xref(index_id):
+    """
+    Look up a built index: ?symbol=Dog.bark for one qualified symbol,
+    ?name=bark for every symbol with that name, neither for the outline
+    """
+    index = xref_cache.get(index_id)
+    if index is None:
+        return jsonify({
+            "error": "Unknown index",
+            "message": f"Cross-reference index '{index_id}' does not exist or has expired; POST the code to /xref"
+        }), 404
+        
+    symbol = request.args.get('symbol')
+    name = request.args.get('name')
+    if symbol:
+        result = index.lookup(symbol)
+        if result is None:
+            return jsonify({
+                "error": "Unknown symbol",
+                "message": f"Symbol '{symbol}' is not defined in this code"
+            }), 404
+        return jsonify(result)
+    if name:
+        return jsonify({"name": name, "symbols": [index.lookup(key) for key in index.find(name)]})
+    return jsonify({"symbols": index.keys, "kinds": index.kinds, "outline": index.outline()})
+
+def similarity_name(user: str, name: str) -> str:
+    """Index key of a user's submission; the user is quoted so the first '/' always ends it"""
+    return f"{quote(user, safe='')}/{name}"
+
+@app.route('/similarity', methods=['POST'])
+def check_similarity():
+    """
+    Find earlier submissions similar to SOOP code
+    Expects JSON with 'code'; with 'name' the code is also added to the index
+    under that name, after the lookup, so a resubmission is not reported as a
+    copy of itself. Names are scoped per X-User: a submission replaces only the
+    same user's earlier submission of that name, and is listed to others as
+    '<user>/<name>'
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data.get('code'), str):
+            return jsonify({
+                "error": "No code provided",
+                "message": "Request must include 'code' field"
+            }), 400
+            
+        code = data['code']
+        if len(code) > Config.MAX_CODE_LENGTH:
+            return jsonify({
+                "error": "Code too long",
+                "message": f"Code exceeds maximum length of {Config.MAX_CODE_LENGTH} characters"
+            }), 400
+            
+        user = request.headers.get('X-User', 'anonymous')
+        name = similarity_name(user, str(data['name'])) if data.get('name') else None
+        
+        with admission.admit(user, len(code)), memory_accountant.request() as budget:
+            tokens, _ = lex_within_budget(code, budget)
+            candidates = similarity_index.query(
+                tokens,
+                limit=Config.SIMILARITY_MAX_CANDIDATES,
+                min_score=Config.SIMILARITY_MIN_SCORE,
+                exclude=name
+            )
+            if name:
+                similarity_index.add(name, tokens)
+                
+        return jsonify({"candidates": candidates, "indexed": bool(name)})
+        
+    except MemoryBudgetExceeded as e:
+        return jsonify({
+            "error": "Memory budget exceeded",
+            "message": str(e),
+            "stage": e.stage
+        }), 413
+        
+    except AdmissionRejected as e:
+        response = jsonify({
+            "error": "Server busy",
+            "message": f"Similarity check rejected ({e.reason}), retry after {e.retry_after} seconds"
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+        
+    except Exception as e:
+        return jsonify({
+            "error": "Similarity check failed",
+            "message": str(e)
+        }), 500
+
+@app.route('/execute', methods=['POST'])
+def execute():
+    """
+    Compile and run SOOP code in the sandbox
+    Expects JSON with 'code' and either 'stdin' (one run) or 'inputs' (a list
+    of stdin strings, one run each); the code must pass analysis first
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data.get('code'), str):
+            return jsonify({
+                "error": "No code provided",
+                "message": "Request must include 'code' field"
+            }), 400
+            
+        code = data['code']
+        if len(code) > Config.MAX_CODE_LENGTH:
+            return jsonify({
+                "error": "Code too long",
+                "message": f"Code exceeds maximum length of {Config.MAX_CODE_LENGTH} characters"
+            }), 400
+            
+        inputs = data.get('inputs', [data.get('stdin', '')])
+        if (not isinstance(inputs, list) or not inputs or len(inputs) > Config.EXECUTION_MAX_INPUTS
+                or not all(isinstance(stdin, str) for stdin in inputs)):
+            return jsonify({
+                "error": "Invalid inputs",
+                "message": f"'inputs' must be a list of 1 to {Config.EXECUTION_MAX_INPUTS} strings"
+            }), 400
+            
+        user = request.headers.get('X-User', 'anonymous')
+        
+        with admission.admit(user, len(code)), memory_accountant.request() as budget:
+            analysis = connect_analyzers(code, budget=budget)
+            if analysis["status"] != "success":
+                return jsonify({
+                    "errors": analysis["errors"],
+                    "status": "error"
+                }), 400
+            try:
+                program, cached = compile_cache.get_or_compile(code, analysis["tokens"])
+            except CompileError as e:
+                return jsonify({
+                    "errors": [e.to_dict()],
+                    "status": "error"
+                }), 400
+
+        # Runs can take EXECUTION_TIME_LIMIT each, so they are admitted apart
+        # from analysis, with the number of runs as the cost
+        with execution_admission.admit(user, len(inputs)):
+            runs = sandbox_pool.run_many(program, inputs)
+        
+        return jsonify({
+            "runs": runs,
+            "cached": cached,
+            "status": "success" if all(run["status"] == "ok" for run in runs) else "error"
+        })
+        
+    except MemoryBudgetExceeded as e:
+        return jsonify({
+            "error": "Memory budget exceeded",
+            "message": str(e),
+            "stage": e.stage
+        }), 413
+        
+    except AdmissionRejected as e:
+        response = jsonify({
+            "error": "Server busy",
+            "message": f"Execution rejected ({e.reason}), retry after {e.retry_after} seconds"
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+        
+    except Exception as e:
+        return jsonify({
+            "error": "Execution failed",
+            "message": str(e)
+        }), 500
+
+@app.route('/transpile', methods=['POST'])
+def transpile():
+    """
+    Translate SOOP code to Java
+    Expects JSON with 'code'; the code must pass analysis first. The response
+    is newline-delimited JSON, one chunk per top-level block as soon as it is
+    translated, each with its Java text, first Java line and source map
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data.get('code'), str):
+            return jsonify({
+                "error": "No code provided",
+                "message": "Request must include 'code' field"
+            }), 400
+            
+        code = data['code']
+        if len(code) > Config.MAX_CODE_LENGTH:
+            return jsonify({
+                "error": "Code too long",
+                "message": f"Code exceeds maximum length of {Config.MAX_CODE_LENGTH} characters"
+            }), 400
+            
+        user = request.headers.get('X-User', 'anonymous')
+        
+        with admission.admit(user, len(code)), memory_accountant.request() as budget:
+            analysis = connect_analyzers(code, budget=budget)
+        if analysis["status"] != "success":
+            return jsonify({
+                "errors": analysis["errors"],
+                "status": "error"
+            }), 400
+            
+        def generate():
+            try:
+                for chunk in java_transpiler.stream(code, analysis["tokens"]):
+                    yield json.dumps(chunk) + "\n"
+            except TranspileError as e:
+                yield json.dumps({"errors": [e.to_dict()], "status": "error"}) + "\n"
+            except Exception as e:
+                yield json.dumps({"errors": [{
+                    "type": "System Error",
+                    "line": 0,
+                    "message": f"Transpile failed: {str(e)}"
+                }], "status": "error"}) + "\n"
+                
+        return Response(generate(), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+        
+    except MemoryBudgetExceeded as e:
+        return jsonify({
+            "error": "Memory budget exceeded",
+            "message": str(e),
+            "stage": e.stage
+        }), 413
+        
+    except AdmissionRejected as e:
+        response = jsonify({
+            "error": "Server busy",
+            "message": f"Analysis rejected ({e.reason}), retry after {e.retry_after} seconds"
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+        
+    except Exception as e:
+        return jsonify({
+            "error": "Transpile failed",
+            "message": str(e)
+        }), 500
+
+@app.route('/export', methods=['POST'])
+def export_report():
+    """
+    Analyze SOOP code and stream the token table and error report as a download
+    Expects 'code' and 'format' (csv, html or print) as JSON or as form fields,
+    so a plain form submission can start the download in the browser
+    """
+    body, status, headers = export_request(
+        lambda: request.get_json(silent=True) or request.form,
+        request.headers.get('X-User', 'anonymous')
+    )
+    if isinstance(body, dict):
+        return jsonify(body), status, headers
+    return Response(body, status=status, headers=headers)
+
+def export_request(load: Callable[[], object], user: str):
+    """
+    Body of /export, shared by the Flask view and asgi.py
+    Returns (body, status, headers); body is an error dict to send as JSON or
+    an iterator over the chunks of the report
+    """
+    try:
+        data = load()
+        if not isinstance(data, dict):
+            return {
+                "error": "Invalid request",
+                "message": "Request body must be an object with a 'code' field"
+            }, 400, {}
+        code = data.get('code')
+        export_format = data.get('format', 'csv')
+        if not isinstance(code, str):
+            return {
+                "error": "No code provided",
+                "message": "Request must include 'code' field"
+            }, 400, {}
+        if export_format not in report_export.FORMATS:
+            return {
+                "error": "Unknown format",
+                "message": f"Format must be one of: {', '.join(report_export.FORMATS)}"
+            }, 400, {}
+            
+        if len(code) > Config.MAX_CODE_LENGTH:
+            return {
+                "error": "Code too long",
+                "message": f"Code exceeds maximum length of {Config.MAX_CODE_LENGTH} characters"
+            }, 400, {}
+            
+        with admission.admit(user, len(code)), memory_accountant.request() as budget:
+            result = connect_analyzers(code, budget=budget)
+        log_analysis(code, result, user)
+        
+        mimetype, extension = report_export.FORMATS[export_format]
+        chunks = report_export.render(export_format, result["tokens"], result["errors"])
+        return chunks, 200, {
+            'Content-Type': mimetype,
+            'Content-Disposition': f'attachment; filename="soop-analysis.{extension}"',
+            'X-Accel-Buffering': 'no'
+        }
+        
+    except MemoryBudgetExceeded as e:
+        return {
+            "error": "Memory budget exceeded",
+            "message": str(e),
+            "stage": e.stage
+        }, 413, {}
+        
+    except AdmissionRejected as e:
+        return {
+            "error": "Server busy",
+            "message": f"Export rejected ({e.reason}), retry after {e.retry_after} seconds"
+        }, 503, {'Retry-After': str(e.retry_after)}
+        
+    except Exception as e:
+        return {
+            "error": "Export failed",
+            "message": str(e)
+        }, 500, {}
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return jsonify(health_status())
+
+def health_status() -> Dict:
+    return {
         "status": "healthy",
         "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC'),
         "version": "1.0.0"
+    }
+
+@app.route('/live', methods=['POST'])
+def live_open():
+    """Open a live analysis session"""
+    user = request.headers.get('X-User', 'anonymous')
+    try:
+        session = live_channel.create(user)
+    except SessionLimitReached as e:
+        return jsonify({
+            "error": "Too many sessions",
+            "message": e.message
+        }), 429
+    return jsonify({
+        "session": session.id,
+        "events": f"/live/{session.id}/events",
+        "debounce": Config.LIVE_DEBOUNCE
+    }), 201
+
+@app.route('/live/<session_id>', methods=['POST'])
+def live_update(session_id):
+    """
+    Submit a new document version to a live session
+    Expects JSON with 'version' (increasing integer) and 'code' fields
+    """
+    session = live_channel.get(session_id)
+    if not session:
+        return jsonify({
+            "error": "Unknown session",
+            "message": f"Live session '{session_id}' does not exist or has expired"
+        }), 404
+        
+    data = request.get_json(silent=True)
+    if (not isinstance(data, dict) or not isinstance(data.get('code'), str)
+            or not isinstance(data.get('version'), int)):
+        return jsonify({
+            "error": "Invalid update",
+            "message": "Request must include a string 'code' and an integer 'version' field"
+        }), 400
+        
+    accepted = session.submit(data['version'], data['code'])
+    return jsonify({
+        "version": data['version'],
+        "accepted": accepted
+    }), 202 if accepted else 409
+
+@app.route('/live/<session_id>/events', methods=['GET'])
+def live_events(session_id):
+    """Server-sent event stream of versioned analysis results"""
+    session = live_channel.get(session_id)
+    if not session:
+        return jsonify({
+            "error": "Unknown session",
+            "message": f"Live session '{session_id}' does not exist or has expired"
+        }), 404
+    return Response(
+        live_channel.stream(session),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/live/<session_id>', methods=['DELETE'])
+def live_close(session_id):
+    """Close a live analysis session"""
+    if not live_channel.close(session_id):
+        return jsonify({
+            "error": "Unknown session",
+            "message": f"Live session '{session_id}' does not exist or has expired"
+        }), 404
+    return jsonify({"closed": session_id})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Service metrics endpoint"""
+    return jsonify({
+        "admission": admission.stats(),
+        "memory": memory_accountant.stats(),
+        "capture": traffic_capture.stats(),
+        "tracing": tracer.stats(),
+        "live": live_channel.stats(),
+        "projects": projects.stats(),
+        "lint": lint_engine.stats(),
+        "similarity": similarity_index.stats(),
+        "execution": sandbox_pool.stats(),
+        "execution_admission": execution_admission.stats(),
+        "transpile": java_transpiler.cache.stats(),
+        "static": static_assets.stats()
     })
 
 # Error handlers
@@ -184,10 +1063,12 @@ Version: 1.0.0
 Started at: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}
 Debug Mode: {Config.DEBUG}
 Frontend Path: {Config.DIST_FOLDER}
-Logs Path: {os.path.join(Config.LOG_FOLDER, Config.LOG_FILE)}
+Logs Path: {log_file_path()}
 ----------------------------
     """)
     
+    create_app()
+    
     app.run(
         host=Config.HOST,
         port=Config.PORT,
@@ -0,0 +1,211 @@
+"""
+asyncio serving path (ASGI):
+
+    uvicorn asgi:app --timeout-keep-alive 75
+
+/analyze, /export and /health are served here directly. Request bodies are
+read on the event loop, so a slow upload or an idle keep-alive connection
+costs a coroutine instead of a thread. Parsing and analysis run in a
+bounded thread pool through the same analyze_request/export_request as the
+Flask views; /health never touches the pool and keeps answering while every
+analysis slot is busy. An /export gives its analysis slot back once the
+report is ready and streams it under a separate limit. Everything else is passed to the Flask app through
+asgiref's WSGI adapter when it is installed.
+Run one worker: /live, /project and the xref cache hold per-process state
+(see gunicorn.conf.py).
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from app import Config, create_app, analyze_request, export_request, health_status, tracer
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:  # asgiref is optional; without it only the native routes are served
+    WsgiToAsgi = None
+
+# Worst case of JSON-escaped code (\uXXXX per character) plus room for the other fields
+MAX_BODY_BYTES = Config.MAX_CODE_LENGTH * 6 + 64 * 1024
+
+CORS_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+]
+
+# (status, headers, body) of a buffered response
+Buffered = Tuple[int, Dict[str, str], bytes]
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+def json_response(body: Dict, status: int, headers: Dict[str, str]) -> Buffered:
+    return status, dict(headers, **{"Content-Type": "application/json"}), json.dumps(body).encode("utf-8")
+
+
+def run_analyze(body: bytes, user: str) -> Buffered:
+    trace = tracer.start("POST /analyze")
+    try:
+        with trace.root() as root:
+            def load():
+                with trace.span("request.json") as span:
+                    span["http.request.body.size"] = len(body)
+                    return json.loads(body)
+            response = analyze_request(load, user, json_response, trace, root)
+            root["http.status_code"] = response[0]
+        return response
+    finally:
+        trace.finish()
+
+
+def parse_export_body(body: bytes, content_type: str):
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        return {name: values[0] for name, values in parse_qs(body.decode("utf-8", "replace")).items()}
+    try:
+        return json.loads(body)
+    except ValueError:
+        return {}
+
+
+class AsyncApp:
+    """
+    ASGI application. Analysis threads are bounded at the admission limits
+    (concurrency plus queue): a request that finds them all taken would be
+    shed by admission control anyway, so it gets a 503 without waiting.
+    """
+
+    def __init__(self, wsgi_app, workers: Optional[int] = None, max_streams: Optional[int] = None):
+        self.workers = workers or Config.ADMISSION_MAX_CONCURRENCY + Config.ADMISSION_MAX_QUEUE
+        self.max_streams = max_streams or Config.ASGI_MAX_STREAMS
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="analysis")
+        # Report chunks render here, so streams never wait behind analyses
+        self.stream_executor = ThreadPoolExecutor(max_workers=self.max_streams, thread_name_prefix="export")
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.streams: Optional[asyncio.Semaphore] = None
+        self.fallback = WsgiToAsgi(wsgi_app) if WsgiToAsgi is not None else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            if self.fallback is not None:
+                await self.fallback(scope, receive, send)
+            return
+
+        path, method = scope["path"], scope["method"]
+        if path == "/health" and method == "GET":
+            await self.send_buffered(send, json_response(health_status(), 200, {}))
+        elif path in ("/analyze", "/export") and method == "OPTIONS":
+            await self.send_buffered(send, (200, {
+                "Access-Control-Allow-Methods": "POST, OPTIONS",
+                "Access-Control-Allow-Headers": "Content-Type, X-User"
+            }, b""))
+        elif path in ("/analyze", "/export") and method == "POST":
+            await self.handle_post(path, scope, receive, send)
+        elif self.fallback is not None:
+            await self.fallback(scope, receive, send)
+        else:
+            await self.send_buffered(send, json_response({
+                "error": "Not Found",
+                "message": "The requested resource was not found"
+            }, 404, {}))
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                self.stream_executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def handle_post(self, path: str, scope, receive, send):
+        headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        user = headers.get("x-user", "anonymous")
+        try:
+            body = await self.read_body(receive, headers)
+        except BodyTooLarge:
+            await self.send_buffered(send, json_response({
+                "error": "Code too long",
+                "message": f"Code exceeds maximum length of {Config.MAX_CODE_LENGTH} characters"
+            }, 413, {}))
+            return
+
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.workers)
+            self.streams = asyncio.Semaphore(self.max_streams)
+        if self.slots.locked() or (path == "/export" and self.streams.locked()):
+            kind = "analysis" if self.slots.locked() else "export"
+            await self.send_buffered(send, json_response({
+                "error": "Server busy",
+                "message": f"All {kind} slots are taken, retry after 1 seconds"
+            }, 503, {"Retry-After": "1"}))
+            return
+
+        loop = asyncio.get_running_loop()
+        if path == "/analyze":
+            async with self.slots:
+                response = await loop.run_in_executor(self.executor, run_analyze, body, user)
+            await self.send_buffered(send, response)
+            return
+
+        # The stream slot is taken before the analysis, so a finished report always has one
+        content_type = headers.get("content-type", "")
+        async with self.streams:
+            async with self.slots:
+                result, status, response_headers = await loop.run_in_executor(
+                    self.executor, export_request, lambda: parse_export_body(body, content_type), user
+                )
+            if isinstance(result, dict):
+                await self.send_buffered(send, json_response(result, status, response_headers))
+                return
+            await self.send_stream(send, status, response_headers, result)
+
+    async def read_body(self, receive, headers: Dict[str, str]) -> bytes:
+        length = headers.get("content-length")
+        if length and length.isdigit() and int(length) > MAX_BODY_BYTES:
+            raise BodyTooLarge()
+        parts: List[bytes] = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                raise BodyTooLarge()
+            parts.append(chunk)
+            if not message.get("more_body", False):
+                break
+        return b"".join(parts)
+
+    @staticmethod
+    def encode_headers(headers: Dict[str, str]) -> List[Tuple[bytes, bytes]]:
+        return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()] \
+            + CORS_HEADERS
+
+    async def send_buffered(self, send, response: Buffered):
+        status, headers, body = response
+        await send({"type": "http.response.start", "status": status, "headers": self.encode_headers(headers)})
+        await send({"type": "http.response.body", "body": body})
+
+    async def send_stream(self, send, status: int, headers: Dict[str, str], chunks: Iterator[str]):
+        """Chunks are rendered in the pool one at a time and sent as the client takes them"""
+        loop = asyncio.get_running_loop()
+        await send({"type": "http.response.start", "status": status, "headers": self.encode_headers(headers)})
+        while True:
+            chunk = await loop.run_in_executor(self.stream_executor, next, chunks, None)
+            if chunk is None:
+                break
+            await send({"type": "http.response.body", "body": chunk.encode("utf-8"), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+
+app = AsyncApp(create_app(production=True))
@@ -0,0 +1,73 @@
+"""
+Project wave benchmark.
+
+    python bench_project.py [--modules 8] [--size 200000] [--workers 2] [--runs 3]
+
+Times a full Project.update() of independent modules (one wave) analyzed in
+the request thread and on a worker pool, so the cost of handing a wave to
+the pool can be compared against analyzing it serially. The pool is started
+before timing.
+"""
+import argparse
+import statistics
+import time
+
+from project import Project, get_executor
+
+MODULE_UNIT = (
+    "class Counter{index}:\n"
+    "    setup(start):\n"
+    "        this.count = start\n"
+    "    action step(by):\n"
+    "        print(\"step\", by)\n"
+    "define twice{index}(x):\n"
+    "    total = x * 2\n"
+    "    for i in range(0, 10):\n"
+    "        if i > 5:\n"
+    "            break\n"
+    "    return total\n"
+)
+
+
+def make_modules(count: int, size: int) -> dict:
+    modules = {}
+    for number in range(count):
+        parts = []
+        length = 0
+        index = 0
+        while length < size:
+            part = MODULE_UNIT.format(index=index)
+            parts.append(part)
+            length += len(part)
+            index += 1
+        modules[f"module{number}.soop"] = "".join(parts)
+    return modules
+
+
+def measure(modules: dict, workers: int, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        project = Project(workers=workers, deadline=60.0)
+        started = time.perf_counter()
+        project.update(modules)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure serial and pooled project wave analysis")
+    parser.add_argument("--modules", type=int, default=8)
+    parser.add_argument("--size", type=int, default=200000, help="Characters per module")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    modules = make_modules(args.modules, args.size)
+    get_executor(args.workers).submit(len, "").result()
+    print(f"{'workers':<8} {'wave s':>8}")
+    for workers in (0, args.workers):
+        print(f"{workers:<8} {measure(modules, workers, args.runs):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
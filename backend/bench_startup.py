@@ -0,0 +1,63 @@
+"""
+Cold-start and first-request benchmark.
+
+    python bench_startup.py [--runs 5]
+
+Each run starts a fresh interpreter, imports the app, calls the factory with
+and without the production warm-up, and times the first and second /analyze
+requests through the test client. Runs happen in a temporary working
+directory so no logs are left behind.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.abspath(__file__))
+
+# Executed in the child interpreter; prints one JSON object
+CHILD = r'''
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import app as application
+imported = time.perf_counter()
+flask_app = application.create_app(production=sys.argv[2] == "warm")
+ready = time.perf_counter()
+from warmup import WARMUP_CORPUS
+client = flask_app.test_client()
+latencies = []
+for _ in range(2):
+    before = time.perf_counter()
+    client.post("/analyze", json={"code": WARMUP_CORPUS[0]})
+    latencies.append(time.perf_counter() - before)
+print(json.dumps({"import": imported - started, "factory": ready - imported,
+                  "first_request": latencies[0], "second_request": latencies[1]}))
+'''
+
+
+def measure(mode: str) -> dict:
+    with tempfile.TemporaryDirectory() as folder:
+        output = subprocess.run([sys.executable, "-c", CHILD, BACKEND, mode], cwd=folder,
+                                capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start and first-request latency")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'mode':<6} {'import ms':>10} {'factory ms':>11} {'1st req ms':>11} {'2nd req ms':>11}")
+    for mode in ("cold", "warm"):
+        samples = [measure(mode) for _ in range(args.runs)]
+        median = {key: statistics.median(sample[key] for sample in samples) * 1000 for key in samples[0]}
+        print(f"{mode:<6} {median['import']:>10.1f} {median['factory']:>11.1f} "
+              f"{median['first_request']:>11.2f} {median['second_request']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+from sys import intern
+from typing import List, Dict, Tuple, Optional, Callable
+from token_definitions import *
+from lexical_analyzer import LexicalAnalyzer
+from symbols import RESERVED_WORDS, RESERVED_VALUES
+from error import AnalysisCancelled
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; without it bulk mode falls back to the reference lexer
+    np = None
+
+# Symbols grouped by length, longest tried first like the SYMBOLS scan
+_SYMBOLS_BY_LENGTH = [
+    (length, {symbol: token_type for symbol, token_type in SYMBOLS if len(symbol) == length})
+    for length in sorted({len(symbol) for symbol, _ in SYMBOLS}, reverse=True)
+]
+
+# Characters after a digit run that need the full match_number rules
+_NUMBER_CONTINUATIONS = set("._eExXoObB")
+
+# Character class bits
+_SPACE = 1
+_DIGIT = 2
+_IDENT = 4  # identifier continuation: alnum, '_' or non-ASCII
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+def _class_of(char: str) -> int:
+    bits = 0
+    if char.isspace():
+        bits |= _SPACE
+    if '0' <= char <= '9':
+        bits |= _DIGIT
+    if char.isalnum() or char == '_' or ord(char) > 127:
+        bits |= _IDENT
+    return bits
+
+
+class BulkLexicalAnalyzer(LexicalAnalyzer):
+    """
+    LexicalAnalyzer that classifies every character of the document up front
+    with NumPy lookup tables and precomputes where each whitespace, digit and
+    identifier run ends. The per-token loop then jumps over whole runs instead
+    of testing one character at a time; strings, non-decimal numbers and
+    operators still go through the scalar code. Output is identical to
+    LexicalAnalyzer.tokenize().
+    """
+
+    _ascii_table = None
+
+    def __init__(self, code: str, cancel_check: Optional[Callable[[], bool]] = None):
+        super().__init__(code, cancel_check)
+        self.produced: List[Dict] = []
+
+    def token_count(self) -> int:
+        # Small inputs fall back to the reference tokenize(), which fills self.tokens
+        return len(self.produced) or len(self.tokens)
+
+    @classmethod
+    def _table(cls):
+        if cls._ascii_table is None:
+            cls._ascii_table = np.array([_class_of(chr(code)) for code in range(128)], dtype=np.uint8)
+        return cls._ascii_table
+
+    def _classify(self, text: str):
+        codes = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        classes = self._table()[np.minimum(codes, 127)]
+
+        # Non-ASCII characters are classified once per distinct code point
+        non_ascii = codes > 127
+        if non_ascii.any():
+            distinct, inverse = np.unique(codes[non_ascii], return_inverse=True)
+            table = np.array([_class_of(chr(code)) for code in distinct.tolist()], dtype=np.uint8)
+            classes[non_ascii] = table[inverse]
+        return classes
+
+    @staticmethod
+    def _run_ends(mask) -> memoryview:
+        """For every index, the first index at or after it where mask is False"""
+        size = len(mask)
+        stops = np.where(mask, size, np.arange(size, dtype=np.int64))
+        ends = np.ascontiguousarray(np.minimum.accumulate(stops[::-1])[::-1])
+        # memoryview indexing yields plain ints far cheaper than ndarray scalar indexing
+        return memoryview(ends)
+
+    def tokenize(self) -> Tuple[List[Dict], List[Dict]]:
+        if np is None:
+            return super().tokenize()
+
+        lines = self.code.splitlines()
+        if not lines or (len(lines) == 1 and not lines[0]):
+            return [{"type": TOKEN_EOF, "value": "", "line": 1}], self.errors
+
+        # Lines are joined with '\n', which never occurs inside a line and ends every run
+        text = "\n".join(lines)
+        classes = self._classify(text)
+        space_end = self._run_ends((classes & _SPACE) != 0)
+        digit_end = self._run_ends((classes & _DIGIT) != 0)
+        ident_end = self._run_ends((classes & _IDENT) != 0)
+        line_lengths = np.fromiter((len(line) for line in lines), dtype=np.int64, count=len(lines))
+        line_starts = (np.cumsum(line_lengths + 1) - (line_lengths + 1)).tolist()
+
+        tokens: List[Dict] = []
+        self.produced = tokens
+        errors = self.errors
+        append = tokens.append
+        cancel_check = self.cancel_check
+        last_line = len(lines)
+
+        for line_num, line in enumerate(lines, 1):
+            if cancel_check and cancel_check():
+                raise AnalysisCancelled()
+
+            if line.strip():
+                for token in self.handle_indentation(line, line_num):
+                    append(token.to_dict())
+
+            base = line_starts[line_num - 1]
+            line = line.rstrip()
+            length = len(line)
+            pos = 0
+
+            while pos < length:
+                char = line[pos]
+
+                if char.isspace():
+                    pos = min(space_end[base + pos] - base, length)
+                    continue
+
+                if char == '#':
+                    append({"type": TOKEN_COMMENT, "value": line[pos:].strip(), "line": line_num})
+                    break
+
+                if char == '"' or char == "'":
+                    new_pos, token, error = self.match_string(line, pos, line_num)
+                    if error:
+                        errors.append({"message": error, "line": line_num, "column": pos + 1})
+                    append(token.to_dict())
+                    pos = new_pos
+                    continue
+
+                if char.isdigit() or (char == '.' and pos + 1 < length and line[pos + 1].isdigit()):
+                    if '0' <= char <= '9':
+                        end = digit_end[base + pos] - base
+                        following = line[end] if end < length else ''
+                        if following not in _NUMBER_CONTINUATIONS and not following.isdigit():
+                            append({"type": TOKEN_INTEGER_LITERAL, "value": line[pos:end], "line": line_num})
+                            pos = end
+                            continue
+                    pos, token = self.match_number(line, pos, line_num)
+                    append(token.to_dict())
+                    continue
+
+                if char.isalpha() or char == '_':
+                    end = ident_end[base + pos] - base
+                    word = line[pos:end]
+                    token_type = RESERVED_WORDS.get(word)
+                    if token_type is not None:
+                        append({"type": token_type, "value": RESERVED_VALUES[word], "line": line_num})
+                    else:
+                        append({"type": TOKEN_IDENTIFIER, "value": intern(word), "line": line_num})
+                    pos = end
+                    continue
+
+                for size, symbols in _SYMBOLS_BY_LENGTH:
+                    token_type = symbols.get(line[pos:pos + size])
+                    if token_type:
+                        append({"type": token_type, "value": line[pos:pos + size], "line": line_num})
+                        pos += size
+                        break
+                else:
+                    errors.append({
+                        "message": f"Unknown character: {char}",
+                        "line": line_num,
+                        "column": pos + 1
+                    })
+                    append({"type": TOKEN_UNKNOWN, "value": char, "line": line_num})
+                    pos += 1
+
+            if line_num < last_line:
+                append({"type": TOKEN_NEWLINE, "value": "\n", "line": line_num})
+
+        while len(self.indentation_stack) > 1:
+            self.indentation_stack.pop()
+            append({"type": TOKEN_DEDENT, "value": 0, "line": last_line})
+
+        append({"type": TOKEN_EOF, "value": "", "line": last_line})
+        return tokens, errors
@@ -0,0 +1,152 @@
+from collections import deque
+from typing import List, Dict, Optional, Tuple
+
+
+class ClassInfo:
+    def __init__(self, name: str, line: int, parent: Optional[str]):
+        self.name = name
+        self.line = line
+        self.parent = parent
+        self.setup_arity: Optional[int] = None
+        self.methods: Dict[str, int] = {}  # method name -> arity
+        self.attributes: Dict[str, int] = {}  # attribute name -> first line assigned
+        self.overrides: List[Tuple[str, int]] = []  # (method name, line) declared with 'override'
+
+
+class ClassHierarchy:
+    """
+    Inheritance index over the classes of one program.
+    Classes are ordered parents-first; classes whose chain loops back on
+    itself are reported as cycles and treated as having no parent. Member
+    lookups walk the chain once and record the answer in the lookup cache of
+    every class passed on the way, so each (class, name) pair is resolved at
+    most once and repeated lookups are O(1) however deep the chain is.
+    """
+
+    def __init__(self, classes: Dict[str, ClassInfo]):
+        self.classes = classes
+        self.parents: Dict[str, Optional[str]] = {}
+        self.undefined_parents: List[ClassInfo] = []
+        self.order: List[str] = []
+        self.cycles: List[List[str]] = []
+        # Per-class caches: member name -> owning class name, or None if not found
+        self._method_cache: Dict[str, Dict[str, Optional[str]]] = {name: {} for name in classes}
+        self._attribute_cache: Dict[str, Dict[str, Optional[str]]] = {name: {} for name in classes}
+        self._setup_cache: Dict[str, Optional[str]] = {}
+        self._build()
+
+    def _build(self):
+        children: Dict[str, List[str]] = {name: [] for name in self.classes}
+        roots = deque()
+        for name, info in self.classes.items():
+            parent = info.parent
+            if parent is not None and parent not in self.classes:
+                self.undefined_parents.append(info)
+                parent = None
+            self.parents[name] = parent
+            if parent is None:
+                roots.append(name)
+            else:
+                children[parent].append(name)
+
+        # Kahn's algorithm: each class has at most one parent, so a class is
+        # ready as soon as its parent has been ordered
+        while roots:
+            name = roots.popleft()
+            self.order.append(name)
+            roots.extend(children[name])
+
+        if len(self.order) == len(self.classes):
+            return
+
+        # Every unordered class is on a cycle or inherits from one
+        ordered = set(self.order)
+        visited = set()
+        for name in self.classes:
+            if name in ordered or name in visited:
+                continue
+            path: Dict[str, int] = {}
+            current = name
+            while current not in path and current not in visited:
+                path[current] = len(path)
+                current = self.parents[current]
+            if current in path:
+                chain = list(path)[path[current]:]
+                self.cycles.append(chain)
+                for member in chain:
+                    self.parents[member] = None
+            visited.update(path)
+
+        # Cycle members now act as roots; order them and their descendants
+        roots = deque(member for cycle in self.cycles for member in cycle)
+        while roots:
+            name = roots.popleft()
+            if name in ordered:
+                continue
+            ordered.add(name)
+            self.order.append(name)
+            roots.extend(child for child in children[name] if self.parents[child] == name)
+
+    def _resolve(self, cache: Dict[str, Dict[str, Optional[str]]], table: str,
+                 class_name: str, member: str) -> Optional[str]:
+        path = []
+        current = class_name
+        owner = None
+        while current is not None:
+            class_cache = cache[current]
+            if member in class_cache:
+                owner = class_cache[member]
+                break
+            path.append(class_cache)
+            if member in getattr(self.classes[current], table):
+                owner = current
+                break
+            current = self.parents[current]
+        for class_cache in path:
+            class_cache[member] = owner
+        return owner
+
+    def method_owner(self, class_name: str, method: str) -> Optional[str]:
+        """Class defining the method that class_name.method resolves to"""
+        if class_name not in self.classes:
+            return None
+        return self._resolve(self._method_cache, "methods", class_name, method)
+
+    def method_arity(self, class_name: str, method: str) -> Optional[int]:
+        owner = self.method_owner(class_name, method)
+        return self.classes[owner].methods[method] if owner else None
+
+    def attribute_owner(self, class_name: str, attribute: str) -> Optional[str]:
+        """Class whose methods assign the attribute that class_name.attribute resolves to"""
+        if class_name not in self.classes:
+            return None
+        return self._resolve(self._attribute_cache, "attributes", class_name, attribute)
+
+    def has_member(self, class_name: str, name: str) -> bool:
+        return self.attribute_owner(class_name, name) is not None or self.method_owner(class_name, name) is not None
+
+    def setup_owner(self, class_name: str) -> Optional[str]:
+        """Class declaring the setup used by 'new class_name(...)', inherited if not declared"""
+        if class_name not in self._setup_cache:
+            path = []
+            current = class_name
+            owner = None
+            while current is not None and current in self.classes:
+                if current in self._setup_cache:
+                    owner = self._setup_cache[current]
+                    break
+                path.append(current)
+                if self.classes[current].setup_arity is not None:
+                    owner = current
+                    break
+                current = self.parents.get(current)
+            for name in path:
+                self._setup_cache[name] = owner
+        return self._setup_cache.get(class_name)
+
+    def setup_arity(self, class_name: str) -> Optional[int]:
+        owner = self.setup_owner(class_name)
+        return self.classes[owner].setup_arity if owner else None
+
+    def parent_of(self, class_name: str) -> Optional[str]:
+        return self.parents.get(class_name)
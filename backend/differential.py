@@ -0,0 +1,292 @@
+"""
+Differential testing of alternative analyzer engines against the reference.
+
+    python differential.py                       # every registered engine, 500 fuzzed inputs
+    python differential.py --engine bulk --cases 5000 --seed 7
+    python differential.py --corpus examples/ --no-fuzz
+
+The reference is LexicalAnalyzer followed by SyntaxAnalyzer, exactly as
+/analyze runs them. Every registered engine is run on the same inputs and
+must produce the same tokens, lexical errors and syntax errors. Inputs come
+from a grammar-aware generator (statements, blocks, literals and operators of
+SOOP, plus character-level mutations for the error paths) and from .soop
+corpus files. A diverging input is shrunk to a small repro by removing lines
+and then characters while the divergence persists. Each engine's time on the
+inputs is reported as a speedup over the reference. Exits with 1 if any
+engine diverged, so an engine is only switched on once this passes in CI.
+"""
+import argparse
+import random
+import sys
+import time
+from typing import List, Dict, Optional, Tuple, Callable, Iterator
+
+from lexical_analyzer import LexicalAnalyzer
+from bulk_lexer import BulkLexicalAnalyzer, numpy_available
+from syntax_analyzer import SyntaxAnalyzer
+from soop_analyze import find_files
+from token_definitions import KEYWORDS, DATA_TYPES, SYMBOLS
+from error import AnalysisCancelled
+
+# (tokens, lexical errors, syntax errors) of one input
+Outcome = Tuple[List[Dict], List[Dict], List[Dict]]
+Engine = Callable[[str], Outcome]
+
+ENGINES: Dict[str, Engine] = {}
+
+STATEMENT_BUDGET_PER_TOKEN = 20  # Parser statements per token before a parse counts as stopped
+STOPPED = {"stopped": "parser exceeded its statement budget"}
+
+
+def register_engine(name: str):
+    """Decorator registering an engine (code -> Outcome) to be checked against the reference"""
+    def register(engine: Engine) -> Engine:
+        ENGINES[name] = engine
+        return engine
+    return register
+
+
+def pipeline(lexer: Callable[[str], LexicalAnalyzer],
+             parser: Callable[..., SyntaxAnalyzer] = SyntaxAnalyzer) -> Engine:
+    """
+    Engine running a lexer and a parser the way connect_analyzers does.
+    The parser gets a cancel check that stops it after a number of statements
+    proportional to the input, since some malformed inputs never terminate;
+    a stopped parse yields STOPPED instead of its errors, so a hang is
+    reproducible and compared like any other outcome.
+    """
+    def run(code: str) -> Outcome:
+        tokens, lexical_errors = lexer(code).tokenize()
+        if lexical_errors:
+            return tokens, lexical_errors, []
+        statements = [0]
+        limit = STATEMENT_BUDGET_PER_TOKEN * len(tokens)
+
+        def over_budget() -> bool:
+            statements[0] += 1
+            return statements[0] > limit
+        try:
+            return tokens, [], parser(tokens, over_budget).analyze()
+        except AnalysisCancelled:
+            return tokens, [], [STOPPED]
+    return run
+
+
+reference = pipeline(LexicalAnalyzer)
+
+if numpy_available():
+    register_engine("bulk")(pipeline(BulkLexicalAnalyzer))
+
+
+def run_engine(engine: Engine, code: str) -> Outcome:
+    """Outcome of an engine; a crash is an outcome too, so it is compared like one"""
+    try:
+        return engine(code)
+    except Exception as e:
+        return [], [{"crash": f"{type(e).__name__}: {e}"}], []
+
+
+def difference(expected: Outcome, actual: Outcome) -> Optional[str]:
+    """First difference between two outcomes, or None if they are identical"""
+    for label, want, got in zip(("token", "lexical error", "syntax error"), expected, actual):
+        for index, (a, b) in enumerate(zip(want, got)):
+            if a != b:
+                return f"{label} {index}: expected {a!r}, got {b!r}"
+        if len(want) != len(got):
+            return f"{label} count: expected {len(want)}, got {len(got)}"
+    return None
+
+
+class SoopFuzzer:
+    """Random SOOP programs that mostly follow the grammar, so the parser gets past the first line"""
+
+    NAMES = ["x", "y", "total", "name", "i", "_tmp", "value2", "Dog", "café", "ñame"]
+    OPERATORS = [symbol for symbol, _ in SYMBOLS if symbol not in ("\n", "\"", "(", ")", "{", "}", ":", ";", ",", ".")]
+    NOISE = list("$@~`?\\\t'\"#:(){}") + [" ", " ", "é", "0x", "1e", "'''"]
+
+    def __init__(self, seed: int):
+        self.random = random.Random(seed)
+
+    def name(self) -> str:
+        return self.random.choice(self.NAMES)
+
+    def literal(self) -> str:
+        r = self.random
+        return r.choice([
+            lambda: str(r.randint(0, 10 ** r.randint(1, 12))),
+            lambda: f"{r.random() * 1000:.{r.randint(0, 6)}f}",
+            lambda: f"{r.randint(1, 9)}.{r.randint(0, 99)}e{r.choice(['', '-', '+'])}{r.randint(0, 30)}",
+            lambda: r.choice(["0x1F", "0b101", "0o17", "1_000", "0xZZ", "1__0", "0b", "12abc", "1.2.3"]),
+            lambda: r.choice(['"hello"', "'it\\'s'", '"tab\\t\\n"', '""', '"""doc"""', "'''x'''", '"\\q"']),
+            lambda: r.choice(["true", "false", "null", "this.name", "parent"]),
+        ])()
+
+    def expression(self, depth: int = 0) -> str:
+        r = self.random
+        if depth > 2 or r.random() < 0.4:
+            return r.choice([self.literal, self.name])()
+        choice = r.randrange(4)
+        if choice == 0:
+            return f"{self.expression(depth + 1)} {r.choice(self.OPERATORS)} {self.expression(depth + 1)}"
+        if choice == 1:
+            return f"({self.expression(depth + 1)})"
+        if choice == 2:
+            arguments = ", ".join(self.expression(depth + 1) for _ in range(r.randint(0, 3)))
+            return f"{self.name()}({arguments})"
+        return f"new {self.name()}({self.expression(depth + 1)})"
+
+    def statement(self, indent: str, depth: int) -> List[str]:
+        r = self.random
+        choice = r.randrange(10 if depth < 3 else 5)
+        if choice == 0:
+            return [f"{indent}{self.name()} = {self.expression()}"]
+        if choice == 1:
+            return [f"{indent}print({self.expression()})"]
+        if choice == 2:
+            return [f"{indent}{r.choice(['return', 'break', 'continue', 'raise'])} {self.expression()}"]
+        if choice == 3:
+            return [f"{indent}{r.choice(list(DATA_TYPES))} {self.name()} = {self.expression()}"]
+        if choice == 4:
+            return [f"{indent}{self.name()}.{self.name()}({self.expression()})"]
+        if choice == 5:
+            header = f"if {self.expression()}:"
+        elif choice == 6:
+            header = f"for {self.name()} in range(0, {r.randint(1, 9)}):"
+        elif choice == 7:
+            header = f"define {self.name()}({', '.join(self.name() for _ in range(r.randint(0, 3)))}):"
+        elif choice == 8:
+            header = f"class {self.name()}{' inherits ' + self.name() if r.random() < 0.3 else ''}:"
+        else:
+            header = r.choice(["try:", "catch e:", "while true:", "setup(name):", "action run():", "else:"])
+        return [indent + header] + self.block(indent + r.choice(["    ", "  ", "\t", "    "]), depth + 1)
+
+    def block(self, indent: str, depth: int) -> List[str]:
+        lines = []
+        for _ in range(self.random.randint(1, 4)):
+            lines.extend(self.statement(indent, depth))
+        return lines
+
+    def mutate(self, code: str) -> str:
+        r = self.random
+        for _ in range(r.randint(1, 3)):
+            pos = r.randint(0, len(code))
+            choice = r.randrange(4)
+            if choice == 0:
+                code = code[:pos] + r.choice(self.NOISE) + code[pos:]
+            elif choice == 1:
+                code = code[:pos] + code[pos + r.randint(1, 5):]
+            elif choice == 2:
+                code = code[:pos] + r.choice(list(KEYWORDS)) + code[pos:]
+            else:
+                code = code[:pos] + "\n" + " " * r.randint(0, 9) + code[pos:]
+        return code
+
+    def program(self) -> str:
+        r = self.random
+        lines = []
+        for _ in range(r.randint(1, 8)):
+            lines.extend(self.statement("", 0))
+        if r.random() < 0.2:
+            lines.insert(r.randint(0, len(lines)), "# " + self.expression())
+        code = "\n".join(lines) + r.choice(["", "\n", "\n\n", "   "])
+        return self.mutate(code) if r.random() < 0.5 else code
+
+    def programs(self, count: int) -> Iterator[str]:
+        for _ in range(count):
+            yield self.program()
+
+
+def minimize(code: str, diverges: Callable[[str], bool]) -> str:
+    """
+    Shrink a diverging input: drop chunks of lines, then single lines, then
+    chunks of characters, keeping every removal after which it still diverges
+    """
+    def shrink(parts: List[str], joiner: str) -> List[str]:
+        size = max(1, len(parts) // 2)
+        while size >= 1:
+            start = 0
+            while start < len(parts):
+                candidate = parts[:start] + parts[start + size:]
+                if candidate and diverges(joiner.join(candidate)):
+                    parts = candidate
+                else:
+                    start += size
+            size //= 2
+        return parts
+
+    lines = shrink(code.split("\n"), "\n")
+    return "".join(shrink(list("\n".join(lines)), ""))
+
+
+def check_engine(name: str, engine: Engine, inputs: List[Tuple[str, str]]) -> Dict:
+    """Run an engine and the reference on every input; report divergences and timings"""
+    divergences = []
+    reference_seconds = engine_seconds = 0.0
+    for label, code in inputs:
+        started = time.perf_counter()
+        expected = run_engine(reference, code)
+        reference_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        actual = run_engine(engine, code)
+        engine_seconds += time.perf_counter() - started
+
+        if difference(expected, actual) is not None:
+            repro = minimize(code, lambda candidate: difference(run_engine(reference, candidate),
+                                                                run_engine(engine, candidate)) is not None)
+            divergences.append({
+                "input": label,
+                "repro": repro,
+                "difference": difference(run_engine(reference, repro), run_engine(engine, repro))
+            })
+    return {
+        "engine": name,
+        "inputs": len(inputs),
+        "divergences": divergences,
+        "reference_seconds": round(reference_seconds, 4),
+        "engine_seconds": round(engine_seconds, 4),
+        "speedup": round(reference_seconds / engine_seconds, 2) if engine_seconds > 0 else 0.0
+    }
+
+
+def collect_inputs(corpus: List[str], cases: int, seed: int, fuzz: bool) -> List[Tuple[str, str]]:
+    inputs = []
+    for path in find_files(corpus):
+        with open(path, encoding="utf-8", errors="replace") as source:
+            inputs.append((path, source.read()))
+    if fuzz:
+        inputs.extend((f"fuzz seed={seed} case={index}", code)
+                      for index, code in enumerate(SoopFuzzer(seed).programs(cases)))
+    return inputs
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="differential",
+                                     description="Check alternative analyzer engines against the reference")
+    parser.add_argument("--engine", action="append", choices=sorted(ENGINES),
+                        help="Engine to check (repeatable; default: all registered)")
+    parser.add_argument("--corpus", nargs="*", default=[], help=".soop files or directories to include")
+    parser.add_argument("--cases", type=int, default=500, help="Fuzzed inputs per run (default: 500)")
+    parser.add_argument("--seed", type=int, default=0, help="Fuzzer seed; a failure reproduces with the same seed")
+    parser.add_argument("--no-fuzz", action="store_true", help="Only check the corpus")
+    args = parser.parse_args(argv)
+
+    inputs = collect_inputs(args.corpus, args.cases, args.seed, not args.no_fuzz)
+    if not inputs:
+        print("No inputs to check", file=sys.stderr)
+        return 1
+
+    diverged = False
+    for name in args.engine or sorted(ENGINES):
+        report = check_engine(name, ENGINES[name], inputs)
+        print(f"{name}: {report['inputs']} inputs, {len(report['divergences'])} divergences, "
+              f"{report['speedup']:g}x ({report['engine_seconds']:g}s vs reference {report['reference_seconds']:g}s)")
+        for divergence in report["divergences"]:
+            diverged = True
+            print(f"  {divergence['input']}: {divergence['difference']}")
+            print(f"    repro: {divergence['repro']!r}")
+    return 1 if diverged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -35,6 +35,12 @@ class SyntaxErrorType(Enum):
     INVALID_METHOD_CALL = "Invalid method call"
     INVALID_OBJECT_CREATION = "Invalid object creation"
     DUPLICATE_DEFINITION = "Duplicate definition"
+    UNDEFINED_MODULE = "Undefined module"
+    CIRCULAR_IMPORT = "Circular import"
+
+class AnalysisCancelled(Exception):
+    """Raised by the analyzers when their cancel check reports a newer run"""
+    pass
 
 class SyntaxError:
     def __init__(self, error_type: SyntaxErrorType, line: int, message: str):
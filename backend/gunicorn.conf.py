@@ -0,0 +1,68 @@
+"""
+Gunicorn settings for production (loaded automatically from this directory):
+
+    gunicorn wsgi:app
+
+The app is imported and warmed up once in the master (preload_app), then the
+master's heap is frozen with gc.freeze() so the garbage collector in forked
+workers never touches, and thereby copies, the shared pages.
+
+/live sessions, /project state and the xref cache are held in the worker
+process, so by default one worker serves everything on threads and is never
+recycled. Workers of one gunicorn share its listening socket, so no proxy can
+pin a client to one of them: scale out by running one single-worker gunicorn
+per SOOP_BIND port behind a proxy with sticky sessions. SOOP_WORKERS above 1
+is only safe for stateless traffic. SOOP_MAX_REQUESTS and
+SOOP_MAX_WORKER_RSS_MB turn on recycling, which drops that state: a worker
+past either limit finishes its current request and is replaced.
+"""
+import gc
+import os
+
+bind = os.environ.get("SOOP_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("SOOP_WORKERS", 1))
+# Threads keep /live event streams from tying up a whole worker
+worker_class = "gthread"
+threads = int(os.environ.get("SOOP_THREADS", 16))
+preload_app = True
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+# Off by default (0); with jitter so workers do not restart together
+max_requests = int(os.environ.get("SOOP_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+MAX_WORKER_RSS = int(os.environ.get("SOOP_MAX_WORKER_RSS_MB", 0)) * 1024 * 1024
+
+
+def resident_memory() -> int:
+    """Current resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is the peak, in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def when_ready(server):
+    # The preloaded app is fully built: move everything to the permanent
+    # generation before the first fork
+    gc.collect()
+    gc.freeze()
+    server.log.info("Froze %d objects before forking workers", gc.get_freeze_count())
+    if workers > 1:
+        server.log.warning("%d workers share the socket: /live, /project and /xref state is per worker "
+                           "and clients reaching another worker lose it", workers)
+    if max_requests or MAX_WORKER_RSS:
+        server.log.warning("Worker recycling is on: a recycled worker drops its /live sessions and /project state")
+
+
+def post_request(worker, req, environ, resp):
+    if not MAX_WORKER_RSS:
+        return
+    rss = resident_memory()
+    if rss > MAX_WORKER_RSS and worker.alive:
+        worker.log.info("Worker %s uses %d MB, recycling", worker.pid, rss // (1024 * 1024))
+        worker.alive = False
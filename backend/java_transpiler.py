@@ -0,0 +1,672 @@
+"""
+SOOP to Java transpiler.
+Validated SOOP becomes a single Java class, Main: SOOP classes become static
+nested classes, 'define' functions static methods, and top-level statements
+the body of main(). Module variables become static fields of Main so that
+functions can read them, as in SOOP.
+
+The program is split into top-level blocks (a class, a function, or a run of
+top-level statements). Each block is translated on its own, so the output is
+streamed block by block, and translations are cached by the hash of the
+block's source text: after an edit only the changed blocks are translated
+again. Every Java line carries the SOOP line it came from; cached blocks
+store those lines relative to the block start so a block that only moved is
+still reused.
+
+Values SOOP leaves untyped are typed from literal initializers where
+possible (int x = 5, var s = "a") and Object otherwise. Untyped parameters
+the function body uses as numbers (operands of -, *, /, %, comparisons, of +
+next to a number, or range() bounds) become double, so their arithmetic
+compiles.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Set, Tuple, Iterator
+
+from soop_compiler import unescape
+
+INDENT = "    "
+MAIN_CLASS = "Main"
+
+PROLOGUE = [
+    "import java.util.*;",
+    "",
+    f"public class {MAIN_CLASS} {{",
+    f"{INDENT}private static final Scanner SCANNER = new Scanner(System.in);",
+    "",
+    f"{INDENT}static String input(Object prompt) {{",
+    f"{INDENT * 2}System.out.print(prompt);",
+    f"{INDENT * 2}return SCANNER.hasNextLine() ? SCANNER.nextLine() : null;",
+    f"{INDENT}}}",
+    "",
+]
+
+# Tokens translated to a fixed piece of Java
+DIRECT = {
+    "BOOL_TRUE": "true", "BOOL_FALSE": "false", "NULL": "null", "THIS": "this",
+    "LOGICAL_AND": "&&", "LOGICAL_OR": "||", "LOGICAL_NOT": "!",
+    "FLOOR_DIVIDE": "/", "FLOOR_DIVIDE_ASSIGN": "/=", "INPUT": "input", "NEW": "new",
+}
+JAVA_TYPES = {
+    "TYPE_INT": "int", "TYPE_DOUBLE": "double", "TYPE_FLOAT": "float", "TYPE_BOOL": "boolean",
+    "TYPE_STRING": "String", "TYPE_LIST": "List<Object>", "TYPE_DICT": "Map<Object, Object>",
+}
+LITERAL_TYPES = {
+    "INTEGER_LITERAL": "int", "FLOAT_LITERAL": "double", "STRING_LITERAL": "String",
+    "BOOL_TRUE": "boolean", "BOOL_FALSE": "boolean",
+}
+DEFAULT_VALUES = {"int": "0", "double": "0.0", "float": "0.0f", "boolean": "false"}
+# Operators whose operands can only be numbers in Java; + also joins strings
+NUMERIC_OPERATORS = {"MINUS", "MULTIPLY", "DIVIDE", "MODULO", "FLOOR_DIVIDE", "GREATER", "LESS",
+                     "GREATER_EQUAL", "LESS_EQUAL", "MINUS_ASSIGN", "MULTIPLY_ASSIGN", "DIVIDE_ASSIGN",
+                     "MODULO_ASSIGN", "FLOOR_DIVIDE_ASSIGN", "INCREMENT", "DECREMENT"}
+NUMERIC_LITERALS = {"INTEGER_LITERAL", "FLOAT_LITERAL"}
+# Tokens that can end an operand (a following +/- is binary) or name something called
+OPERAND_END = {"IDENTIFIER", "INTEGER_LITERAL", "FLOAT_LITERAL", "STRING_LITERAL", "RPAREN",
+               "BOOL_TRUE", "BOOL_FALSE", "NULL", "THIS", "INCREMENT", "DECREMENT"}
+CALLABLE = {"IDENTIFIER", "RPAREN", "INPUT", "PRINT", "RANGE", "PARENT", "SETUP", "THIS"}
+MODIFIERS = {"PUBLIC": "public", "PRIVATE": "private", "RESTRICTED": "protected"}
+ASSIGNMENT_OPERATORS = {"ASSIGN", "PLUS_ASSIGN", "MINUS_ASSIGN", "MULTIPLY_ASSIGN",
+                        "DIVIDE_ASSIGN", "MODULO_ASSIGN", "FLOOR_DIVIDE_ASSIGN"}
+JAVA_KEYWORDS = {
+    "abstract", "assert", "boolean", "byte", "case", "char", "const", "default", "do", "double",
+    "enum", "extends", "final", "float", "goto", "implements", "instanceof", "int", "interface",
+    "long", "native", "package", "protected", "short", "strictfp", "super", "synchronized",
+    "throw", "throws", "transient", "void", "volatile", "var", "Main", "SCANNER",
+}
+
+
+class TranspileError(Exception):
+    def __init__(self, line: int, message: str):
+        super().__init__(message)
+        self.line = line
+        self.message = message
+
+    def to_dict(self) -> Dict:
+        return {"type": "Transpile Error", "line": self.line, "message": self.message}
+
+
+class Block:
+    """One top-level block of the SOOP source"""
+
+    def __init__(self, kind: str, name: Optional[str], tokens: List[Dict], start: int, end: int, text: str):
+        self.kind = kind  # 'class', 'function' or 'statements'
+        self.name = name
+        self.tokens = tokens
+        self.start = start
+        self.end = end
+        self.digest = hashlib.sha256(f"{kind}\0{text}".encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class JavaBlock:
+    """Translation of one block: Java lines with their SOOP line relative to the block start"""
+
+    def __init__(self, lines: List[Tuple[str, int]], fields: Dict[str, str]):
+        self.lines = lines
+        self.fields = fields  # module variables assigned by the block -> Java type
+
+
+def split_blocks(code: str, tokens: List[Dict]) -> Iterator[Block]:
+    """Top-level classes and functions, and the runs of statements between them"""
+    source_lines = code.split("\n")
+    depth = 0
+    current: List[Dict] = []
+    kind, name = "statements", None
+    line_start = True
+
+    def finish():
+        lines = [token["line"] for token in current if token["type"] not in ("NEWLINE", "INDENT", "DEDENT", "EOF")]
+        if not lines:
+            return None
+        start, end = min(lines), max(lines)
+        return Block(kind, name, current, start, end, "\n".join(source_lines[start - 1:end]))
+
+    for index, token in enumerate(tokens):
+        token_type = token["type"]
+        if token_type == "INDENT":
+            depth += 1
+        elif token_type == "DEDENT":
+            depth -= 1
+        elif token_type == "EOF":
+            break
+        elif line_start and depth == 0 and token_type not in ("NEWLINE", "COMMENT"):
+            # A new top-level line: classes and functions always open a block of their own
+            position = index
+            while position < len(tokens) and tokens[position]["type"] in MODIFIERS:
+                position += 1
+            header = tokens[position]["type"] if position < len(tokens) else None
+            if header in ("CLASS", "DEFINE") or kind != "statements":
+                block = finish()
+                if block:
+                    yield block
+                current = []
+                if header in ("CLASS", "DEFINE"):
+                    following = tokens[position + 1] if position + 1 < len(tokens) else None
+                    kind = "class" if header == "CLASS" else "function"
+                    name = following["value"] if following and following["type"] == "IDENTIFIER" else None
+                else:
+                    kind, name = "statements", None
+        line_start = token_type in ("NEWLINE", "INDENT", "DEDENT")
+        current.append(token)
+
+    block = finish()
+    if block:
+        yield block
+
+
+class Frame:
+    """An open Java brace: the construct it belongs to and where its declarations go"""
+
+    def __init__(self, kind: str, name: Optional[str] = None, params: Tuple[str, ...] = ()):
+        self.kind = kind  # 'class', 'function' or 'block'
+        self.name = name
+        self.depth = 0
+        self.header_line = 0  # SOOP line of the header, relative to the block start
+        self.insert_at = 0  # Output index where hoisted declarations go
+        self.declared = set(params)  # Names already declared in place
+        self.declarations: Dict[str, str] = {}  # Hoisted fields or locals -> Java type
+
+
+class BlockTranslator:
+    def __init__(self, block: Block):
+        self.block = block
+        self.base = 1 if block.kind != "statements" else 2  # inside Main / inside main()
+        self.lines: List[Tuple[str, int]] = []
+        self.frames: List[Frame] = []
+        self.fields: Dict[str, str] = {}
+        self.pending: Optional[Frame] = None
+        self.last_line = block.start
+        self.comment: Optional[str] = None
+        self.start = 0  # Index of the current logical line's first token
+
+    def emit(self, text: str, line: int, depth: Optional[int] = None):
+        depth = len(self.frames) if depth is None else depth
+        self.lines.append((INDENT * (self.base + depth) + text if text else "", line - self.block.start))
+
+    def translate(self) -> JavaBlock:
+        logical: List[Dict] = []
+        for position, token in enumerate(self.block.tokens):
+            token_type = token["type"]
+            if token_type in ("NEWLINE", "EOF", "DEDENT"):
+                if logical:
+                    self.line(logical, self.start)
+                    logical = []
+                if token_type == "DEDENT":
+                    self.close()
+                continue
+            if token_type == "INDENT":
+                frame = self.pending or Frame("block")
+                frame.depth = len(self.frames)
+                frame.insert_at = len(self.lines)
+                self.frames.append(frame)
+                self.pending = None
+                continue
+            if token_type == "COMMENT":
+                if logical:
+                    self.comment = token["value"].lstrip("#").strip()
+                else:
+                    self.emit("// " + token["value"].lstrip("#").strip(), token["line"])
+                continue
+            self.last_line = token["line"]
+            if not logical:
+                self.start = position
+            logical.append(token)
+        if logical:
+            self.line(logical, self.start)
+        while self.frames:
+            self.close()
+        return JavaBlock(self.lines, self.fields)
+
+    def close(self):
+        if not self.frames:
+            return
+        frame = self.frames.pop()
+        self.emit("}", self.last_line)
+        if frame.kind in ("class", "function") and frame.declarations:
+            # Fields of a class, or locals first assigned inside nested blocks of a function
+            declarations = []
+            for name, java_type in frame.declarations.items():
+                if frame.kind == "class":
+                    text = f"{java_type} {name};"
+                else:
+                    text = f"{java_type} {name} = {DEFAULT_VALUES.get(java_type, 'null')};"
+                declarations.append((INDENT * (self.base + frame.depth + 1) + text, frame.header_line))
+            self.lines[frame.insert_at:frame.insert_at] = declarations
+            for other in self.frames:
+                if other.insert_at > frame.insert_at:
+                    other.insert_at += len(declarations)
+
+    # ------------------------------------------------------------ statements
+
+    def name(self, token: Dict) -> str:
+        value = token["value"]
+        return value + "_" if value in JAVA_KEYWORDS else value
+
+    def open(self, text: str, line: int, frame: Optional[Frame] = None):
+        """Emit a header line; its block opens at the following INDENT"""
+        if frame is not None:
+            frame.header_line = line - self.block.start
+        self.emit(text + " {", line)
+        self.pending = frame
+
+    def line(self, tokens: List[Dict], start: int):
+        line = tokens[0]["line"]
+        modifiers = []
+        override = False
+        while tokens and (tokens[0]["type"] in MODIFIERS or tokens[0]["type"] == "OVERRIDE"):
+            if tokens[0]["type"] == "OVERRIDE":
+                override = True
+            else:
+                modifiers.append(MODIFIERS[tokens[0]["type"]])
+            tokens = tokens[1:]
+        if not tokens:
+            return
+        first = tokens[0]["type"]
+        header = tokens[-1]["type"] == "COLON"
+        body = tokens[:-1] if header else tokens
+
+        if first == "CLASS":
+            if len(body) < 2 or body[1]["type"] != "IDENTIFIER":
+                raise TranspileError(line, "Invalid class definition")
+            name = self.name(body[1])
+            text = f"static class {name}"
+            if len(body) > 3 and body[2]["type"] == "INHERITS":
+                text += f" extends {self.name(body[3])}"
+            self.open(" ".join(modifiers + [text]), line, Frame("class", name))
+        elif first in ("SETUP", "ACTION", "STATIC", "DEFINE"):
+            self.method(body, modifiers, override, line, start)
+        elif first == "IF":
+            self.open(f"if ({self.expression(body[1:])})", line)
+        elif first == "ELSE":
+            if len(body) > 1 and body[1]["type"] == "IF":
+                self.open(f"else if ({self.expression(body[2:])})", line)
+            else:
+                self.open("else", line)
+        elif first == "WHILE":
+            self.open(f"while ({self.expression(body[1:])})", line)
+        elif first == "FOR":
+            self.for_loop(body, line)
+        elif first == "TRY":
+            self.open("try", line)
+        elif first == "CATCH":
+            variable = self.name(body[1]) if len(body) > 1 and body[1]["type"] == "IDENTIFIER" else "e"
+            self.open(f"catch (Exception {variable})", line)
+        elif first == "FINALLY":
+            self.open("finally", line)
+        elif header:
+            raise TranspileError(line, f"'{tokens[0]['value']}' blocks cannot be translated to Java")
+        else:
+            self.statement(body, line)
+
+    def statement(self, tokens: List[Dict], line: int):
+        first = tokens[0]["type"]
+        if first == "PRINT":
+            text = self.print_call(tokens)
+        elif first == "RETURN":
+            if len(tokens) == 1:
+                text = "return"
+            else:
+                text = f"return {self.expression(tokens[1:])}"
+        elif first in ("BREAK", "CONTINUE"):
+            text = tokens[0]["value"]
+        elif first == "RAISE":
+            text = f"throw new RuntimeException(String.valueOf({self.expression(tokens[1:])}))"
+        elif first in ("IMPORT", "SWITCH", "ASYNC", "AWAIT", "CONCURRENT", "THREAD", "DELEGATE",
+                       "YIELD", "TEMPLATE", "CREATE", "DELETE", "IMMUTABLE", "DEF"):
+            raise TranspileError(line, f"'{tokens[0]['value']}' cannot be translated to Java")
+        else:
+            text = self.assignment(tokens, line)
+        if self.comment:
+            text += f"; // {self.comment}"
+            self.comment = None
+            self.emit(text, line)
+        else:
+            self.emit(text + ";", line)
+
+    def assignment(self, tokens: List[Dict], line: int) -> str:
+        declared_type = None
+        if tokens[0]["type"] in JAVA_TYPES and len(tokens) > 1 and tokens[1]["type"] == "IDENTIFIER":
+            declared_type = JAVA_TYPES[tokens[0]["type"]]
+            tokens = tokens[1:]
+
+        operator = next((index for index, token in enumerate(tokens)
+                         if token["type"] in ASSIGNMENT_OPERATORS), None)
+        if operator is None:
+            if len(tokens) == 2 and tokens[1]["type"] in ("INCREMENT", "DECREMENT"):
+                return self.expression(tokens[:1]) + tokens[1]["value"]
+            return self.expression(tokens)
+
+        targets = self.split(tokens[:operator])
+        values = self.split(tokens[operator + 1:])
+        symbol = DIRECT.get(tokens[operator]["type"], tokens[operator]["value"])
+        if len(targets) != len(values):
+            raise TranspileError(line, "Unpacking assignments cannot be translated to Java")
+        statements = []
+        for target, value in zip(targets, values):
+            expression = self.expression(value)
+            if len(target) == 1 and target[0]["type"] == "IDENTIFIER" and tokens[operator]["type"] == "ASSIGN":
+                statements.append(self.declare(self.name(target[0]), declared_type or self.infer(value), expression,
+                                               declared_type is not None))
+            else:
+                if len(target) == 3 and target[0]["type"] == "THIS" and target[2]["type"] == "IDENTIFIER":
+                    owner = next((frame for frame in reversed(self.frames) if frame.kind == "class"), None)
+                    if owner is not None:
+                        owner.declarations.setdefault(self.name(target[2]), self.infer(value) or "Object")
+                statements.append(f"{self.expression(target)} {symbol} {expression}")
+        return "; ".join(statements)
+
+    def declare(self, name: str, java_type: Optional[str], expression: str, explicit: bool) -> str:
+        """Assignment to a plain name: the first one declares it in the enclosing function or as a field"""
+        function = next((frame for frame in reversed(self.frames) if frame.kind == "function"), None)
+        if function is None:
+            if self.frames and self.frames[-1].kind == "class":
+                # Class body variable: a field with an initializer
+                return f"{java_type or 'Object'} {name} = {expression}"
+            # Module variable: a static field of Main
+            self.fields.setdefault(name, java_type or "Object")
+            return f"{name} = {expression}"
+        if name in function.declarations or name in function.declared:
+            return f"{name} = {expression}"
+        if self.frames[-1] is function:
+            function.declared.add(name)
+            return f"{java_type if explicit else 'var'} {name} = {expression}"
+        # First assigned inside a nested block: hoist the declaration to the function body
+        function.declarations[name] = java_type or "Object"
+        return f"{name} = {expression}"
+
+    def infer(self, tokens: List[Dict]) -> Optional[str]:
+        if len(tokens) == 1:
+            return LITERAL_TYPES.get(tokens[0]["type"])
+        if len(tokens) > 1 and tokens[0]["type"] == "NEW" and tokens[1]["type"] == "IDENTIFIER":
+            return self.name(tokens[1])
+        return None
+
+    def method(self, tokens: List[Dict], modifiers: List[str], override: bool, line: int, start: int):
+        static = tokens[0]["type"] == "STATIC"
+        if static:
+            tokens = tokens[1:]
+        kind = tokens[0]["type"] if tokens else None
+        owner = next((frame for frame in reversed(self.frames) if frame.kind == "class"), None)
+        in_class = owner is not None and self.frames[-1] is owner
+        if kind == "SETUP":
+            name, rest = owner.name if owner else MAIN_CLASS, tokens[1:]
+        elif kind in ("ACTION", "DEFINE") and len(tokens) > 1 and tokens[1]["type"] == "IDENTIFIER":
+            name, rest = self.name(tokens[1]), tokens[2:]
+        else:
+            raise TranspileError(line, "Invalid method definition")
+        params = [(index, token) for index, token in enumerate(rest) if token["type"] == "IDENTIFIER"]
+        numeric = self.numeric_params(start, {token["value"] for _, token in params})
+        signature = []
+        for index, token in params:
+            declared = JAVA_TYPES.get(rest[index - 1]["type"]) if index else None
+            java_type = declared or ("double" if token["value"] in numeric else "Object")
+            signature.append(f"{java_type} {self.name(token)}")
+
+        frame = Frame("function", name, tuple(self.name(token) for _, token in params))
+        if override:
+            self.emit("@Override", line)
+        if not modifiers and kind != "DEFINE":
+            modifiers = ["public"]
+        if static or kind == "DEFINE" or not in_class:
+            modifiers.append("static")
+        if kind == "SETUP":
+            text = f"{name}({', '.join(signature)})"
+        else:
+            returns = "Object" if self.returns_value(start) else "void"
+            text = f"{returns} {name}({', '.join(signature)})"
+        self.open(" ".join(modifiers + [text]), line, frame)
+
+    def returns_value(self, start: int) -> bool:
+        """Whether the function whose header starts at token index start returns a value"""
+        tokens = self.block.tokens
+        depth = 0
+        for index in range(start, len(tokens)):
+            token_type = tokens[index]["type"]
+            if token_type == "INDENT":
+                depth += 1
+            elif token_type == "DEDENT":
+                depth -= 1
+                if depth == 0:
+                    return False
+            elif token_type == "RETURN" and depth > 0 and index + 1 < len(tokens):
+                if tokens[index + 1]["type"] not in ("NEWLINE", "DEDENT", "EOF", "COMMENT"):
+                    return True
+        return False
+
+    def numeric_params(self, start: int, names: Set[str]) -> Set[str]:
+        """Parameters among names that the body of the function starting at token index start uses as numbers"""
+        tokens = self.block.tokens
+        body: List[Dict] = []
+        depth = 0
+        for index in range(start, len(tokens)):
+            token_type = tokens[index]["type"]
+            if token_type == "INDENT":
+                depth += 1
+            elif token_type == "DEDENT":
+                depth -= 1
+                if depth == 0:
+                    break
+            elif depth > 0:
+                body.append(tokens[index])
+
+        def numeric_operand(index: int) -> bool:
+            if not 0 <= index < len(body):
+                return False
+            token = body[index]
+            return token["type"] in NUMERIC_LITERALS or (token["type"] == "IDENTIFIER" and token["value"] in numeric)
+
+        numeric: Set[str] = set()
+        for index, token in enumerate(body):
+            if token["type"] == "RANGE" and index + 1 < len(body) and body[index + 1]["type"] == "LPAREN":
+                nesting = 0
+                for end in range(index + 1, len(body)):
+                    nesting += {"LPAREN": 1, "RPAREN": -1}.get(body[end]["type"], 0)
+                    if nesting == 0:
+                        break
+                numeric.update(part[0]["value"] for part in self.split(body[index + 2:end])
+                               if len(part) == 1 and part[0]["type"] == "IDENTIFIER" and part[0]["value"] in names)
+        changed = True
+        while changed:
+            # A parameter added to a numeric parameter is numeric too, so repeat until nothing changes
+            changed = False
+            for index, token in enumerate(body):
+                if token["type"] != "IDENTIFIER" or token["value"] not in names or token["value"] in numeric:
+                    continue
+                before = body[index - 1]["type"] if index else None
+                after = body[index + 1]["type"] if index + 1 < len(body) else None
+                if before == "DOT" or after in ("DOT", "LPAREN"):
+                    continue
+                if (before in NUMERIC_OPERATORS or after in NUMERIC_OPERATORS
+                        or (before in ("PLUS", "PLUS_ASSIGN") and numeric_operand(index - 2))
+                        or (after in ("PLUS", "PLUS_ASSIGN") and numeric_operand(index + 2))):
+                    numeric.add(token["value"])
+                    changed = True
+        return numeric
+
+    def for_loop(self, tokens: List[Dict], line: int):
+        if len(tokens) < 4 or tokens[1]["type"] != "IDENTIFIER" or tokens[2]["type"] != "IN":
+            raise TranspileError(line, "Invalid for loop")
+        variable = self.name(tokens[1])
+        iterable = tokens[3:]
+        if iterable and iterable[0]["type"] == "RANGE":
+            bounds = [self.expression(part) for part in self.split(iterable[2:-1])]
+            start, end, step = "0", None, None
+            if len(bounds) == 1:
+                end = bounds[0]
+            elif len(bounds) >= 2:
+                start, end = bounds[0], bounds[1]
+                step = bounds[2] if len(bounds) > 2 else None
+            if end is None:
+                raise TranspileError(line, "range() needs an end value")
+            increment = f"{variable} += {step}" if step else f"{variable}++"
+            self.open(f"for (int {variable} = {start}; {variable} < {end}; {increment})", line)
+        else:
+            self.open(f"for (var {variable} : {self.expression(iterable)})", line)
+
+    def print_call(self, tokens: List[Dict]) -> str:
+        arguments = [self.expression(part) for part in self.split(tokens[2:-1])]
+        if not arguments:
+            return "System.out.println()"
+        if len(arguments) == 1:
+            return f"System.out.println({arguments[0]})"
+        return f"System.out.println(String.valueOf({arguments[0]}) + \" \" + " + " + \" \" + ".join(arguments[1:]) + ")"
+
+    # ----------------------------------------------------------- expressions
+
+    @staticmethod
+    def split(tokens: List[Dict]) -> List[List[Dict]]:
+        """Split at top-level commas"""
+        parts: List[List[Dict]] = [[]]
+        nesting = 0
+        for token in tokens:
+            token_type = token["type"]
+            if token_type in ("LPAREN", "LBRACE"):
+                nesting += 1
+            elif token_type in ("RPAREN", "RBRACE"):
+                nesting -= 1
+            if token_type == "COMMA" and nesting == 0:
+                parts.append([])
+            else:
+                parts[-1].append(token)
+        return parts if parts[0] or len(parts) > 1 else []
+
+    def expression(self, tokens: List[Dict]) -> str:
+        parts: List[str] = []
+        count = len(tokens)
+        index = 0
+        previous = None
+        while index < count:
+            token = tokens[index]
+            token_type = token["type"]
+            if token_type == "IDENTIFIER":
+                part = self.name(token)
+            elif token_type in ("INTEGER_LITERAL", "FLOAT_LITERAL"):
+                part = str(token["value"]).replace("_", "")
+            elif token_type == "STRING_LITERAL":
+                part = java_string(unescape(token["value"]))
+            elif token_type == "PARENT":
+                # parent.setup(...) is the superclass constructor call super(...)
+                if index + 2 < count and tokens[index + 1]["type"] == "DOT" and tokens[index + 2]["type"] == "SETUP":
+                    index += 2
+                    token_type = "IDENTIFIER"
+                part = "super"
+            elif token_type == "RANGE":
+                part = "java.util.stream.IntStream.range"
+            elif token_type == "SETUP":
+                part = "setup"
+            elif token_type in DIRECT:
+                part = DIRECT[token_type]
+            else:
+                part = str(token["value"])
+            if parts and not self.joined(previous, token_type):
+                parts.append(" ")
+            parts.append(part)
+            # A sign at the start of an operand sticks to it
+            if token_type in ("MINUS", "PLUS") and (previous is None or previous not in OPERAND_END):
+                token_type = "UNARY"
+            previous = token_type
+            index += 1
+        return "".join(parts)
+
+    @staticmethod
+    def joined(previous: str, current: str) -> bool:
+        """Whether two adjacent tokens are written without a space"""
+        if previous in ("LPAREN", "DOT", "LOGICAL_NOT", "UNARY") or current in ("RPAREN", "DOT", "COMMA"):
+            return True
+        return current == "LPAREN" and previous in CALLABLE
+
+
+def java_string(value: str) -> str:
+    escaped = (value.replace("\\", "\\\\").replace("\"", "\\\"")
+               .replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t"))
+    return f"\"{escaped}\""
+
+
+class BlockCache:
+    """Translated blocks keyed by the hash of their source text"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, JavaBlock]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_translate(self, block: Block) -> Tuple[JavaBlock, bool]:
+        with self.lock:
+            translated = self.entries.get(block.digest)
+            if translated is not None:
+                self.entries.move_to_end(block.digest)
+                self.hits += 1
+                return translated, True
+            self.misses += 1
+        translated = BlockTranslator(block).translate()
+        with self.lock:
+            self.entries[block.digest] = translated
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return translated, False
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {"blocks": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+class JavaTranspiler:
+    def __init__(self, cache: BlockCache):
+        self.cache = cache
+
+    def stream(self, code: str, tokens: List[Dict]) -> Iterator[Dict]:
+        """
+        Java output in chunks: the prologue, one chunk per class or function as
+        soon as it is translated, and a final chunk with the module fields and
+        main(). Each chunk has 'java', its first Java line and 'map' (the SOOP
+        line of every Java line, 0 for generated lines).
+        """
+        java_line = 1
+        yield {"java": "\n".join(PROLOGUE) + "\n", "first_line": java_line, "map": [0] * len(PROLOGUE)}
+        java_line += len(PROLOGUE)
+
+        fields: Dict[str, str] = {}
+        statements: List[Tuple[str, int]] = []
+        for block in split_blocks(code, tokens):
+            translated, cached = self.cache.get_or_translate(block)
+            for name, java_type in translated.fields.items():
+                if fields.get(name, java_type) != java_type:
+                    java_type = "Object"
+                fields[name] = java_type
+            lines = [(text, block.start + offset) for text, offset in translated.lines]
+            if block.kind == "statements":
+                statements.extend(lines)
+                continue
+            lines.append(("", 0))
+            yield {
+                "java": "".join(text + "\n" for text, _ in lines),
+                "first_line": java_line,
+                "map": [line for _, line in lines],
+                "block": {"kind": block.kind, "name": block.name, "lines": [block.start, block.end], "cached": cached}
+            }
+            java_line += len(lines)
+
+        lines = [(f"{INDENT}static {java_type} {name};", 0) for name, java_type in fields.items()]
+        if lines:
+            lines.append(("", 0))
+        lines.append((f"{INDENT}public static void main(String[] args) {{", 0))
+        lines.extend(statements)
+        lines.extend([(f"{INDENT}}}", 0), ("}", 0)])
+        yield {
+            "java": "".join(text + "\n" for text, _ in lines),
+            "first_line": java_line,
+            "map": [line for _, line in lines],
+            "block": {"kind": "main", "name": "main", "lines": None, "cached": None}
+        }
+
+    def transpile(self, code: str, tokens: List[Dict]) -> Tuple[str, List[int]]:
+        """Whole Java source and its source map (SOOP line per Java line)"""
+        java: List[str] = []
+        source_map: List[int] = []
+        for chunk in self.stream(code, tokens):
+            java.append(chunk["java"])
+            source_map.extend(chunk["map"])
+        return "".join(java), source_map
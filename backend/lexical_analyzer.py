@@ -1,13 +1,88 @@
-from typing import List, Dict, Tuple, Optional
+from sys import intern
+from typing import List, Dict, Tuple, Optional, Callable
 from token_definitions import *
 from soop_token import Token
+from symbols import RESERVED_WORDS, RESERVED_VALUES
+from error import AnalysisCancelled
+
+# Indentation stack snapshot taken at a line boundary
+Checkpoint = Tuple[int, ...]
+
+class LexState:
+    """
+    Line-indexed lexer output that LexicalAnalyzer.relex() can update in place.
+    Content tokens of a line never depend on other lines; only INDENT/DEDENT
+    tokens do, through the indentation stack. checkpoints[i] is the stack
+    before line i (len(lines) + 1 entries), so an edit relexes the edited lines
+    and recomputes indentation only until the stack matches the old checkpoint.
+    """
+    def __init__(self):
+        self.lines: List[str] = []
+        # Per line: (type, value, start, end) content tokens and their errors (without line)
+        self.content: List[List[Tuple[str, str, int, int]]] = []
+        self.content_errors: List[List[Dict]] = []
+        # Per line: (type, value) INDENT/DEDENT tokens and inconsistent-indentation flag
+        self.indents: List[List[Tuple[str, int]]] = []
+        self.indent_errors: List[bool] = []
+        self.checkpoints: List[Checkpoint] = [(0,)]
+        # Per line: (line number, token dicts) built lazily by tokens()
+        self._dicts: List[Optional[Tuple[int, List[Dict]]]] = []
+
+    def _is_empty(self) -> bool:
+        return not self.lines or (len(self.lines) == 1 and not self.lines[0])
+
+    def tokens(self) -> List[Dict]:
+        """Token dicts identical to LexicalAnalyzer.tokenize()"""
+        if self._is_empty():
+            return [Token(TOKEN_EOF, "", 1).to_dict()]
+
+        tokens: List[Dict] = []
+        last = len(self.lines)
+        for index in range(last):
+            line_num = index + 1
+            cached = self._dicts[index]
+            if cached is None:
+                line_tokens = [{"type": token_type, "value": value, "line": line_num}
+                               for token_type, value in self.indents[index]]
+                line_tokens.extend({"type": token_type, "value": value, "line": line_num}
+                                   for token_type, value, _, _ in self.content[index])
+                self._dicts[index] = cached = (line_num, line_tokens)
+            elif cached[0] != line_num:
+                for token in cached[1]:
+                    token["line"] = line_num
+                self._dicts[index] = cached = (line_num, cached[1])
+            tokens.extend(cached[1])
+            if line_num < last:
+                tokens.append({"type": TOKEN_NEWLINE, "value": "\n", "line": line_num})
+
+        for _ in self.checkpoints[-1][1:]:
+            tokens.append({"type": TOKEN_DEDENT, "value": 0, "line": last})
+        tokens.append({"type": TOKEN_EOF, "value": "", "line": last})
+        return tokens
+
+    def errors(self) -> List[Dict]:
+        """Error dicts identical to LexicalAnalyzer.tokenize()"""
+        if self._is_empty():
+            return []
+        errors = []
+        for index in range(len(self.lines)):
+            line_num = index + 1
+            if self.indent_errors[index]:
+                errors.append({
+                    "message": f"Inconsistent indentation at line {line_num}",
+                    "line": line_num
+                })
+            for error in self.content_errors[index]:
+                errors.append(dict(error, line=line_num))
+        return errors
 
 class LexicalAnalyzer:
-    def __init__(self, code: str):
+    def __init__(self, code: str, cancel_check: Optional[Callable[[], bool]] = None):
         self.code = code
         self.tokens: List[Token] = []
         self.errors: List[Dict] = []
         self.indentation_stack = [0]  
+        self.cancel_check = cancel_check
 
     def match_string(self, line: str, pos: int, line_num: int) -> Tuple[int, Optional[Token], Optional[str]]:
         quote = line[pos]
@@ -117,14 +192,10 @@ class LexicalAnalyzer:
                 
         word = line[pos:end]
         
-        if word in KEYWORDS:
-            return end, Token(KEYWORDS[word], word, line_num)
-        elif word in DATA_TYPES:
-            return end, Token(DATA_TYPES[word], word, line_num)
-        elif word in BOOL_VALUES:
-            return end, Token(BOOL_VALUES[word], word, line_num)
-        else:
-            return end, Token(TOKEN_IDENTIFIER, word, line_num)
+        token_type = RESERVED_WORDS.get(word)
+        if token_type is not None:
+            return end, Token(token_type, RESERVED_VALUES[word], line_num)
+        return end, Token(TOKEN_IDENTIFIER, intern(word), line_num)
 
     def handle_indentation(self, line: str, line_num: int) -> List[Token]:
         tokens = []
@@ -152,6 +223,166 @@ class LexicalAnalyzer:
                 
         return tokens
     
+    def lex_line(self, line: str, line_num: int, spans: Optional[List[Tuple[int, int]]] = None):
+        """
+        Lex the content of a single line (indentation excluded) into self.tokens
+        When spans is given, the (start, end) column range of each token is appended to it
+        """
+        pos = 0
+        line = line.rstrip() 
+        
+        while pos < len(line):
+            column = pos + 1  
+            
+            if line[pos].isspace():
+                pos += 1
+                continue
+            
+            if line[pos] == '#':
+                comment = line[pos:].strip()
+                self.tokens.append(Token(TOKEN_COMMENT, comment, line_num))
+                if spans is not None:
+                    spans.append((pos, len(line)))
+                break
+            
+            if line[pos] in '"\'':
+                result = self.match_string(line, pos, line_num)
+                if result:
+                    new_pos, token, error = result
+                    if error:
+                        self.errors.append({
+                            "message": error,
+                            "line": line_num,
+                            "column": column
+                        })
+                    if token:
+                        self.tokens.append(token)
+                        if spans is not None:
+                            spans.append((pos, new_pos))
+                    pos = new_pos
+                    continue
+            
+            if line[pos].isdigit() or (line[pos] == '.' and pos + 1 < len(line) and line[pos + 1].isdigit()):
+                result = self.match_number(line, pos, line_num)
+                if result:
+                    new_pos, token = result
+                    self.tokens.append(token)
+                    if spans is not None:
+                        spans.append((pos, new_pos))
+                    pos = new_pos
+                    continue
+            
+            if line[pos].isalpha() or line[pos] == '_':
+                result = self.match_identifier(line, pos, line_num)
+                if result:
+                    new_pos, token = result
+                    self.tokens.append(token)
+                    if spans is not None:
+                        spans.append((pos, new_pos))
+                    pos = new_pos
+                    continue
+            
+            symbol_matched = False
+            for symbol, token_type in SYMBOLS:
+                if line[pos:].startswith(symbol):
+                    self.tokens.append(Token(token_type, symbol, line_num))
+                    if spans is not None:
+                        spans.append((pos, pos + len(symbol)))
+                    pos += len(symbol)
+                    symbol_matched = True
+                    break
+            
+            if symbol_matched:
+                continue
+            
+            self.errors.append({
+                "message": f"Unknown character: {line[pos]}",
+                "line": line_num,
+                "column": column
+            })
+            self.tokens.append(Token(TOKEN_UNKNOWN, line[pos], line_num))
+            if spans is not None:
+                spans.append((pos, pos + 1))
+            pos += 1
+    
+    def _lex_content(self, line: str) -> Tuple[List[Tuple[str, str, int, int]], List[Dict]]:
+        self.tokens = []
+        self.errors = []
+        spans: List[Tuple[int, int]] = []
+        self.lex_line(line, 0, spans)
+        content = [(token.type, token.value, start, end)
+                   for token, (start, end) in zip(self.tokens, spans)]
+        for error in self.errors:
+            del error["line"]
+        return content, self.errors
+
+    def _lex_indent(self, line: str, stack: Checkpoint) -> Tuple[List[Tuple[str, int]], bool, Checkpoint]:
+        if not line.strip():
+            return [], False, stack
+        self.indentation_stack = list(stack)
+        self.errors = []
+        tokens = self.handle_indentation(line, 0)
+        return [(token.type, token.value) for token in tokens], bool(self.errors), tuple(self.indentation_stack)
+
+    def tokenize_state(self) -> LexState:
+        """Lex self.code into a LexState that relex() can update incrementally"""
+        state = LexState()
+        self.relex(state, 0, 0, self.code)
+        return state
+
+    def relex(self, state: LexState, start: int, end: int, text: str) -> int:
+        """
+        Replace lines [start, end) of state with the lines of text.
+        Only the new lines are lexed; indentation is recomputed from the
+        checkpoint at start until the stack converges with the old checkpoints.
+        Returns the number of lines whose tokens were recomputed.
+        """
+        return self.relex_lines(state, start, end, text.splitlines())
+
+    def relex_lines(self, state: LexState, start: int, end: int, new_lines: List[str]) -> int:
+        """Same as relex() for callers that already split the replacement into lines"""
+        lexed = [self._lex_content(line) for line in new_lines]
+        state.lines[start:end] = new_lines
+        state.content[start:end] = [content for content, _ in lexed]
+        state.content_errors[start:end] = [errors for _, errors in lexed]
+        state._dicts[start:end] = [None] * len(new_lines)
+
+        checkpoints = state.checkpoints
+        shift = (end - start) - len(new_lines)
+        edited_end = start + len(new_lines)
+        stacks = [checkpoints[start]]
+        indents = []
+        indent_errors = []
+        index = start
+        converged = False
+        while index < len(state.lines):
+            # Past the edit, an unchanged stack means every following line is unchanged too
+            if index >= edited_end and stacks[-1] == checkpoints[index + shift]:
+                converged = True
+                break
+            line_indents, has_error, stack = self._lex_indent(state.lines[index], stacks[-1])
+            indents.append(line_indents)
+            indent_errors.append(has_error)
+            stacks.append(stack)
+            index += 1
+
+        # Splice in place so the cost stays proportional to the relexed region
+        old_index = index + shift if converged else len(state.indents)
+        state.indents[start:old_index] = indents
+        state.indent_errors[start:old_index] = indent_errors
+        if converged:
+            checkpoints[start:old_index] = stacks[:-1]
+        else:
+            checkpoints[start:] = stacks
+
+        for line_index in range(edited_end, index):
+            state._dicts[line_index] = None
+        return index - start
+
+    def token_count(self) -> int:
+        """Tokens produced so far, for progress checks made while tokenize() runs"""
+        return len(self.tokens)
+
     def tokenize(self) -> Tuple[List[Dict], List[Dict]]:
 
         lines = self.code.splitlines()
@@ -160,76 +391,17 @@ class LexicalAnalyzer:
             self.tokens.append(Token(TOKEN_EOF, "", 1))
             return [token.to_dict() for token in self.tokens], self.errors
 
+        cancel_check = self.cancel_check
         for line_num, line in enumerate(lines, 1):
  
+            if cancel_check and cancel_check():
+                raise AnalysisCancelled()
+            
             if line.strip():
                 indent_tokens = self.handle_indentation(line, line_num)
                 self.tokens.extend(indent_tokens)
                 
-            pos = 0
-            line = line.rstrip() 
-            
-            while pos < len(line):
-                column = pos + 1  
-                
-                if line[pos].isspace():
-                    pos += 1
-                    continue
-                
-                if line[pos] == '#':
-                    comment = line[pos:].strip()
-                    self.tokens.append(Token(TOKEN_COMMENT, comment, line_num))
-                    break  
-                
-                if line[pos] in '"\'':
-                    result = self.match_string(line, pos, line_num)
-                    if result:
-                        new_pos, token, error = result
-                        if error:
-                            self.errors.append({
-                                "message": error,
-                                "line": line_num,
-                                "column": column
-                            })
-                        if token:
-                            self.tokens.append(token)
-                        pos = new_pos
-                        continue
-                
-                if line[pos].isdigit() or (line[pos] == '.' and pos + 1 < len(line) and line[pos + 1].isdigit()):
-                    result = self.match_number(line, pos, line_num)
-                    if result:
-                        new_pos, token = result
-                        self.tokens.append(token)
-                        pos = new_pos
-                        continue
-                
-                if line[pos].isalpha() or line[pos] == '_':
-                    result = self.match_identifier(line, pos, line_num)
-                    if result:
-                        new_pos, token = result
-                        self.tokens.append(token)
-                        pos = new_pos
-                        continue
-                
-                symbol_matched = False
-                for symbol, token_type in SYMBOLS:
-                    if line[pos:].startswith(symbol):
-                        self.tokens.append(Token(token_type, symbol, line_num))
-                        pos += len(symbol)
-                        symbol_matched = True
-                        break
-                
-                if symbol_matched:
-                    continue
-                
-                self.errors.append({
-                    "message": f"Unknown character: {line[pos]}",
-                    "line": line_num,
-                    "column": column
-                })
-                self.tokens.append(Token(TOKEN_UNKNOWN, line[pos], line_num))
-                pos += 1
+            self.lex_line(line, line_num)
             
             if line_num < len(lines):
                 self.tokens.append(Token(TOKEN_NEWLINE, "\n", line_num))
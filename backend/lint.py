@@ -0,0 +1,282 @@
+"""
+Pluggable lint rules run in a single traversal.
+Rules declare the event kinds they care about: raw token types ("PRINT",
+"COMMENT", ...) or the structural events the dispatcher derives while
+walking the tokens once:
+
+    class / class_end          name, line (class_end: end_line)
+    function / function_end    name, line, params (..._end: end_line)
+    method / method_end        name, line, params, class (..._end: end_line)
+    parameter                  name, line
+    assignment                 name, line, augmented, loop
+    reference                  name, line
+
+The dispatcher hands each event only to the enabled rules subscribed to its
+kind, so the cost stays one pass however many rules are enabled.
+"""
+import re
+import threading
+import time
+from typing import List, Dict, Optional, Type
+
+from semantic_analyzer import ASSIGNMENT_OPERATORS, NON_VARIABLE_CONTEXT, header_name, parameters
+
+LINT_ERROR_TYPE = "Lint Warning"
+
+STRUCTURE_TOKENS = {"NEWLINE", "INDENT", "DEDENT", "EOF"}
+
+
+class LintRule:
+    """Base class for rules; a fresh instance is created for every run"""
+    name = ""
+    kinds: tuple = ()
+    description = ""
+
+    def __init__(self, options: Dict):
+        self.options = options
+        self.findings: List[Dict] = []
+
+    def report(self, line: int, message: str):
+        self.findings.append({
+            "type": LINT_ERROR_TYPE,
+            "rule": self.name,
+            "line": line,
+            "message": message
+        })
+
+    def visit(self, kind: str, node: Dict):
+        pass
+
+    def finish(self):
+        pass
+
+
+class NamingRule(LintRule):
+    name = "naming"
+    kinds = ("class", "function", "method", "assignment")
+    description = "Classes use PascalCase; functions, methods and variables start lowercase"
+
+    CLASS_NAME = re.compile(r"^[A-Z][A-Za-z0-9]*$")
+    MEMBER_NAME = re.compile(r"^_*[a-z][A-Za-z0-9_]*$")
+    CONSTANT_NAME = re.compile(r"^[A-Z][A-Z0-9_]*$")
+
+    def visit(self, kind: str, node: Dict):
+        name = node["name"]
+        if kind == "class":
+            if not self.CLASS_NAME.match(name):
+                self.report(node["line"], f"Class name '{name}' should be PascalCase")
+        elif kind == "assignment":
+            if not node["loop"] and not self.MEMBER_NAME.match(name) and not self.CONSTANT_NAME.match(name):
+                self.report(node["line"], f"Variable name '{name}' should start with a lowercase letter")
+        elif name != "setup" and not self.MEMBER_NAME.match(name):
+            self.report(node["line"], f"{kind.capitalize()} name '{name}' should start with a lowercase letter")
+
+
+class UnusedVariableRule(LintRule):
+    name = "unused-variable"
+    kinds = ("function", "method", "function_end", "method_end", "assignment", "reference")
+    description = "Local variables of functions and methods are read somewhere"
+
+    def __init__(self, options: Dict):
+        super().__init__(options)
+        # One frame per open function or method: (assigned name -> first line, read names)
+        self.frames: List[tuple] = []
+
+    def visit(self, kind: str, node: Dict):
+        if kind in ("function", "method"):
+            self.frames.append(({}, set()))
+        elif kind in ("function_end", "method_end"):
+            if self.frames:
+                assigned, read = self.frames.pop()
+                for name, line in assigned.items():
+                    if name not in read:
+                        self.report(line, f"Variable '{name}' is assigned but never used")
+                if self.frames:
+                    # Nested functions may read the enclosing function's variables
+                    self.frames[-1][1].update(read)
+        elif not self.frames:
+            return
+        elif kind == "assignment":
+            if node["augmented"]:
+                self.frames[-1][1].add(node["name"])
+            elif not node["loop"]:
+                self.frames[-1][0].setdefault(node["name"], node["line"])
+        else:
+            self.frames[-1][1].add(node["name"])
+
+
+class LongMethodRule(LintRule):
+    name = "long-method"
+    kinds = ("function_end", "method_end")
+    description = "Functions and methods stay under a line limit"
+
+    def visit(self, kind: str, node: Dict):
+        limit = self.options.get("max_method_lines", 30)
+        length = node["end_line"] - node["line"] + 1
+        if length > limit:
+            what = "Function" if kind == "function_end" else "Method"
+            self.report(node["line"], f"{what} '{node['name']}' is {length} lines long (limit {limit})")
+
+
+DEFAULT_RULES: List[Type[LintRule]] = [NamingRule, UnusedVariableRule, LongMethodRule]
+
+
+class LintEngine:
+    def __init__(self, rules: Optional[List[Type[LintRule]]] = None, options: Optional[Dict] = None,
+                 disabled: Optional[List[str]] = None):
+        self.rules: Dict[str, Type[LintRule]] = {}
+        self.enabled: Dict[str, bool] = {}
+        self.options = options or {}
+        self.lock = threading.Lock()
+        self.timings: Dict[str, Dict] = {}
+        for rule in rules if rules is not None else DEFAULT_RULES:
+            self.register(rule)
+        for name in disabled or []:
+            self.disable(name)
+
+    def register(self, rule: Type[LintRule], enabled: bool = True):
+        self.rules[rule.name] = rule
+        self.enabled[rule.name] = enabled
+        self.timings.setdefault(rule.name, {"runs": 0, "events": 0, "seconds": 0.0, "findings": 0})
+
+    def enable(self, name: str):
+        if name not in self.rules:
+            raise KeyError(f"Unknown lint rule '{name}'")
+        self.enabled[name] = True
+
+    def disable(self, name: str):
+        if name not in self.rules:
+            raise KeyError(f"Unknown lint rule '{name}'")
+        self.enabled[name] = False
+
+    def run(self, tokens: List[Dict]) -> List[Dict]:
+        rules = [rule(self.options) for name, rule in self.rules.items() if self.enabled[name]]
+        handlers: Dict[str, List[LintRule]] = {}
+        for rule in rules:
+            for kind in rule.kinds:
+                handlers.setdefault(kind, []).append(rule)
+        elapsed = {rule.name: 0.0 for rule in rules}
+        events = {rule.name: 0 for rule in rules}
+        clock = time.perf_counter
+
+        def emit(kind: str, node: Dict):
+            for rule in handlers.get(kind, ()):
+                start = clock()
+                rule.visit(kind, node)
+                elapsed[rule.name] += clock() - start
+                events[rule.name] += 1
+
+        if handlers:
+            self._dispatch(tokens, handlers, emit)
+
+        findings: List[Dict] = []
+        for rule in rules:
+            start = clock()
+            rule.finish()
+            elapsed[rule.name] += clock() - start
+            findings.extend(rule.findings)
+
+        with self.lock:
+            for rule in rules:
+                timing = self.timings[rule.name]
+                timing["runs"] += 1
+                timing["events"] += events[rule.name]
+                timing["seconds"] += elapsed[rule.name]
+                timing["findings"] += len(rule.findings)
+
+        findings.sort(key=lambda finding: finding["line"])
+        return findings
+
+    def _dispatch(self, tokens: List[Dict], handlers: Dict[str, List[LintRule]], emit):
+        """Walk the tokens once, emitting token events and the derived structural events"""
+        blocks: List[Optional[Dict]] = []  # open INDENTs: the node they opened, or None
+        pending: Optional[Dict] = None  # class/function/method header waiting for its INDENT
+        class_names: List[str] = []  # enclosing classes, innermost last
+        at_statement_start = True
+        previous: Optional[Dict] = None
+        # Identifiers before targets_end are assignment targets of operator
+        targets_end, operator, loop = 0, "ASSIGN", False
+        last_line = 1
+        count = len(tokens)
+        index = 0
+
+        while index < count:
+            token = tokens[index]
+            token_type = token["type"]
+            line = token["line"]
+            if token_type in handlers:
+                emit(token_type, token)
+            if token_type not in STRUCTURE_TOKENS:
+                last_line = line
+
+            if token_type == "INDENT":
+                blocks.append(pending)
+                if pending:
+                    emit(pending["kind"], pending)
+                    if pending["kind"] == "class":
+                        class_names.append(pending["name"])
+                    for param, param_line in pending.get("param_lines", ()):
+                        emit("parameter", {"name": param, "line": param_line})
+                    pending = None
+                at_statement_start = True
+
+            elif token_type == "DEDENT":
+                node = blocks.pop() if blocks else None
+                if node:
+                    if node["kind"] == "class":
+                        class_names.pop()
+                    emit(node["kind"] + "_end", {**node, "end_line": last_line})
+                at_statement_start = True
+
+            elif token_type in ("NEWLINE", "COLON"):
+                at_statement_start = True
+
+            elif token_type == "CLASS" and index + 1 < count and tokens[index + 1]["type"] == "IDENTIFIER":
+                pending = {"kind": "class", "name": tokens[index + 1]["value"], "line": line}
+                at_statement_start = False
+
+            elif token_type in ("DEFINE", "SETUP", "ACTION"):
+                header = header_name(tokens, index)
+                if header is not None:
+                    name, start = header
+                    params, _ = parameters(tokens, start)
+                    pending = {"kind": "function", "name": name, "line": line,
+                               "params": [param for param, _, _ in params],
+                               "param_lines": [(param, param_line) for param, param_line, _ in params]}
+                    if token_type != "DEFINE" and class_names:
+                        pending["kind"] = "method"
+                        pending["class"] = class_names[-1]
+                at_statement_start = False
+
+            elif token_type == "FOR" and index + 1 < count and tokens[index + 1]["type"] == "IDENTIFIER":
+                targets_end, operator, loop = index + 2, "ASSIGN", True
+                at_statement_start = False
+
+            elif token_type == "IDENTIFIER":
+                if at_statement_start:
+                    # a, b, c = ... : every name up to the operator is assigned
+                    lookahead = index + 1
+                    while (lookahead + 1 < count and tokens[lookahead]["type"] == "COMMA"
+                           and tokens[lookahead + 1]["type"] == "IDENTIFIER"):
+                        lookahead += 2
+                    if lookahead < count and tokens[lookahead]["type"] in ASSIGNMENT_OPERATORS:
+                        targets_end, operator, loop = lookahead, tokens[lookahead]["type"], False
+                if index < targets_end:
+                    emit("assignment", {"name": token["value"], "line": line,
+                                        "augmented": operator != "ASSIGN", "loop": loop})
+                elif not previous or previous["type"] not in NON_VARIABLE_CONTEXT:
+                    emit("reference", {"name": token["value"], "line": line})
+                at_statement_start = False
+
+            elif token_type not in STRUCTURE_TOKENS:
+                at_statement_start = False
+
+            previous = token
+            index += 1
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                name: {**timing, "enabled": self.enabled[name], "seconds": round(timing["seconds"], 6)}
+                for name, timing in self.timings.items()
+            }
@@ -0,0 +1,200 @@
+import json
+import queue
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterator, Optional
+
+from error import AnalysisCancelled
+
+# analyze(user, code, cancel_check) -> result dict
+AnalyzeFunc = Callable[[str, str, Callable[[], bool]], Dict]
+
+
+class SessionLimitReached(Exception):
+    """Raised by LiveChannel.create when the process or the user has too many sessions"""
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+
+class LiveSession:
+    """
+    One live-analysis connection.
+    Document updates are debounced; a newer version cancels the analysis of an
+    older one, and only the newest result for a burst of edits is pushed.
+    """
+
+    def __init__(self, session_id: str, user: str, analyze: AnalyzeFunc, debounce: float):
+        self.id = session_id
+        self.user = user
+        self.analyze = analyze
+        self.debounce = debounce
+
+        self.events: "queue.Queue[Optional[Dict]]" = queue.Queue()
+        self.last_seen = time.monotonic()
+        self.closed = False
+
+        self._cond = threading.Condition()
+        self._pending: Optional[Dict] = None
+        self._last_update = 0.0
+        self._latest_version = -1
+        self._running_version = -1
+        self._cancel = threading.Event()
+
+        self._worker = threading.Thread(target=self._run, name=f"live-{session_id}", daemon=True)
+        self._worker.start()
+
+    def submit(self, version: int, code: str) -> bool:
+        """Queue a document version; returns False if it is older than one already seen"""
+        with self._cond:
+            if version <= self._latest_version:
+                return False
+            self._latest_version = version
+            self._pending = {"version": version, "code": code}
+            self._last_update = time.monotonic()
+            self.last_seen = self._last_update
+            if self._running_version >= 0:
+                self._cancel.set()
+            self._cond.notify()
+            return True
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cancel.set()
+            self._cond.notify()
+        self.events.put(None)
+
+    def _next_document(self) -> Optional[Dict]:
+        with self._cond:
+            while not self.closed:
+                if self._pending is None:
+                    self._cond.wait()
+                    continue
+                remaining = self._last_update + self.debounce - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                document = self._pending
+                self._pending = None
+                self._running_version = document["version"]
+                self._cancel = document["cancel"] = threading.Event()
+                return document
+            return None
+
+    def _run(self):
+        while True:
+            document = self._next_document()
+            if document is None:
+                return
+            cancel = document["cancel"]
+            started = time.monotonic()
+            try:
+                result = self.analyze(self.user, document["code"], cancel.is_set)
+            except AnalysisCancelled:
+                continue
+            except Exception as e:
+                # The session outlives a failed version; report it and wait for the next one
+                self.events.put({
+                    "event": "error",
+                    "version": document["version"],
+                    "error": {"type": "System Error", "line": 0, "message": f"Analysis failed: {e}"}
+                })
+                continue
+            finally:
+                with self._cond:
+                    self._running_version = -1
+
+            # A newer version may have arrived after the analyzers finished
+            if cancel.is_set() or self.closed:
+                continue
+            self.events.put({
+                "event": "result",
+                "version": document["version"],
+                "elapsed_ms": round((time.monotonic() - started) * 1000, 2),
+                "result": result
+            })
+
+
+class LiveChannel:
+    """
+    Registry of live-analysis sessions with idle expiry.
+    Every session owns a thread, so the process holds at most max_sessions
+    of them and one user at most max_sessions_per_user. Idle sessions are
+    expired whenever the channel is used, at most once per second.
+    """
+
+    def __init__(self, analyze: AnalyzeFunc, debounce: float, session_timeout: float,
+                 keepalive: float = 15.0, max_sessions: int = 256, max_sessions_per_user: int = 4):
+        self.analyze = analyze
+        self.debounce = debounce
+        self.session_timeout = session_timeout
+        self.keepalive = keepalive
+        self.max_sessions = max_sessions
+        self.max_sessions_per_user = max_sessions_per_user
+        self._sessions: Dict[str, LiveSession] = {}
+        self._lock = threading.Lock()
+        self._next_expiry = 0.0
+
+    def create(self, user: str) -> LiveSession:
+        """A new session; raises SessionLimitReached when the process or the user is at the limit"""
+        self.expire_idle(force=True)
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise SessionLimitReached(f"The server has {self.max_sessions} open live sessions")
+            if sum(1 for s in self._sessions.values() if s.user == user) >= self.max_sessions_per_user:
+                raise SessionLimitReached(f"At most {self.max_sessions_per_user} live sessions per user")
+            session = LiveSession(uuid.uuid4().hex, user, self.analyze, self.debounce)
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str) -> Optional[LiveSession]:
+        self.expire_idle()
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session:
+            session.last_seen = time.monotonic()
+        return session
+
+    def close(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if not session:
+            return False
+        session.close()
+        return True
+
+    def expire_idle(self, force: bool = False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now < self._next_expiry:
+                return
+            self._next_expiry = now + 1.0
+            expired = [s for s in self._sessions.values() if now - s.last_seen > self.session_timeout]
+            for session in expired:
+                del self._sessions[session.id]
+        for session in expired:
+            session.close()
+
+    def stream(self, session: LiveSession) -> Iterator[str]:
+        """Server-sent event stream of results for a session"""
+        yield f"event: ready\ndata: {json.dumps({'session': session.id})}\n\n"
+        while True:
+            try:
+                event = session.events.get(timeout=self.keepalive)
+            except queue.Empty:
+                if session.closed:
+                    return
+                session.last_seen = time.monotonic()
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                return
+            session.last_seen = time.monotonic()
+            yield f"event: {event['event']}\nid: {event['version']}\ndata: {json.dumps(event)}\n\n"
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"sessions": len(self._sessions)}
@@ -0,0 +1,430 @@
+"""
+SOOP Language Server
+Speaks the Language Server Protocol over stdio so editors get SOOP diagnostics
+and semantic highlighting without going through the HTTP service.
+
+Usage:
+    python lsp_server.py
+"""
+import json
+import re
+import sys
+import time
+import traceback
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from lexical_analyzer import LexicalAnalyzer, LexState
+from syntax_analyzer import SyntaxAnalyzer
+from semantic_analyzer import SemanticAnalyzer
+from token_definitions import *
+from error import AnalysisCancelled
+
+# Seconds the parser may run for one document version before giving up
+PARSE_DEADLINE = 2.0
+
+SEMANTIC_TOKEN_TYPES = [
+    "keyword", "type", "variable", "string", "number",
+    "comment", "operator", "class", "function", "method", "property"
+]
+_SEMANTIC_INDEX = {name: index for index, name in enumerate(SEMANTIC_TOKEN_TYPES)}
+
+_KEYWORD_TYPES = set(KEYWORDS.values()) | set(BOOL_VALUES.values())
+_DATA_TYPES = set(DATA_TYPES.values())
+_LITERAL_TYPES = {
+    TOKEN_STRING_LITERAL: "string",
+    TOKEN_INTEGER_LITERAL: "number",
+    TOKEN_FLOAT_LITERAL: "number",
+    TOKEN_COMMENT: "comment"
+}
+_SYMBOL_TYPES = {token_type for _, token_type in SYMBOLS}
+# Identifier role decided by the token right before it
+_IDENTIFIER_ROLES = {
+    TOKEN_CLASS: "class",
+    TOKEN_INHERITS: "class",
+    TOKEN_NEW: "class",
+    TOKEN_DEFINE: "function",
+    TOKEN_ACTION: "method",
+    TOKEN_DOT: "property"
+}
+
+# LSP JSON-RPC error codes
+PARSE_ERROR = -32700
+METHOD_NOT_FOUND = -32601
+INVALID_REQUEST = -32600
+# window/logMessage type
+MESSAGE_ERROR = 1
+
+# Editor lines end at \n, \r\n or \r (LSP 3.17); the lexer splits with str.splitlines(),
+# which also ends lines at the other LEXER_TERMINATORS
+_EDITOR_LINE_END = re.compile(r"\r\n|\r|\n")
+LEXER_TERMINATORS = "\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029"
+
+
+def _utf16_to_index(line: str, units: int) -> int:
+    if line.isascii():
+        return min(units, len(line))
+    count = 0
+    for index, char in enumerate(line):
+        if count >= units:
+            return index
+        count += 2 if ord(char) > 0xFFFF else 1
+    return len(line)
+
+
+def _index_to_utf16(line: str, index: int) -> int:
+    if line.isascii():
+        return index
+    return index + sum(1 for char in line[:index] if ord(char) > 0xFFFF)
+
+
+def _split_lines(text: str) -> List[str]:
+    """Split into editor lines, keeping a trailing empty line"""
+    return _EDITOR_LINE_END.split(text)
+
+
+def _lexer_lines(line: str) -> List[str]:
+    """The lexer lines of one editor line; joined over a document they give str.splitlines()"""
+    lines = line.splitlines()
+    if not line or line[-1] in LEXER_TERMINATORS:
+        lines.append("")
+    return lines
+
+
+class Document:
+    """
+    In-memory state of one open document.
+    Lexer output is kept as a LexState, so an edit only re-lexes the lines it
+    touches plus the following lines whose indentation tokens change.
+    An editor line holding a form feed or another str.splitlines() terminator
+    is several lexer lines; spans[i] counts those of editor line i.
+    """
+
+    def __init__(self, uri: str, version: int, text: str, utf16: bool = True):
+        self.uri = uri
+        self.version = version
+        self.utf16 = utf16
+        self._lexer = LexicalAnalyzer("")
+        self.lines: List[str] = []
+        self.spans: List[int] = []
+        self.state = LexState()
+        self.set_text(text)
+
+    def _replace_lines(self, start: int, end: int, new_lines: List[str]):
+        """Replace editor lines [start, end) and keep the lexer state in step"""
+        lexer_start = sum(self.spans[:start])
+        lexer_end = lexer_start + sum(self.spans[start:end])
+        new_lexer_lines = [_lexer_lines(line) for line in new_lines]
+        self.lines[start:end] = new_lines
+        self.spans[start:end] = [len(lines) for lines in new_lexer_lines]
+        state = self.state
+        lexed = len(state.lines)
+        self._lexer.relex_lines(state, min(lexer_start, lexed), min(lexer_end, lexed),
+                                [line for lines in new_lexer_lines for line in lines])
+
+        # The lexer follows str.splitlines(): a trailing line terminator does not start a new line
+        expected = sum(self.spans)
+        if expected > 1 and not _lexer_lines(self.lines[-1])[-1]:
+            expected -= 1
+        if len(state.lines) > expected:
+            self._lexer.relex_lines(state, expected, len(state.lines), [])
+        elif len(state.lines) < expected:
+            lexer_lines = [line for editor_line in self.lines for line in _lexer_lines(editor_line)]
+            self._lexer.relex_lines(state, len(state.lines), len(state.lines), lexer_lines[len(state.lines):expected])
+
+    def lexer_positions(self) -> List[Tuple[int, int, str]]:
+        """(editor line, offset in it, text) of every lexer line"""
+        positions = []
+        for index, (line, span) in enumerate(zip(self.lines, self.spans)):
+            if span == 1:
+                positions.append((index, 0, line))
+                continue
+            offset = 0
+            for part in line.splitlines(True):
+                positions.append((index, offset, part.splitlines()[0]))
+                offset += len(part)
+            if line[-1] in LEXER_TERMINATORS:
+                positions.append((index, len(line), ""))
+        return positions
+
+    def set_text(self, text: str):
+        self._replace_lines(0, len(self.lines), _split_lines(text))
+
+    def to_index(self, line: int, character: int) -> int:
+        if not self.utf16 or line >= len(self.lines):
+            return character
+        return _utf16_to_index(self.lines[line], character)
+
+    def to_character(self, line: int, index: int) -> int:
+        if not self.utf16 or line >= len(self.lines):
+            return index
+        return _index_to_utf16(self.lines[line], index)
+
+    def apply_change(self, change: Dict):
+        if "range" not in change:
+            self.set_text(change["text"])
+            return
+
+        start, end = change["range"]["start"], change["range"]["end"]
+        start_line = min(start["line"], len(self.lines) - 1)
+        end_line = min(end["line"], len(self.lines) - 1)
+        start_index = self.to_index(start_line, start["character"])
+        end_index = self.to_index(end_line, end["character"])
+
+        prefix = self.lines[start_line][:start_index]
+        suffix = self.lines[end_line][end_index:]
+        self._replace_lines(start_line, end_line + 1, _split_lines(prefix + change["text"] + suffix))
+
+    def token_stream(self) -> Tuple[List[Dict], List[Dict]]:
+        """The same token and error lists LexicalAnalyzer.tokenize() would produce"""
+        return self.state.tokens(), self.state.errors()
+
+    def _line_range(self, positions: List[Tuple[int, int, str]], line_num: int,
+                    column: Optional[int] = None) -> Dict:
+        """Editor range of lexer line line_num (1-based)"""
+        if positions:
+            line_index, offset, text = positions[max(0, min(line_num - 1, len(positions) - 1))]
+        else:
+            line_index, offset, text = 0, 0, ""
+        if column:
+            start = column - 1
+        else:
+            start = len(text) - len(text.lstrip())
+        return {
+            "start": {"line": line_index, "character": self.to_character(line_index, offset + start)},
+            "end": {"line": line_index, "character": self.to_character(line_index, offset + len(text.rstrip()))}
+        }
+
+    def diagnostics(self) -> List[Dict]:
+        tokens, lexical_errors = self.token_stream()
+        positions = self.lexer_positions()
+        if lexical_errors:
+            return [{
+                "range": self._line_range(positions, error["line"], error.get("column")),
+                "severity": 1,
+                "source": "soop",
+                "code": "Lexical Error",
+                "message": error["message"]
+            } for error in lexical_errors]
+
+        deadline = time.monotonic() + PARSE_DEADLINE
+        try:
+            syntax_errors = SyntaxAnalyzer(tokens, lambda: time.monotonic() > deadline).analyze()
+            syntax_errors += SemanticAnalyzer(tokens).analyze()
+        except AnalysisCancelled:
+            return [{
+                "range": self._line_range(positions, 1),
+                "severity": 2,
+                "source": "soop",
+                "message": f"Syntax analysis stopped after {PARSE_DEADLINE} seconds"
+            }]
+        except Exception as e:
+            return [{
+                "range": self._line_range(positions, 1),
+                "severity": 1,
+                "source": "soop",
+                "code": "System Error",
+                "message": f"Analysis failed: {str(e)}"
+            }]
+
+        return [{
+            "range": self._line_range(positions, error["line"]),
+            "severity": 1,
+            "source": "soop",
+            "code": error["type"],
+            "message": error["message"]
+        } for error in syntax_errors]
+
+    def semantic_tokens(self) -> List[int]:
+        """Semantic tokens in the LSP relative (delta) integer encoding"""
+        data: List[int] = []
+        previous_line = 0
+        previous_start = 0
+        previous_type = None
+        positions = self.lexer_positions()
+        for (line_index, offset, _), line_tokens in zip(positions, self.state.content):
+            line = self.lines[line_index]
+            for token_type, _, start, end in line_tokens:
+                if token_type in _KEYWORD_TYPES:
+                    kind = "keyword"
+                elif token_type in _DATA_TYPES:
+                    kind = "type"
+                elif token_type == TOKEN_IDENTIFIER:
+                    kind = _IDENTIFIER_ROLES.get(previous_type, "variable")
+                elif token_type in _LITERAL_TYPES:
+                    kind = _LITERAL_TYPES[token_type]
+                elif token_type in _SYMBOL_TYPES:
+                    kind = "operator"
+                else:
+                    kind = None
+                previous_type = token_type
+                if kind is None:
+                    continue
+
+                start, end = offset + start, offset + end
+                if self.utf16 and not line.isascii():
+                    start, end = _index_to_utf16(line, start), _index_to_utf16(line, end)
+                delta_line = line_index - previous_line
+                delta_start = start - previous_start if delta_line == 0 else start
+                data.extend((delta_line, delta_start, end - start, _SEMANTIC_INDEX[kind], 0))
+                previous_line = line_index
+                previous_start = start
+        return data
+
+
+class LanguageServer:
+    def __init__(self, reader: BinaryIO, writer: BinaryIO):
+        self.reader = reader
+        self.writer = writer
+        self.documents: Dict[str, Document] = {}
+        self.utf16 = True
+        self.shutdown_requested = False
+
+    def read_message(self) -> Optional[Dict]:
+        """The next message, None at end of input; raises ValueError for a malformed one"""
+        headers = {}
+        while True:
+            line = self.reader.readline()
+            if not line:
+                return None
+            line = line.strip()
+            if not line:
+                break
+            name, _, value = line.decode("ascii").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "content-length" not in headers:
+            raise ValueError("Missing Content-Length header")
+        length = int(headers["content-length"])
+        return json.loads(self.reader.read(length).decode("utf-8"))
+
+    def send(self, message: Dict):
+        message["jsonrpc"] = "2.0"
+        body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+        self.writer.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+        self.writer.flush()
+
+    def log_error(self, message: str):
+        """Report a failure to the client's log and to stderr, which editors keep as the server log"""
+        traceback.print_exc(file=sys.stderr)
+        self.send({"method": "window/logMessage", "params": {"type": MESSAGE_ERROR, "message": message}})
+
+    def publish_diagnostics(self, document: Document):
+        self.send({
+            "method": "textDocument/publishDiagnostics",
+            "params": {
+                "uri": document.uri,
+                "version": document.version,
+                "diagnostics": document.diagnostics()
+            }
+        })
+
+    def initialize(self, params: Dict) -> Dict:
+        encodings = ((params.get("capabilities") or {}).get("general") or {}).get("positionEncodings") or []
+        self.utf16 = "utf-32" not in encodings
+        return {
+            "capabilities": {
+                "positionEncoding": "utf-16" if self.utf16 else "utf-32",
+                "textDocumentSync": {"openClose": True, "change": 2},
+                "semanticTokensProvider": {
+                    "legend": {"tokenTypes": SEMANTIC_TOKEN_TYPES, "tokenModifiers": []},
+                    "full": True
+                }
+            },
+            "serverInfo": {"name": "soop-lsp", "version": "1.0.0"}
+        }
+
+    def did_open(self, params: Dict):
+        item = params["textDocument"]
+        document = Document(item["uri"], item.get("version", 0), item["text"], self.utf16)
+        self.documents[item["uri"]] = document
+        self.publish_diagnostics(document)
+
+    def did_change(self, params: Dict):
+        identifier = params["textDocument"]
+        document = self.documents.get(identifier["uri"])
+        if not document:
+            return
+        for change in params["contentChanges"]:
+            document.apply_change(change)
+        document.version = identifier.get("version", document.version)
+        self.publish_diagnostics(document)
+
+    def did_close(self, params: Dict):
+        uri = params["textDocument"]["uri"]
+        self.documents.pop(uri, None)
+        self.send({
+            "method": "textDocument/publishDiagnostics",
+            "params": {"uri": uri, "diagnostics": []}
+        })
+
+    def semantic_tokens_full(self, params: Dict) -> Dict:
+        document = self.documents.get(params["textDocument"]["uri"])
+        return {"data": document.semantic_tokens() if document else []}
+
+    def handle(self, message: Dict) -> bool:
+        """Dispatch one message; returns False once the client asked to exit"""
+        method = message.get("method")
+        params = message.get("params") or {}
+        is_request = "id" in message
+
+        if method == "exit":
+            return False
+
+        requests = {
+            "initialize": self.initialize,
+            "shutdown": lambda _: None,
+            "textDocument/semanticTokens/full": self.semantic_tokens_full
+        }
+        notifications = {
+            "textDocument/didOpen": self.did_open,
+            "textDocument/didChange": self.did_change,
+            "textDocument/didClose": self.did_close
+        }
+
+        if is_request:
+            if method == "shutdown":
+                self.shutdown_requested = True
+            if method not in requests:
+                self.send({
+                    "id": message["id"],
+                    "error": {"code": METHOD_NOT_FOUND, "message": f"Unsupported method: {method}"}
+                })
+                return True
+            try:
+                self.send({"id": message["id"], "result": requests[method](params)})
+            except Exception as e:
+                self.log_error(f"{method} failed: {e}")
+                self.send({
+                    "id": message["id"],
+                    "error": {"code": INVALID_REQUEST, "message": str(e)}
+                })
+        elif method in notifications:
+            # Notifications get no response, but one bad message must not stop the server
+            try:
+                notifications[method](params)
+            except Exception as e:
+                self.log_error(f"{method} failed: {e}")
+        return True
+
+    def serve(self) -> int:
+        while True:
+            try:
+                message = self.read_message()
+            except ValueError as e:
+                self.send({"id": None, "error": {"code": PARSE_ERROR, "message": f"Parse error: {e}"}})
+                continue
+            if message is None:
+                break
+            if not isinstance(message, dict):
+                self.send({"id": None, "error": {"code": INVALID_REQUEST, "message": "Message must be an object"}})
+                continue
+            if not self.handle(message):
+                break
+        return 0 if self.shutdown_requested else 1
+
+
+def main() -> int:
+    return LanguageServer(sys.stdin.buffer, sys.stdout.buffer).serve()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
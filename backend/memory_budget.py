@@ -0,0 +1,163 @@
+"""
+Per-request memory accounting for analyses.
+Peak memory of an analysis follows its token count, not its length: every
+token is a dict in the lexer output, and the jsonify'd response holds it
+again as text. A request's usage is estimated from the tokens and errors as
+they are produced and checked against a per-request budget; a fraction of
+requests can additionally be measured with tracemalloc. Peaks of every
+request are kept in power-of-two histograms for capacity planning.
+"""
+import random
+import threading
+import tracemalloc
+from typing import Dict, Optional
+
+# Bytes per token / error, measured with tracemalloc on lexer output and on jsonify
+TOKEN_BYTES = 320  # Token dict while the analyzers run
+RESPONSE_BYTES_PER_TOKEN = 700  # Serializing the token table
+ERROR_BYTES = 250
+RESPONSE_BYTES_PER_ERROR = 500
+HISTOGRAM_BUCKETS_MB = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+
+
+class MemoryBudgetExceeded(Exception):
+    def __init__(self, used: int, limit: int, stage: str, measured: bool):
+        super().__init__(f"Analysis needs more than {limit // (1024 * 1024)} MB of memory")
+        self.used = used
+        self.limit = limit
+        self.stage = stage
+        self.measured = measured  # False if the estimate crossed the limit
+
+    def to_dict(self) -> Dict:
+        return {"type": "System Error", "line": 0, "message": str(self)}
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(HISTOGRAM_BUCKETS_MB) + 1)
+        self.total = 0
+        self.max = 0
+
+    def add(self, value: int):
+        megabytes = value / (1024 * 1024)
+        index = 0
+        while index < len(HISTOGRAM_BUCKETS_MB) and megabytes > HISTOGRAM_BUCKETS_MB[index]:
+            index += 1
+        self.counts[index] += 1
+        self.total += 1
+        self.max = max(self.max, value)
+
+    def to_dict(self) -> Dict:
+        buckets = {f"le_{bound}MB": count for bound, count in zip(HISTOGRAM_BUCKETS_MB, self.counts)}
+        buckets["le_inf"] = self.counts[-1]
+        return {"count": self.total, "max_bytes": self.max, "buckets": buckets}
+
+
+class RequestBudget:
+    """Usage of one analysis; use as a context manager around it"""
+
+    def __init__(self, accountant: "MemoryAccountant", sampled: bool, started_tracing: bool):
+        self.accountant = accountant
+        self.limit = accountant.limit
+        self.sampled = sampled
+        self.started_tracing = started_tracing
+        self.tokens = 0
+        self.errors = 0
+        self.peak = 0
+        self.measured_peak = 0
+        self.baseline = 0
+        self.exceeded: Optional[MemoryBudgetExceeded] = None
+
+    def estimate(self, tokens: int, errors: int) -> int:
+        return tokens * (TOKEN_BYTES + RESPONSE_BYTES_PER_TOKEN) + errors * (ERROR_BYTES + RESPONSE_BYTES_PER_ERROR)
+
+    def check(self, stage: str, tokens: Optional[int] = None):
+        """Raise MemoryBudgetExceeded if the request is over its budget"""
+        used = self.estimate(self.tokens if tokens is None else tokens, self.errors)
+        if used > self.peak:
+            self.peak = used
+        if self.sampled:
+            measured = tracemalloc.get_traced_memory()[1] - self.baseline
+            if measured > self.measured_peak:
+                self.measured_peak = measured
+            if self.limit and measured > self.limit:
+                self.exceeded = MemoryBudgetExceeded(measured, self.limit, stage, True)
+                raise self.exceeded
+        if self.limit and used > self.limit:
+            self.exceeded = MemoryBudgetExceeded(used, self.limit, stage, False)
+            raise self.exceeded
+
+    def charge_tokens(self, count: int, stage: str):
+        self.tokens = count
+        self.check(stage)
+
+    def charge_errors(self, count: int, stage: str):
+        self.errors += count
+        self.check(stage)
+
+    def __enter__(self):
+        if self.sampled:
+            tracemalloc.reset_peak()
+            self.baseline = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.sampled:
+            self.measured_peak = max(self.measured_peak, tracemalloc.get_traced_memory()[1] - self.baseline)
+        self.accountant.record(self)
+        return False
+
+
+class MemoryAccountant:
+    """
+    Per-worker memory budget. limit 0 disables enforcement but keeps the
+    histograms. tracemalloc slows down every thread while it runs, so it is
+    started only for sampled requests and one sampled request runs at a time;
+    its numbers include whatever other threads allocate meanwhile.
+    """
+
+    def __init__(self, limit: int, sample_rate: float = 0.0):
+        self.limit = limit
+        self.sample_rate = sample_rate
+        self.lock = threading.Lock()
+        self.sampling = False
+        self.estimated = Histogram()
+        self.measured = Histogram()
+        self.exceeded_by_stage: Dict[str, int] = {}
+        self.exceeded_measured = 0
+
+    def request(self) -> RequestBudget:
+        sampled = False
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            with self.lock:
+                if not self.sampling:
+                    self.sampling = sampled = True
+        started_tracing = sampled and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        return RequestBudget(self, sampled, started_tracing)
+
+    def record(self, budget: RequestBudget):
+        with self.lock:
+            self.estimated.add(budget.peak)
+            if budget.sampled:
+                self.measured.add(budget.measured_peak)
+                self.sampling = False
+                if budget.started_tracing:
+                    tracemalloc.stop()
+            if budget.exceeded is not None:
+                stage = budget.exceeded.stage
+                self.exceeded_by_stage[stage] = self.exceeded_by_stage.get(stage, 0) + 1
+                self.exceeded_measured += budget.exceeded.measured
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "limit_bytes": self.limit,
+                "sample_rate": self.sample_rate,
+                "estimated_peak": self.estimated.to_dict(),
+                "measured_peak": self.measured.to_dict(),
+                "exceeded_total": sum(self.exceeded_by_stage.values()),
+                "exceeded_by_stage": dict(self.exceeded_by_stage),
+                "exceeded_measured": self.exceeded_measured
+            }
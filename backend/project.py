@@ -0,0 +1,321 @@
+"""
+Multi-file project analysis.
+A Project keeps every module's source, its import edges and its last
+analysis result. update() re-analyzes only modules whose source changed and
+the modules that (transitively) import them, in topological waves: every
+module in a wave only depends on modules finished in earlier waves, so the
+modules of one wave are analyzed in parallel. A dependent whose imports'
+exported symbols came out unchanged keeps its cached result.
+
+Parallel waves send each module's source to the pool and the workers lex,
+parse and resolve it; a source string pickles far cheaper than its tokens
+(bench_project.py compares the wave against the serial path).
+"""
+import atexit
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Set, Tuple
+
+from lexical_analyzer import LexicalAnalyzer
+from syntax_analyzer import SyntaxAnalyzer
+from semantic_analyzer import SemanticAnalyzer
+from error import SyntaxError, SyntaxErrorType, AnalysisCancelled
+
+# Import statements start a line, so a line scan finds the graph edges without lexing
+IMPORT_PATTERN = re.compile(r"^[ \t]*import[ \t]+([A-Za-z_]\w*(?:[ \t]*\.[ \t]*[A-Za-z_]\w*)*)", re.MULTILINE)
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def get_executor(workers: int) -> ProcessPoolExecutor:
+    """Process pool shared by all projects in this process"""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=workers)
+            _executor_workers = workers
+        return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+atexit.register(shutdown_executor)
+
+
+def module_name(path: str) -> str:
+    """'shapes/circle.soop' -> 'shapes.circle'"""
+    if path.endswith(".soop"):
+        path = path[:-len(".soop")]
+    return path.strip("/").replace("/", ".")
+
+
+def find_imports(code: str) -> List[Tuple[str, int]]:
+    """(module, line) for every import statement"""
+    imports = []
+    for match in IMPORT_PATTERN.finditer(code):
+        line = code.count("\n", 0, match.start()) + 1
+        imports.append((re.sub(r"[ \t]", "", match.group(1)), line))
+    return imports
+
+
+def analyze_module(code: str, modules: Dict[str, Optional[Dict]], deadline: float) -> Tuple[List[Dict], Optional[Dict], int]:
+    """Errors, exports and token count of one module, given the exports of the project's modules"""
+    tokens, lexical_errors = LexicalAnalyzer(code).tokenize()
+    if lexical_errors:
+        return [{
+            "type": "Lexical Error",
+            "line": error["line"],
+            "message": error["message"]
+        } for error in lexical_errors], None, len(tokens)
+
+    stop = time.monotonic() + deadline
+    try:
+        errors = SyntaxAnalyzer(tokens, lambda: time.monotonic() > stop).analyze()
+    except AnalysisCancelled:
+        errors = [SyntaxError(
+            SyntaxErrorType.INCOMPLETE_STATEMENT, 0, f"Syntax analysis stopped after {deadline} seconds"
+        ).to_dict()]
+    semantic = SemanticAnalyzer(tokens, modules)
+    errors = errors + semantic.analyze()
+    return errors, semantic.exports(), len(tokens)
+
+
+class ProjectTooLarge(Exception):
+    """Raised by Project.update when the project would exceed its module count or total size"""
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+
+class Module:
+    def __init__(self, name: str, code: str):
+        self.name = name
+        self.code = code
+        self.digest = hashlib.sha256(code.encode("utf-8", "surrogatepass")).hexdigest()
+        self.imports = find_imports(code)
+        self.errors: List[Dict] = []
+        self.cycle_errors: List[Dict] = []
+        self.exports: Optional[Dict] = None
+        # Exports of each import as seen by the last analysis
+        self.seen_exports: Dict[str, Optional[Dict]] = {}
+        self.token_count = 0
+        self.analyzed = False
+
+
+class Project:
+    def __init__(self, workers: int = 0, deadline: float = 2.0,
+                 max_modules: int = 0, max_size: int = 0):
+        self.workers = workers
+        self.deadline = deadline
+        self.max_modules = max_modules  # 0 for no limit
+        self.max_size = max_size  # Characters of all module sources together; 0 for no limit
+        self.modules: Dict[str, Module] = {}
+        self.lock = threading.Lock()
+
+    def _check_limits(self, files: Dict[str, str], removed: List[str]):
+        sizes = {name: len(module.code) for name, module in self.modules.items()}
+        for path in removed:
+            sizes.pop(module_name(path), None)
+        for path, code in files.items():
+            sizes[module_name(path)] = len(code)
+        if self.max_modules and len(sizes) > self.max_modules:
+            raise ProjectTooLarge(f"Project would have {len(sizes)} modules (limit {self.max_modules})")
+        total = sum(sizes.values())
+        if self.max_size and total > self.max_size:
+            raise ProjectTooLarge(f"Project would have {total} characters of source (limit {self.max_size})")
+
+    def dependencies(self, name: str) -> Set[str]:
+        return {imported for imported, _ in self.modules[name].imports if imported in self.modules}
+
+    def dependents(self) -> Dict[str, Set[str]]:
+        """Imported name -> importing modules, including names not (or no longer) in the project"""
+        reverse: Dict[str, Set[str]] = {}
+        for name, module in self.modules.items():
+            for imported, _ in module.imports:
+                reverse.setdefault(imported, set()).add(name)
+        return reverse
+
+    def update(self, files: Dict[str, str], removed: Optional[List[str]] = None) -> Dict:
+        """
+        Apply changed (path -> code) and removed modules, then re-analyze what they affect.
+        Returns per-module results, the waves that ran, which modules were re-analyzed
+        and how many tokens they had.
+        Raises ProjectTooLarge, leaving the project unchanged, if the result would
+        exceed max_modules or max_size.
+        """
+        with self.lock:
+            self._check_limits(files, removed or [])
+            changed: Set[str] = set()
+            for path in removed or []:
+                name = module_name(path)
+                if self.modules.pop(name, None):
+                    changed.add(name)
+            for path, code in files.items():
+                name = module_name(path)
+                module = Module(name, code)
+                existing = self.modules.get(name)
+                if existing and existing.digest == module.digest:
+                    continue
+                self.modules[name] = module
+                changed.add(name)
+
+            # Changed modules plus everything that transitively imports them
+            reverse = self.dependents()
+            dirty: Set[str] = set()
+            frontier = list(changed)
+            while frontier:
+                name = frontier.pop()
+                if name in dirty:
+                    continue
+                dirty.add(name)
+                frontier.extend(reverse.get(name, ()))
+            dirty &= set(self.modules)
+
+            waves, cyclic = self._waves(dirty)
+            analyzed: List[str] = []
+            for wave in waves:
+                analyzed.extend(self._run_wave(wave, changed))
+            if cyclic:
+                analyzed.extend(self._run_wave(sorted(cyclic), changed))
+            for name in dirty:
+                self.modules[name].cycle_errors = self._cycle_errors(name, cyclic)
+
+            results = {}
+            for name, module in sorted(self.modules.items()):
+                errors = module.errors + module.cycle_errors
+                results[name] = {"errors": errors, "status": "success" if not errors else "error"}
+            return {
+                "modules": results,
+                "waves": waves + ([sorted(cyclic)] if cyclic else []),
+                "analyzed": analyzed,
+                # Tokens of the modules analyzed by this update, for memory accounting
+                "token_count": sum(self.modules[name].token_count for name in analyzed)
+            }
+
+    def _waves(self, dirty: Set[str]) -> Tuple[List[List[str]], Set[str]]:
+        """Kahn layering of the dirty modules; modules on or behind an import cycle are returned apart"""
+        pending = {name: len(self.dependencies(name) & dirty) for name in dirty}
+        reverse = self.dependents()
+        wave = sorted(name for name, count in pending.items() if count == 0)
+        waves = []
+        while wave:
+            waves.append(wave)
+            following = []
+            for name in wave:
+                del pending[name]
+                for dependent in reverse.get(name, ()):
+                    if dependent in pending:
+                        pending[dependent] -= 1
+                        if pending[dependent] == 0:
+                            following.append(dependent)
+            wave = sorted(following)
+        return waves, set(pending)
+
+    def _cycle_errors(self, name: str, cyclic: Set[str]) -> List[Dict]:
+        if name not in cyclic:
+            return []
+        return [SyntaxError(
+            SyntaxErrorType.CIRCULAR_IMPORT, line, f"Importing '{imported}' creates an import cycle"
+        ).to_dict() for imported, line in self.modules[name].imports
+            if imported in cyclic and name in self._reachable(imported)]
+
+    def _reachable(self, start: str) -> Set[str]:
+        seen = set()
+        frontier = [start]
+        while frontier:
+            name = frontier.pop()
+            for imported in self.dependencies(name):
+                if imported not in seen:
+                    seen.add(imported)
+                    frontier.append(imported)
+        return seen
+
+    def _run_wave(self, wave: List[str], changed: Set[str]) -> List[str]:
+        jobs = []
+        for name in wave:
+            module = self.modules[name]
+            visible = {imported: self.modules[imported].exports
+                       for imported, _ in module.imports if imported in self.modules}
+            # Early cutoff: same source and same exports from every import
+            if module.analyzed and name not in changed and visible == module.seen_exports:
+                continue
+            jobs.append((module, visible))
+
+        if not jobs:
+            return []
+
+        if self.workers > 1 and len(jobs) > 1:
+            executor = get_executor(self.workers)
+            futures = [executor.submit(analyze_module, module.code, self._known(visible), self.deadline)
+                       for module, visible in jobs]
+            results = [future.result() for future in futures]
+        else:
+            results = [analyze_module(module.code, self._known(visible), self.deadline)
+                       for module, visible in jobs]
+
+        for (module, visible), (errors, exports, token_count) in zip(jobs, results):
+            module.errors = errors
+            module.exports = exports
+            module.token_count = token_count
+            module.seen_exports = visible
+            module.analyzed = True
+        return [module.name for module, _ in jobs]
+
+    def _known(self, visible: Dict[str, Optional[Dict]]) -> Dict[str, Optional[Dict]]:
+        """
+        Module table for the analyzer: every project module is importable;
+        modules without exports (not analyzed yet, or failed to lex) are None
+        and calls into them are not checked
+        """
+        known: Dict[str, Optional[Dict]] = dict.fromkeys(self.modules)
+        known.update(visible)
+        return known
+
+
+class ProjectRegistry:
+    """Most recently used projects, keyed by (user, project name)"""
+
+    def __init__(self, max_projects: int, workers: int = 0, deadline: float = 2.0,
+                 max_modules: int = 0, max_size: int = 0):
+        self.max_projects = max_projects
+        self.workers = workers
+        self.deadline = deadline
+        self.max_modules = max_modules
+        self.max_size = max_size
+        self.projects: "OrderedDict[Tuple[str, str], Project]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user: str, name: str) -> Project:
+        key = (user, name)
+        with self.lock:
+            project = self.projects.get(key)
+            if project is None:
+                project = Project(self.workers, self.deadline, self.max_modules, self.max_size)
+                self.projects[key] = project
+                while len(self.projects) > self.max_projects:
+                    self.projects.popitem(last=False)
+            else:
+                self.projects.move_to_end(key)
+            return project
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "projects": len(self.projects),
+                "modules": sum(len(project.modules) for project in self.projects.values())
+            }
@@ -0,0 +1,243 @@
+"""
+Replay captured /analyze traffic against a running server.
+
+    python replay.py run captures/analyze-*.ndjson.gz --rate 50 --output before.json
+    python replay.py run captures/analyze-*.ndjson.gz --concurrency 8 --output after.json
+    python replay.py compare before.json after.json
+
+Requests are sent in capture order: the records of all given files (one per
+worker process) merged by arrival time. With --rate the load is open-loop:
+requests start on a fixed schedule whether or not earlier ones finished, and
+latency is measured from the scheduled start, so a stalled server shows up
+in the percentiles instead of slowing the test down. With --concurrency the
+load is closed-loop: that many clients each send the next request as soon as
+their previous one returns. compare exits with 1 if the second run regressed
+by more than --max-regression percent or its error rate rose.
+"""
+import argparse
+import heapq
+import http.client
+import json
+import math
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from traffic_capture import read_corpus
+
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+
+def load_requests(paths: List[str]) -> List[Tuple[str, bytes]]:
+    """(user pseudonym, encoded body) of every captured request across paths, in arrival order"""
+    by_file = [sorted(read_corpus(path), key=lambda record: record["t"]) for path in paths]
+    return [(record["user"], json.dumps(record["body"]).encode("utf-8", "surrogatepass"))
+            for record in heapq.merge(*by_file, key=lambda record: record["t"])]
+
+
+class Client:
+    """One keep-alive connection per thread"""
+
+    def __init__(self, url: str, timeout: float):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.https = parts.scheme == "https"
+        self.path = (parts.path.rstrip("/") or "") + "/analyze"
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            factory = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            connection = self.local.connection = factory(self.host, self.port, timeout=self.timeout)
+        return connection
+
+    def send(self, user: str, body: bytes) -> int:
+        """HTTP status, or 0 if the request failed without a response"""
+        connection = self._connection()
+        try:
+            connection.request("POST", self.path, body, {"Content-Type": "application/json", "X-User": user})
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self.local.connection = None
+            return 0
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    """Nearest-rank percentile of a sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, min(len(ordered), math.ceil(p * len(ordered) / 100)))
+    return ordered[rank - 1]
+
+
+def summarize(results: List[Tuple[float, int]], elapsed: float, mode: str) -> Dict:
+    latencies = sorted(latency for latency, _ in results)
+    statuses: Dict[str, int] = {}
+    for _, status in results:
+        key = str(status) if status else "failed"
+        statuses[key] = statuses.get(key, 0) + 1
+    errors = sum(count for status, count in statuses.items() if status != "200")
+    return {
+        "mode": mode,
+        "requests": len(results),
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(results) / elapsed, 2) if elapsed > 0 else 0.0,
+        "error_rate": round(errors / len(results), 4) if results else 0.0,
+        "statuses": statuses,
+        "latency_ms": {
+            **{f"p{p:g}": round(percentile(latencies, p) * 1000, 3) for p in PERCENTILES},
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0
+        }
+    }
+
+
+def run_open_loop(client: Client, requests: List[Tuple[str, bytes]], rate: float, max_in_flight: int) -> Dict:
+    results: List[Tuple[float, int]] = []
+    lock = threading.Lock()
+    interval = 1.0 / rate
+
+    def send(scheduled: float, user: str, body: bytes):
+        status = client.send(user, body)
+        latency = time.perf_counter() - scheduled
+        with lock:
+            results.append((latency, status))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for index, (user, body) in enumerate(requests):
+            scheduled = started + index * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, scheduled, user, body)
+    return summarize(results, time.perf_counter() - started, f"open-loop {rate:g}/s")
+
+
+def run_closed_loop(client: Client, requests: List[Tuple[str, bytes]], concurrency: int) -> Dict:
+    results: List[Tuple[float, int]] = []
+    lock = threading.Lock()
+    pending = iter(requests)
+
+    def worker():
+        while True:
+            with lock:
+                request = next(pending, None)
+            if request is None:
+                return
+            sent = time.perf_counter()
+            status = client.send(*request)
+            latency = time.perf_counter() - sent
+            with lock:
+                results.append((latency, status))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(results, time.perf_counter() - started, f"closed-loop x{concurrency}")
+
+
+COMPARED = [  # (label, path into the report, True if higher is better)
+    ("throughput (req/s)", ("throughput",), True),
+    ("error rate", ("error_rate",), False),
+    *[(f"p{p:g} (ms)", ("latency_ms", f"p{p:g}"), False) for p in PERCENTILES],
+    ("mean (ms)", ("latency_ms", "mean"), False),
+    ("max (ms)", ("latency_ms", "max"), False),
+]
+GATED = {"throughput (req/s)", "p50 (ms)", "p99 (ms)"}  # Metrics that fail compare on regression
+
+
+def compare(before: Dict, after: Dict, max_regression: float, max_error_increase: float) -> Tuple[str, bool]:
+    """
+    (table, whether the second run regressed): a gated metric got worse by more
+    than max_regression percent, or the error rate rose by more than
+    max_error_increase percentage points
+    """
+    lines = [f"{'metric':<20}{'before':>12}{'after':>12}{'change':>10}"]
+    regressed = False
+    for label, path, higher_is_better in COMPARED:
+        old, new = before, after
+        for key in path:
+            old, new = old[key], new[key]
+        change = (new - old) / old * 100 if old else 0.0
+        worse = -change if higher_is_better else change
+        flag = ""
+        if (label in GATED and worse > max_regression) or \
+                (label == "error rate" and (new - old) * 100 > max_error_increase):
+            regressed = True
+            flag = "  REGRESSION"
+        lines.append(f"{label:<20}{old:>12g}{new:>12g}{change:>+9.1f}%{flag}")
+    if before.get("mode") != after.get("mode"):
+        lines.append(f"note: runs used different load modes ({before.get('mode')} vs {after.get('mode')})")
+    if before.get("requests") != after.get("requests"):
+        lines.append(f"note: runs sent different numbers of requests ({before['requests']} vs {after['requests']})")
+    return "\n".join(lines), regressed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="replay", description="Replay captured /analyze traffic")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Send a capture to a server and report latency")
+    run.add_argument("corpus", nargs="+", help="Capture files (.ndjson.gz)")
+    run.add_argument("--url", default="http://127.0.0.1:5000", help="Server base URL")
+    load = run.add_mutually_exclusive_group(required=True)
+    load.add_argument("--rate", type=float, help="Open loop: requests started per second")
+    load.add_argument("--concurrency", type=int, help="Closed loop: clients sending back to back")
+    run.add_argument("--requests", type=int, help="Stop after this many requests (default: the whole capture)")
+    run.add_argument("--repeat", type=int, default=1, help="Times to send the capture")
+    run.add_argument("--max-in-flight", type=int, default=256, help="Open loop: connections at most")
+    run.add_argument("--timeout", type=float, default=60.0, help="Seconds before a request counts as failed")
+    run.add_argument("--output", help="Write the report as JSON for compare")
+
+    diff = commands.add_parser("compare", help="Compare two reports written by run --output")
+    diff.add_argument("before")
+    diff.add_argument("after")
+    diff.add_argument("--max-regression", type=float, default=10.0,
+                      help="Percent by which throughput, p50 or p99 may get worse (default: 10)")
+    diff.add_argument("--max-error-increase", type=float, default=1.0,
+                      help="Percentage points by which the error rate may rise (default: 1)")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.before) as before, open(args.after) as after:
+            table, regressed = compare(json.load(before), json.load(after), args.max_regression,
+                                        args.max_error_increase)
+        print(table)
+        return 1 if regressed else 0
+
+    captured = load_requests(args.corpus)
+    if not captured:
+        print("No requests in the capture", file=sys.stderr)
+        return 1
+    total = args.requests or len(captured) * args.repeat
+    requests = list(islice(cycle(captured), total))
+    client = Client(args.url, args.timeout)
+    if args.rate:
+        report = run_open_loop(client, requests, args.rate, args.max_in_flight)
+    else:
+        report = run_closed_loop(client, requests, args.concurrency)
+    report["corpus"] = args.corpus
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
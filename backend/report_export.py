@@ -0,0 +1,124 @@
+"""
+Streaming export of analysis results (/export).
+Each format is a generator over the analyzer output that yields the
+document in chunks of about CHUNK_SIZE characters, so the response starts
+as soon as the analysis is done and the server never holds more than one
+chunk of the rendered document, whatever the token count.
+
+    csv    one table: section (error/token), type, value, line, column
+    html   a single page with an error list and a token table
+    print  HTML split into pages of PRINT_ROWS_PER_PAGE rows with the table
+           header repeated and a page break between pages, so the browser's
+           print-to-PDF produces a paginated report without layout work
+"""
+import csv
+import html
+import io
+from typing import Callable, Dict, Iterable, Iterator, List
+
+CHUNK_SIZE = 64 * 1024
+PRINT_ROWS_PER_PAGE = 40
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "html": ("text/html; charset=utf-8", "html"),
+    "print": ("text/html; charset=utf-8", "html"),
+}
+
+_STYLE = """<style>
+body { font-family: sans-serif; margin: 2em; }
+h1 { text-align: center; }
+table { border-collapse: collapse; width: 100%; margin-bottom: 1em; }
+th, td { border: 1px solid #000; padding: 4px 6px; font-size: 10pt; text-align: left; }
+th { background: #e4e4e4; }
+.page { page-break-after: always; break-after: page; }
+.page:last-child { page-break-after: auto; break-after: auto; }
+@page { size: A4; margin: 15mm; }
+</style>"""
+
+
+def _chunked(parts: Iterable[str]) -> Iterator[str]:
+    buffer: List[str] = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _csv_parts(tokens: List[Dict], errors: List[Dict]) -> Iterator[str]:
+    line = io.StringIO()
+    writer = csv.writer(line)
+
+    def row(values) -> str:
+        line.seek(0)
+        line.truncate()
+        writer.writerow(values)
+        return line.getvalue()
+
+    yield row(["section", "type", "value", "line", "column"])
+    for error in errors:
+        yield row(["error", error.get("type", "Error"), error["message"], error["line"], error.get("column", "")])
+    for token in tokens:
+        yield row(["token", token["type"], token["value"], token["line"], ""])
+
+
+def _escape(value) -> str:
+    return html.escape(str(value), quote=False)
+
+
+def _token_row(token: Dict) -> str:
+    return f"<tr><td>{_escape(token['value'])}</td><td>{token['type']}</td><td>{token['line']}</td></tr>\n"
+
+
+def _error_items(errors: List[Dict]) -> Iterator[str]:
+    if not errors:
+        yield "<p>No errors found.</p>\n"
+        return
+    yield "<h2>Errors</h2>\n<ul>\n"
+    for error in errors:
+        yield f"<li>Line {error['line']}: {_escape(error.get('type', 'Error'))} - {_escape(error['message'])}</li>\n"
+    yield "</ul>\n"
+
+
+TOKEN_HEADER = "<table>\n<tr><th>Value</th><th>Type</th><th>Line</th></tr>\n"
+
+
+def _html_parts(tokens: List[Dict], errors: List[Dict], title: str) -> Iterator[str]:
+    yield f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{_escape(title)}</title>{_STYLE}</head><body>\n"
+    yield f"<h1>{_escape(title)}</h1>\n"
+    yield from _error_items(errors)
+    yield f"<h2>Tokens ({len(tokens)})</h2>\n" + TOKEN_HEADER
+    for token in tokens:
+        yield _token_row(token)
+    yield "</table>\n</body></html>\n"
+
+
+def _print_parts(tokens: List[Dict], errors: List[Dict], title: str) -> Iterator[str]:
+    yield f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{_escape(title)}</title>{_STYLE}</head><body>\n"
+    yield f"<div class=\"page\">\n<h1>{_escape(title)}</h1>\n<p>{len(tokens)} tokens, {len(errors)} errors</p>\n"
+    yield from _error_items(errors)
+    yield "</div>\n"
+    pages = (len(tokens) + PRINT_ROWS_PER_PAGE - 1) // PRINT_ROWS_PER_PAGE
+    for page, start in enumerate(range(0, len(tokens), PRINT_ROWS_PER_PAGE), 1):
+        yield f"<div class=\"page\">\n<p>Tokens, page {page} of {pages}</p>\n" + TOKEN_HEADER
+        for token in tokens[start:start + PRINT_ROWS_PER_PAGE]:
+            yield _token_row(token)
+        yield "</table>\n</div>\n"
+    yield "</body></html>\n"
+
+
+def render(export_format: str, tokens: List[Dict], errors: List[Dict],
+           title: str = "SOOP Lexical Analysis") -> Iterator[str]:
+    """Chunks of the report in export_format (a key of FORMATS)"""
+    renderers: Dict[str, Callable[[], Iterator[str]]] = {
+        "csv": lambda: _csv_parts(tokens, errors),
+        "html": lambda: _html_parts(tokens, errors, title),
+        "print": lambda: _print_parts(tokens, errors, title),
+    }
+    return _chunked(renderers[export_format]())
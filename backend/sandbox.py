@@ -0,0 +1,189 @@
+"""
+Sandboxed execution of compiled SOOP programs.
+Each worker is a separate, long-lived Python process started in isolated
+mode with rlimits on address space, file size and child processes. Programs
+are sent as marshalled code objects and run against fresh globals holding
+only a whitelist of builtins, so a worker can serve many submissions without
+re-importing anything. Messages are length-prefixed JSON over the worker's
+stdin/stdout. A worker that overruns the wall-clock limit is killed and
+replaced, and one that ran out of memory is replaced as well. Workers start
+with an empty environment and run sandbox_worker.py, which keeps nothing
+useful within reach of a program that walks its frames.
+"""
+import base64
+import json
+import marshal
+import os
+import queue
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+HEADER = struct.Struct(">I")
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+
+class SandboxWorker:
+    def __init__(self, memory_limit: int):
+        self.process = subprocess.Popen(
+            [sys.executable, "-I", "-S", WORKER_SCRIPT, str(memory_limit)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            close_fds=True, env={}
+        )
+        self.jobs = 0
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def request(self, job: Dict, timeout: float) -> Optional[Dict]:
+        """Result of the job, or None if the worker overran the timeout or died"""
+        payload = json.dumps(job).encode("utf-8", "surrogatepass")
+        try:
+            self.process.stdin.write(HEADER.pack(len(payload)) + payload)
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            return None
+        deadline = time.monotonic() + timeout
+        header = self._read(HEADER.size, deadline)
+        if header is None:
+            return None
+        body = self._read(HEADER.unpack(header)[0], deadline)
+        if body is None:
+            return None
+        self.jobs += 1
+        return json.loads(body)
+
+    def _read(self, size: int, deadline: float) -> Optional[bytes]:
+        fd = self.process.stdout.fileno()
+        data = b""
+        while len(data) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                return None
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def kill(self):
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class SandboxPool:
+    """Fixed number of sandbox workers, started on first use and replaced when they fail"""
+
+    def __init__(self, workers: int, memory_limit: int, time_limit: float, step_limit: int,
+                 output_limit: int, max_jobs: int = 1000):
+        self.workers = workers
+        self.memory_limit = memory_limit
+        self.time_limit = time_limit
+        self.step_limit = step_limit
+        self.output_limit = output_limit
+        self.max_jobs = max_jobs  # Jobs before a worker is recycled
+        self.idle: "queue.LifoQueue[Optional[SandboxWorker]]" = queue.LifoQueue()
+        for _ in range(workers):
+            self.idle.put(None)  # Free slot without a started worker
+        self.lock = threading.Lock()
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.counters = {"runs": 0, "ok": 0, "error": 0, "step_limit": 0, "memory_limit": 0,
+                         "output_limit": 0, "time_limit": 0, "crashed": 0, "spawned": 0, "seconds": 0.0}
+
+    def run(self, program, stdin: str = "") -> Dict:
+        """Run a CompiledProgram; errors carry SOOP line numbers"""
+        job = {
+            "code": base64.b64encode(marshal.dumps(program.code)).decode("ascii"),
+            "stdin": stdin,
+            "steps": self.step_limit,
+            "output": self.output_limit
+        }
+        worker = self.idle.get()
+        started = time.perf_counter()
+        try:
+            if worker is None or not worker.alive():
+                worker = SandboxWorker(self.memory_limit)
+                with self.lock:
+                    self.counters["spawned"] += 1
+            result = worker.request(job, self.time_limit)
+            if result is None:
+                status = "time_limit" if worker.alive() else "crashed"
+                worker.kill()
+                worker = None
+                result = {"status": status, "stdout": "", "error": None, "steps": None, "duration": self.time_limit}
+            elif result["status"] == "memory_limit" or worker.jobs >= self.max_jobs:
+                # After a MemoryError the heap may be left fragmented near the limit
+                worker.kill()
+                worker = None
+        except BaseException:
+            if worker is not None:
+                worker.kill()
+            worker = None
+            raise
+        finally:
+            self.idle.put(worker)
+
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.counters["runs"] += 1
+            self.counters[result["status"]] += 1
+            self.counters["seconds"] += elapsed
+
+        if result["error"]:
+            result["error"] = {
+                "type": "Runtime Error",
+                "line": program.soop_line(result["error"]["line"]),
+                "message": result["error"]["message"]
+            }
+        elif result["status"] != "ok":
+            result["error"] = {"type": "Runtime Error", "line": 0, "message": self._limit_message(result["status"])}
+        result["duration"] = round(result["duration"], 6)
+        return result
+
+    def run_many(self, program, inputs: List[str]) -> List[Dict]:
+        """run() for every stdin, spread over the pool's workers; results in input order"""
+        if len(inputs) == 1:
+            return [self.run(program, inputs[0])]
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sandbox")
+        return list(self.executor.map(lambda stdin: self.run(program, stdin), inputs))
+
+    def _limit_message(self, status: str) -> str:
+        return {
+            "step_limit": f"Program exceeded {self.step_limit} steps",
+            "memory_limit": f"Program exceeded {self.memory_limit // (1024 * 1024)} MB of memory",
+            "output_limit": f"Program printed more than {self.output_limit} characters",
+            "time_limit": f"Program ran longer than {self.time_limit} seconds",
+            "crashed": "Execution process terminated unexpectedly"
+        }[status]
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            if worker is not None:
+                worker.kill()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {**self.counters, "workers": self.workers, "seconds": round(self.counters["seconds"], 6)}
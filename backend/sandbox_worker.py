@@ -0,0 +1,196 @@
+"""
+Entry point of a sandbox worker process (see sandbox.py).
+Every frame of a running program can be walked back to the frames of this
+module, so the module holds nothing worth reaching: it imports nothing at
+module level, the modules the job loop needs live in serve()'s locals, and
+the interpreter's import, open, exec, eval and compile builtins are removed
+before the first job is read.
+"""
+
+HEADER_FORMAT = ">I"
+CODE_FILENAME = "<soop>"  # soop_compiler.FILENAME; not imported so the worker stays dependency free
+RECURSION_LIMIT = 400
+
+SAFE_BUILTIN_NAMES = (
+    "abs", "all", "any", "bool", "dict", "divmod", "enumerate", "filter", "float", "int", "isinstance",
+    "len", "list", "map", "max", "min", "pow", "range", "reversed", "round", "set", "sorted", "str",
+    "sum", "tuple", "zip", "super", "object", "Exception", "ArithmeticError", "ZeroDivisionError",
+    "IndexError", "KeyError", "TypeError", "ValueError", "AttributeError", "NameError", "EOFError",
+    "RecursionError",
+)
+
+# Removed from the worker's own builtins once it is set up
+UNSAFE_BUILTIN_NAMES = ("__import__", "open", "exec", "eval", "compile", "breakpoint", "help", "input", "exit", "quit")
+
+
+class StepLimitExceeded(BaseException):
+    """BaseException so 'catch' blocks in the program cannot swallow it"""
+
+
+class OutputLimitExceeded(BaseException):
+    pass
+
+
+class SoopError(Exception):
+    """Raised by the SOOP 'raise' statement"""
+
+
+def _format(value) -> str:
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if value is None:
+        return "null"
+    return str(value)
+
+
+def _execute(code, job, base_builtins, run, clock):
+    step_limit = job["steps"]
+    output_limit = job["output"]
+    lines = job["stdin"].splitlines()
+    lines.reverse()
+    output = []
+    counters = {"steps": 0, "output": 0}
+
+    def step():
+        counters["steps"] += 1
+        if counters["steps"] > step_limit:
+            raise StepLimitExceeded()
+
+    def write(text):
+        counters["output"] += len(text)
+        if counters["output"] > output_limit:
+            raise OutputLimitExceeded()
+        output.append(text)
+
+    def soop_print(*values, sep=" ", end="\n"):
+        write(sep.join(_format(value) for value in values) + end)
+
+    def soop_input(prompt=""):
+        if prompt:
+            write(_format(prompt))
+        if not lines:
+            raise EOFError("No more input")
+        return lines.pop()
+
+    safe_builtins = dict(base_builtins)
+    safe_builtins["print"] = soop_print
+    safe_builtins["input"] = soop_input
+    program_globals = {
+        "__builtins__": safe_builtins,
+        "__name__": "__soop__",
+        "__step__": step,
+        "SoopError": SoopError,
+    }
+
+    status, error = "ok", None
+    start = clock()
+    try:
+        run(code, program_globals)
+    except StepLimitExceeded:
+        status = "step_limit"
+    except OutputLimitExceeded:
+        status = "output_limit"
+    except MemoryError:
+        status = "memory_limit"
+    except RecursionError as e:
+        status, error = "error", {"line": _program_line(e.__traceback__), "message": "Maximum recursion depth exceeded"}
+    except Exception as e:
+        message = str(e) if isinstance(e, SoopError) else f"{type(e).__name__}: {e}"
+        status, error = "error", {"line": _program_line(e.__traceback__), "message": message}
+    duration = clock() - start
+
+    return {
+        "status": status,
+        "stdout": "".join(output),
+        "error": error,
+        "steps": min(counters["steps"], step_limit),
+        "duration": duration
+    }
+
+
+def _program_line(traceback) -> int:
+    """Innermost line of the program in a traceback"""
+    line = 0
+    while traceback is not None:
+        if traceback.tb_frame.f_code.co_filename == CODE_FILENAME:
+            line = traceback.tb_lineno
+        traceback = traceback.tb_next
+    return line
+
+
+def _apply_limits(memory_limit: int):
+    import os
+    try:
+        import resource
+    except ImportError:
+        return
+    baseline = 0
+    try:
+        with open("/proc/self/statm") as statm:
+            baseline = int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    limits = [
+        (resource.RLIMIT_AS, baseline + memory_limit),
+        (resource.RLIMIT_FSIZE, 0),
+    ]
+    if hasattr(resource, "RLIMIT_NPROC"):
+        limits.append((resource.RLIMIT_NPROC, 0))
+    for limit, value in limits:
+        try:
+            resource.setrlimit(limit, (value, value))
+        except (ValueError, OSError):
+            pass
+
+
+def serve(memory_limit: int):
+    import base64
+    import builtins
+    import json
+    import marshal
+    import struct
+    import sys
+    import time
+
+    header = struct.Struct(HEADER_FORMAT)
+    requests = sys.stdin.buffer
+    responses = sys.stdout.buffer
+    _apply_limits(memory_limit)
+    sys.setrecursionlimit(RECURSION_LIMIT)
+
+    base_builtins = {name: getattr(builtins, name) for name in SAFE_BUILTIN_NAMES}
+    # Class statements need __build_class__; nothing else reaches the interpreter internals
+    base_builtins["__build_class__"] = builtins.__build_class__
+    run = builtins.exec
+    for name in UNSAFE_BUILTIN_NAMES:
+        if hasattr(builtins, name):
+            delattr(builtins, name)
+    del builtins, sys
+
+    def read_exact(size):
+        data = b""
+        while len(data) < size:
+            chunk = requests.read(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    while True:
+        size = read_exact(header.size)
+        if size is None:
+            return
+        job = json.loads(read_exact(header.unpack(size)[0]))
+        result = _execute(marshal.loads(base64.b64decode(job["code"])), job, base_builtins, run, time.perf_counter)
+        payload = json.dumps(result).encode("utf-8", "surrogatepass")
+        responses.write(header.pack(len(payload)) + payload)
+        responses.flush()
+
+
+if __name__ == "__main__":
+    import sys as _sys
+    _memory_limit = int(_sys.argv[1])
+    del _sys
+    serve(_memory_limit)
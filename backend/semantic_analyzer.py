@@ -0,0 +1,531 @@
+from typing import List, Dict, Optional, Tuple
+from error import SyntaxError, SyntaxErrorType
+from class_hierarchy import ClassInfo, ClassHierarchy
+from xref import XrefIndex
+
+ASSIGNMENT_OPERATORS = {"ASSIGN", "PLUS_ASSIGN", "MINUS_ASSIGN", "MULTIPLY_ASSIGN",
+                        "DIVIDE_ASSIGN", "MODULO_ASSIGN", "FLOOR_DIVIDE_ASSIGN"}
+# Identifiers right after these tokens are names of something else, not variable reads
+NON_VARIABLE_CONTEXT = {"DOT", "CLASS", "INHERITS", "NEW", "DEFINE", "ACTION"}
+
+
+def header_name(tokens: List[Dict], index: int) -> Optional[Tuple[str, int]]:
+    """(name, index after it) of the DEFINE, SETUP or ACTION header at index; None if it has no name"""
+    if tokens[index]["type"] == "SETUP":
+        return "setup", index + 1
+    if index + 1 < len(tokens) and tokens[index + 1]["type"] == "IDENTIFIER":
+        return tokens[index + 1]["value"], index + 2
+    return None
+
+
+def parameters(tokens: List[Dict], index: int) -> tuple:
+    """Collect (name, line, token index) of the parameters from the '(' at index; returns (params, index after ')')"""
+    names = []
+    if index >= len(tokens) or tokens[index]["type"] != "LPAREN":
+        return names, index
+    index += 1
+    while index < len(tokens) and tokens[index]["type"] not in ("RPAREN", "NEWLINE", "COLON", "EOF"):
+        if tokens[index]["type"] == "IDENTIFIER":
+            names.append((tokens[index]["value"], tokens[index]["line"], index))
+        index += 1
+    return names, index
+
+
+class Symbol:
+    def __init__(self, kind: str, line: int, position: int, arity: Optional[int] = None,
+                 type_name: Optional[str] = None):
+        self.kind = kind  # class, function, variable, parameter, import
+        self.line = line
+        self.position = position  # token index of the defining name
+        self.arity = arity
+        self.type_name = type_name
+        self.key = ""  # scope-qualified name, set when declared
+
+
+class Scope:
+    def __init__(self, kind: str, name: str, parent: Optional["Scope"], path: str = ""):
+        self.kind = kind  # global, function, class, method
+        self.name = name
+        self.parent = parent
+        self.path = path  # qualified name prefix of symbols declared here, e.g. 'Dog.bark'
+        self.symbols: Dict[str, Symbol] = {}
+
+    def resolve(self, name: str) -> Optional[Symbol]:
+        scope = self
+        while scope:
+            symbol = scope.symbols.get(name)
+            if symbol:
+                return symbol
+            scope = scope.parent
+        return None
+
+
+class SemanticAnalyzer:
+    """
+    Name resolution pass run after parsing.
+    One sweep over the tokens builds the declaration index (hash-map scopes,
+    function arities, class member tables) and records every use; uses are
+    then resolved against the index, so the pass is linear in the token count
+    regardless of how many scopes the program has. Names are hoisted within
+    their scope, so forward references resolve.
+    When modules (module name -> exports(), or None if unknown) is given,
+    imports must name one of them and module.function(...) calls are checked
+    against the module's exports.
+    When xref is given, every definition and resolved use is recorded in it.
+    """
+
+    def __init__(self, tokens: List[Dict], modules: Optional[Dict[str, Optional[Dict]]] = None,
+                 xref: Optional[XrefIndex] = None):
+        self.tokens = tokens
+        self.modules = modules
+        self.xref = xref
+        self.errors: List[Dict] = []
+        self.global_scope = Scope("global", "<module>", None)
+        self.classes: Dict[str, ClassInfo] = {}
+        # Class name -> its first declaration, in whichever scope declared it
+        self.class_symbols: Dict[str, Symbol] = {}
+        self.hierarchy: Optional[ClassHierarchy] = None
+        # [kind, scope, name, line, argument count, extra, token index] recorded during the sweep, resolved afterwards
+        self.references: List = []
+        # Index of a call's '(' -> its reference, so the argument count can be filled in
+        self.calls_at: Dict[int, list] = {}
+
+    def add_error(self, error_type: SyntaxErrorType, line: int, message: str):
+        self.errors.append(SyntaxError(error_type, line, message).to_dict())
+
+    def declare(self, scope: Scope, name: str, symbol: Symbol):
+        existing = scope.symbols.get(name)
+        if existing and existing.kind in ("class", "function") and symbol.kind in ("class", "function"):
+            self.add_error(
+                SyntaxErrorType.DUPLICATE_DEFINITION,
+                symbol.line,
+                f"'{name}' is already defined at line {existing.line}"
+            )
+            return
+        if existing and existing.kind == "parameter" and symbol.kind == "parameter":
+            self.add_error(
+                SyntaxErrorType.DUPLICATE_DEFINITION,
+                symbol.line,
+                f"Duplicate parameter '{name}'"
+            )
+            return
+        if existing and symbol.kind == "variable":
+            # Reassignment keeps the original declaration; remember a newly known type
+            if symbol.type_name and existing.kind == "variable":
+                existing.type_name = symbol.type_name
+            if self.xref:
+                self.xref.reference(existing.key, symbol.line, symbol.position)
+            return
+        symbol.key = f"{scope.path}.{name}" if scope.path else name
+        scope.symbols[name] = symbol
+        if self.xref:
+            self.xref.define(symbol.key, symbol.kind, symbol.line, symbol.position, scope.path)
+
+    def _collect(self):
+        tokens = self.tokens
+        scope = self.global_scope
+        current_class: Optional[ClassInfo] = None
+        # One entry per open INDENT: the (scope, class) to restore on DEDENT, or None
+        blocks: List[Optional[tuple]] = []
+        pending = None  # (kind, name, params, line) waiting for its INDENT
+        # One entry per open '(': [call reference or None, commas, saw_argument]
+        parens: List[list] = []
+        at_statement_start = True
+        previous = None
+
+        index = 0
+        count = len(tokens)
+        while index < count:
+            token = tokens[index]
+            token_type = token["type"]
+            line = token["line"]
+
+            if token_type == "INDENT":
+                if pending:
+                    kind, name, params, header_line = pending
+                    blocks.append((scope, current_class))
+                    if kind == "class":
+                        current_class = self.classes.get(name)
+                        scope = Scope("class", name, scope, name)
+                    elif kind == "method" and current_class:
+                        # Method bodies see their own names, then module names
+                        scope = Scope(kind, name, self.global_scope, f"{current_class.name}.{name}")
+                    else:
+                        scope = Scope(kind, name, scope, f"{scope.path}.{name}" if scope.path else name)
+                    for param, param_line, position in params:
+                        self.declare(scope, param, Symbol("parameter", param_line, position))
+                    pending = None
+                else:
+                    blocks.append(None)
+                at_statement_start = True
+
+            elif token_type == "DEDENT":
+                if blocks:
+                    restored = blocks.pop()
+                    if restored:
+                        scope, current_class = restored
+                at_statement_start = True
+
+            elif token_type == "NEWLINE":
+                parens.clear()
+                at_statement_start = True
+
+            elif token_type == "CLASS" and index + 1 < count and tokens[index + 1]["type"] == "IDENTIFIER":
+                name = tokens[index + 1]["value"]
+                parent = None
+                if index + 3 < count and tokens[index + 2]["type"] == "INHERITS" and tokens[index + 3]["type"] == "IDENTIFIER":
+                    parent = tokens[index + 3]["value"]
+                    self.references.append(["inherits", scope, parent, line, None, None, index + 3])
+                symbol = Symbol("class", line, index + 1)
+                self.declare(scope, name, symbol)
+                if name not in self.classes:
+                    self.classes[name] = ClassInfo(name, line, parent)
+                    self.class_symbols[name] = symbol
+                pending = ("class", name, [], line)
+                at_statement_start = False
+
+            elif token_type == "DEFINE" and index + 1 < count and tokens[index + 1]["type"] == "IDENTIFIER":
+                name = tokens[index + 1]["value"]
+                params, after = parameters(tokens, index + 2)
+                self.declare(scope, name, Symbol("function", line, index + 1, arity=len(params)))
+                pending = ("function", name, params, line)
+                index = after
+                previous = tokens[after - 1] if after > 0 else None
+                at_statement_start = False
+                index += 1
+                continue
+
+            elif token_type in ("SETUP", "ACTION") and scope.kind == "class" and current_class:
+                header = header_name(tokens, index)
+                if header is None:
+                    index += 1
+                    continue
+                name, start = header
+                params, after = parameters(tokens, start)
+                if self.xref:
+                    self.xref.define(f"{current_class.name}.{name}", "method", line, start - 1, current_class.name)
+                if name in current_class.methods or (token_type == "SETUP" and current_class.setup_arity is not None):
+                    self.add_error(
+                        SyntaxErrorType.DUPLICATE_DEFINITION,
+                        line,
+                        f"Method '{name}' is already defined in class '{current_class.name}'"
+                    )
+                elif token_type == "SETUP":
+                    current_class.setup_arity = len(params)
+                else:
+                    current_class.methods[name] = len(params)
+                    if previous and previous["type"] == "OVERRIDE":
+                        current_class.overrides.append((name, line))
+                pending = ("method", name, params, line)
+                index = after
+                previous = tokens[after - 1] if after > 0 else None
+                at_statement_start = False
+                index += 1
+                continue
+
+            elif (token_type in ("THIS", "PARENT") and index + 2 < count
+                  and tokens[index + 1]["type"] == "DOT" and tokens[index + 2]["type"] in ("IDENTIFIER", "SETUP")):
+                member = tokens[index + 2]["value"]
+                following = tokens[index + 3]["type"] if index + 3 < count else None
+                if parens:
+                    parens[-1][2] = True
+                if token_type == "THIS" and at_statement_start and following == "ASSIGN":
+                    if current_class and member not in current_class.attributes:
+                        current_class.attributes[member] = line
+                        if self.xref:
+                            self.xref.define(f"{current_class.name}.{member}", "attribute", line, index + 2,
+                                             current_class.name)
+                    elif current_class and self.xref:
+                        self.xref.reference(f"{current_class.name}.{member}", line, index + 2)
+                else:
+                    reference = [token_type.lower(), scope, member, line, None,
+                                 (current_class.name if current_class else None, following == "LPAREN"), index + 2]
+                    self.references.append(reference)
+                    if following == "LPAREN":
+                        self.calls_at[index + 3] = reference
+                previous = tokens[index + 2]
+                at_statement_start = False
+                index += 3
+                continue
+
+            elif token_type == "NEW" and index + 2 < count and tokens[index + 1]["type"] == "IDENTIFIER":
+                if parens:
+                    parens[-1][2] = True
+                if tokens[index + 2]["type"] == "LPAREN":
+                    reference = ["new", scope, tokens[index + 1]["value"], line, None, None, index + 1]
+                    self.references.append(reference)
+                    self.calls_at[index + 2] = reference
+                at_statement_start = False
+
+            elif token_type == "FOR" and index + 1 < count and tokens[index + 1]["type"] == "IDENTIFIER":
+                self.declare(scope, tokens[index + 1]["value"], Symbol("variable", line, index + 1))
+                previous = tokens[index + 1]
+                at_statement_start = False
+                index += 2
+                continue
+
+            elif token_type == "IMPORT" and index + 1 < count and tokens[index + 1]["type"] == "IDENTIFIER":
+                # import a.b binds a
+                self.declare(scope, tokens[index + 1]["value"], Symbol("import", line, index + 1))
+                path = [tokens[index + 1]["value"]]
+                index += 2
+                while (index + 1 < count and tokens[index]["type"] == "DOT"
+                       and tokens[index + 1]["type"] == "IDENTIFIER"):
+                    path.append(tokens[index + 1]["value"])
+                    index += 2
+                module = ".".join(path)
+                if self.modules is not None and module not in self.modules:
+                    self.add_error(SyntaxErrorType.UNDEFINED_MODULE, line, f"Module '{module}' is not part of the project")
+                previous = tokens[index - 1]
+                at_statement_start = False
+                continue
+
+            elif token_type == "CATCH" and index + 1 < count and tokens[index + 1]["type"] == "IDENTIFIER":
+                self.declare(scope, tokens[index + 1]["value"], Symbol("variable", line, index + 1))
+                previous = tokens[index + 1]
+                at_statement_start = False
+                index += 2
+                continue
+
+            elif token_type == "IDENTIFIER" and at_statement_start:
+                # Assignment targets: a, b, c = ...
+                targets = [index]
+                lookahead = index + 1
+                while (lookahead + 1 < count and tokens[lookahead]["type"] == "COMMA"
+                       and tokens[lookahead + 1]["type"] == "IDENTIFIER"):
+                    targets.append(lookahead + 1)
+                    lookahead += 2
+                operator = tokens[lookahead]["type"] if lookahead < count else None
+                if operator in ASSIGNMENT_OPERATORS:
+                    type_name = None
+                    if (len(targets) == 1 and operator == "ASSIGN" and lookahead + 2 < count
+                            and tokens[lookahead + 1]["type"] == "NEW"
+                            and tokens[lookahead + 2]["type"] == "IDENTIFIER"):
+                        type_name = tokens[lookahead + 2]["value"]
+                    for position in targets:
+                        target = tokens[position]
+                        if operator == "ASSIGN":
+                            self.declare(scope, target["value"],
+                                         Symbol("variable", target["line"], position, type_name=type_name))
+                        else:
+                            self.references.append(["variable", scope, target["value"], target["line"], None, None,
+                                                    position])
+                    previous = tokens[lookahead]
+                    at_statement_start = False
+                    index = lookahead + 1
+                    continue
+                at_statement_start = False
+                self._use(index, scope, parens, previous)
+
+            elif token_type == "IDENTIFIER":
+                self._use(index, scope, parens, previous)
+
+            elif token_type == "LPAREN":
+                if parens:
+                    parens[-1][2] = True
+                # The call's argument count is filled in when the matching ')' is seen
+                parens.append([self.calls_at.pop(index, None), 0, False])
+                at_statement_start = False
+
+            elif token_type == "RPAREN":
+                if parens:
+                    reference, commas, saw_argument = parens.pop()
+                    if reference is not None:
+                        reference[4] = commas + 1 if saw_argument else 0
+                at_statement_start = False
+
+            elif token_type == "COMMA":
+                if parens:
+                    parens[-1][1] += 1
+                at_statement_start = False
+
+            elif token_type == "COLON":
+                at_statement_start = True
+
+            elif token_type != "EOF":
+                if parens:
+                    parens[-1][2] = True
+                at_statement_start = False
+
+            previous = token
+            index += 1
+
+    def _use(self, index: int, scope: Scope, parens: List[list], previous: Optional[Dict]):
+        """Record a read of the identifier at index"""
+        tokens = self.tokens
+        token = tokens[index]
+        if parens:
+            parens[-1][2] = True
+        if previous and previous["type"] in NON_VARIABLE_CONTEXT:
+            return
+
+        following = tokens[index + 1]["type"] if index + 1 < len(tokens) else None
+        if following == "LPAREN":
+            reference = ["call", scope, token["value"], token["line"], None, None, index]
+            self.references.append(reference)
+            self.calls_at[index + 1] = reference
+            return
+        if (following == "DOT" and index + 3 < len(tokens) and tokens[index + 2]["type"] == "IDENTIFIER"
+                and tokens[index + 3]["type"] == "LPAREN"):
+            reference = ["method", scope, token["value"], token["line"], None, tokens[index + 2]["value"], index]
+            self.references.append(reference)
+            self.calls_at[index + 3] = reference
+            return
+        self.references.append(["variable", scope, token["value"], token["line"], None, None, index])
+
+    def analyze(self) -> List[Dict]:
+        self._collect()
+        self.hierarchy = ClassHierarchy(self.classes)
+        self._check_hierarchy()
+        self._resolve()
+        self.errors.sort(key=lambda error: error["line"])
+        return self.errors
+
+    def _check_hierarchy(self):
+        hierarchy = self.hierarchy
+        for info in hierarchy.undefined_parents:
+            self.add_error(
+                SyntaxErrorType.UNDEFINED_CLASS,
+                info.line,
+                f"Class '{info.name}' inherits from undefined class '{info.parent}'"
+            )
+        for cycle in hierarchy.cycles:
+            self.add_error(
+                SyntaxErrorType.INVALID_INHERITANCE,
+                self.classes[cycle[0]].line,
+                f"Inheritance cycle: {' -> '.join(cycle + [cycle[0]])}"
+            )
+        for name in hierarchy.order:
+            parent = hierarchy.parent_of(name)
+            for method, line in self.classes[name].overrides:
+                if parent is None or hierarchy.method_owner(parent, method) is None:
+                    self.add_error(
+                        SyntaxErrorType.INVALID_METHOD_DEFINITION,
+                        line,
+                        f"Method '{method}' of class '{name}' overrides nothing in a parent class"
+                    )
+
+    def _check_arity(self, line: int, what: str, expected: Optional[int], given: Optional[int]):
+        if expected is not None and given is not None and expected != given:
+            self.add_error(
+                SyntaxErrorType.INVALID_PARAMETER_COUNT,
+                line,
+                f"{what} expects {expected} argument(s), got {given}"
+            )
+
+    def _resolve_member(self, class_name: str, member: str, line: int, is_call: bool, given: Optional[int]):
+        """Check class_name.member, looked up through the hierarchy"""
+        hierarchy = self.hierarchy
+        if member == "setup":
+            self._check_arity(line, f"Setup of '{class_name}'", hierarchy.setup_arity(class_name), given)
+        elif is_call:
+            arity = hierarchy.method_arity(class_name, member)
+            if arity is None:
+                self.add_error(SyntaxErrorType.UNDEFINED_METHOD, line, f"Class '{class_name}' has no method '{member}'")
+            else:
+                self._check_arity(line, f"Method '{class_name}.{member}'", arity, given)
+        elif not hierarchy.has_member(class_name, member):
+            self.add_error(SyntaxErrorType.INVALID_ACCESS, line, f"Class '{class_name}' has no attribute '{member}'")
+
+    def _resolve(self):
+        hierarchy = self.hierarchy
+        xref = self.xref
+        for kind, scope, name, line, given, extra, position in self.references:
+            if kind == "this" or kind == "parent":
+                class_name, is_call = extra
+                if class_name is None:
+                    if kind == "parent":
+                        self.add_error(SyntaxErrorType.INVALID_PARENT, line,
+                                       "'parent' can only be used inside class methods")
+                    continue
+                if kind == "parent":
+                    if self.classes[class_name].parent is None:
+                        self.add_error(SyntaxErrorType.INVALID_PARENT, line,
+                                       f"Class '{class_name}' has no parent class")
+                        continue
+                    class_name = hierarchy.parent_of(class_name)
+                    if class_name is None:
+                        continue
+                self._resolve_member(class_name, name, line, is_call, given)
+                if xref:
+                    self._xref_member(class_name, name, line, position, is_call)
+                continue
+
+            if kind == "new" or kind == "inherits":
+                if name in self.classes:
+                    if kind == "new":
+                        self._check_arity(line, f"Constructor of '{name}'", hierarchy.setup_arity(name), given)
+                    if xref and self.class_symbols[name].key:
+                        xref.reference(self.class_symbols[name].key, line, position)
+                continue
+
+            symbol = scope.resolve(name)
+            if symbol and xref:
+                xref.reference(symbol.key, line, position)
+            if kind == "variable":
+                if not symbol:
+                    self.add_error(SyntaxErrorType.UNDEFINED_VARIABLE, line, f"Undefined variable '{name}'")
+            elif kind == "call":
+                if not symbol:
+                    self.add_error(SyntaxErrorType.UNDEFINED_FUNCTION, line, f"Undefined function '{name}'")
+                elif symbol.kind == "function":
+                    self._check_arity(line, f"Function '{name}'", symbol.arity, given)
+            elif kind == "method":
+                if not symbol:
+                    self.add_error(SyntaxErrorType.UNDEFINED_VARIABLE, line, f"Undefined variable '{name}'")
+                    continue
+                if symbol.kind == "import":
+                    self._resolve_import(name, extra, line, given)
+                    continue
+                class_name = name if symbol.kind == "class" else symbol.type_name
+                if class_name in self.classes:
+                    self._resolve_member(class_name, extra, line, True, given)
+                    if xref:
+                        self._xref_member(class_name, extra, line, position + 2, True)
+
+    def _xref_member(self, class_name: str, member: str, line: int, position: int, is_call: bool):
+        hierarchy = self.hierarchy
+        if member == "setup":
+            owner = hierarchy.setup_owner(class_name)
+        elif is_call:
+            owner = hierarchy.method_owner(class_name, member)
+        else:
+            owner = hierarchy.attribute_owner(class_name, member) or hierarchy.method_owner(class_name, member)
+        if owner:
+            self.xref.reference(f"{owner}.{member}", line, position)
+
+    def _resolve_import(self, module: str, function: str, line: int, given: Optional[int]):
+        exports = self.modules.get(module) if self.modules else None
+        if exports is None:
+            return
+        if function in exports["classes"]:
+            return
+        arity = exports["functions"].get(function)
+        if arity is None:
+            self.add_error(SyntaxErrorType.UNDEFINED_FUNCTION, line, f"Module '{module}' has no function '{function}'")
+        else:
+            self._check_arity(line, f"Function '{module}.{function}'", arity, given)
+
+    def exports(self) -> Dict:
+        """Module-level functions and classes visible to importers; call after analyze()"""
+        functions = {}
+        classes = {}
+        for name, symbol in self.global_scope.symbols.items():
+            if symbol.kind == "function":
+                functions[name] = symbol.arity
+            elif symbol.kind == "class":
+                classes[name] = {
+                    "setup": self.hierarchy.setup_arity(name),
+                    "methods": {method: self.hierarchy.method_arity(name, method)
+                                for method in self._all_methods(name)}
+                }
+        return {"functions": functions, "classes": classes}
+
+    def _all_methods(self, class_name: str) -> List[str]:
+        methods = []
+        seen = set()
+        while class_name is not None and class_name not in seen:
+            seen.add(class_name)
+            methods.extend(self.classes[class_name].methods)
+            class_name = self.hierarchy.parent_of(class_name)
+        return list(dict.fromkeys(methods))
@@ -0,0 +1,275 @@
+"""
+Near-duplicate detection across submissions, on the lexer's token stream.
+
+    python similarity.py cohort.db add submissions/        # index every .soop file, by path
+    python similarity.py cohort.db check new.soop --limit 5
+
+Tokens are normalized to their type with identifiers, numbers and strings
+collapsed to one class each, so renaming variables or changing constants
+does not hide a copy; comments and line breaks are dropped. Every k-gram of
+normalized tokens is hashed and winnowing keeps the minimum hash of every
+window of WINDOW k-grams, which guarantees that any shared run of at least
+K + WINDOW - 1 tokens produces a shared fingerprint.
+
+Fingerprints live in an inverted index in SQLite (hash -> submission, line
+range). Adding a submission under an existing name replaces it. A query
+looks up its own few hundred fingerprints through the hash index, so its
+cost follows the number of matching postings, not the number of
+submissions; fingerprints present in more than MAX_DOCUMENT_FREQUENCY of
+the submissions (boilerplate, starter code) are skipped.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from typing import List, Dict, Optional, Tuple, Iterable
+
+import token_definitions
+from lexical_analyzer import LexicalAnalyzer
+from soop_analyze import find_files
+from token_definitions import *
+
+K = 12  # Normalized tokens per k-gram
+WINDOW = 8  # k-grams per winnowing window
+MAX_DOCUMENT_FREQUENCY = 0.1  # Fingerprints in more than this fraction of submissions are ignored
+MIN_COMMON_SUBMISSIONS = 20  # ...once the index holds at least this many
+
+_DROPPED = {TOKEN_COMMENT, TOKEN_NEWLINE, TOKEN_EOF}
+_CLASSES = {
+    TOKEN_FLOAT_LITERAL: TOKEN_INTEGER_LITERAL,
+    TOKEN_BOOL_FALSE: TOKEN_BOOL_TRUE,
+}
+
+# One-byte code per token type; stored fingerprints depend on it
+TOKEN_TYPES = sorted({value for name, value in vars(token_definitions).items() if name.startswith("TOKEN_")})
+TYPE_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+
+# (hash, first line, last line) of a fingerprint
+Fingerprint = Tuple[int, int, int]
+
+
+def normalize(tokens: List[Dict]) -> Tuple[bytes, List[int]]:
+    """One byte per kept token (its normalized type) and the line of each"""
+    codes = bytearray()
+    lines: List[int] = []
+    for token in tokens:
+        token_type = token["type"]
+        if token_type in _DROPPED:
+            continue
+        codes.append(TYPE_CODES[_CLASSES.get(token_type, token_type)])
+        lines.append(token["line"])
+    return bytes(codes), lines
+
+
+def fingerprints(tokens: List[Dict]) -> List[Fingerprint]:
+    """Winnowed k-gram fingerprints of a token list, in order"""
+    codes, lines = normalize(tokens)
+    hashes = [int.from_bytes(hashlib.blake2b(codes[index:index + K], digest_size=8).digest(), "big", signed=True)
+              for index in range(len(codes) - K + 1)]
+    if not hashes:
+        return []
+    selected: List[Fingerprint] = []
+    position = -1
+    for end in range(min(WINDOW, len(hashes)) - 1, len(hashes)):
+        start = max(end - WINDOW + 1, 0)
+        if position < start:
+            # The minimum left the window: rescan it, taking the rightmost minimum
+            position = start
+            for index in range(position + 1, end + 1):
+                if hashes[index] <= hashes[position]:
+                    position = index
+        elif hashes[end] <= hashes[position]:
+            position = end
+        else:
+            continue
+        selected.append((hashes[position], lines[position], lines[position + K - 1]))
+    return selected
+
+
+def merge_ranges(ranges: Iterable[Tuple[int, int]]) -> List[List[int]]:
+    """Sorted, merged [first, last] line ranges; adjacent ranges are joined"""
+    merged: List[List[int]] = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return merged
+
+
+def tokenize(code: str) -> List[Dict]:
+    tokens, _ = LexicalAnalyzer(code).tokenize()
+    return tokens
+
+
+class SimilarityIndex:
+    """Inverted fingerprint index in one SQLite file; one connection per process, shared by its threads"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection: Optional[sqlite3.Connection] = None
+        self.pid = 0
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        # Opened on first use: a connection must not be inherited by forked workers
+        if self.connection is None or self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(
+                "CREATE TABLE IF NOT EXISTS submissions ("
+                "id INTEGER PRIMARY KEY, name TEXT UNIQUE, fingerprints INTEGER);"
+                "CREATE TABLE IF NOT EXISTS postings ("
+                "hash INTEGER, submission INTEGER, first_line INTEGER, last_line INTEGER);"
+                "CREATE INDEX IF NOT EXISTS postings_hash ON postings (hash);"
+                "CREATE INDEX IF NOT EXISTS postings_submission ON postings (submission);"
+                "CREATE TABLE IF NOT EXISTS frequencies (hash INTEGER PRIMARY KEY, submissions INTEGER);"
+            )
+        return self.connection
+
+    def _remove(self, submission_id: int):
+        self.db.execute(
+            "UPDATE frequencies SET submissions = submissions - 1 "
+            "WHERE hash IN (SELECT DISTINCT hash FROM postings WHERE submission = ?)", (submission_id,)
+        )
+        self.db.execute("DELETE FROM postings WHERE submission = ?", (submission_id,))
+        self.db.execute("DELETE FROM submissions WHERE id = ?", (submission_id,))
+
+    def add(self, name: str, tokens: List[Dict]) -> int:
+        """Index (or re-index) a submission; returns its fingerprint count"""
+        prints = fingerprints(tokens)
+        with self.lock, self.db:
+            row = self.db.execute("SELECT id FROM submissions WHERE name = ?", (name,)).fetchone()
+            if row:
+                self._remove(row[0])
+            submission_id = self.db.execute(
+                "INSERT INTO submissions (name, fingerprints) VALUES (?, ?)", (name, len(prints))
+            ).lastrowid
+            self.db.executemany(
+                "INSERT INTO postings VALUES (?, ?, ?, ?)",
+                ((hash_value, submission_id, first, last) for hash_value, first, last in prints)
+            )
+            self.db.executemany(
+                "INSERT INTO frequencies VALUES (?, 1) ON CONFLICT(hash) DO UPDATE SET submissions = submissions + 1",
+                ((hash_value,) for hash_value in {hash_value for hash_value, _, _ in prints})
+            )
+        return len(prints)
+
+    def remove(self, name: str) -> bool:
+        with self.lock, self.db:
+            row = self.db.execute("SELECT id FROM submissions WHERE name = ?", (name,)).fetchone()
+            if row:
+                self._remove(row[0])
+            return row is not None
+
+    def query(self, tokens: List[Dict], limit: int = 10, min_score: float = 0.0,
+              exclude: Optional[str] = None) -> List[Dict]:
+        """
+        Submissions sharing fingerprints with tokens, best first. score is the
+        shared fraction of the smaller fingerprint set; lines and
+        matched_lines are the merged line ranges of the shared fingerprints in
+        the query and in the candidate.
+        """
+        prints = fingerprints(tokens)
+        by_hash: Dict[int, List[Tuple[int, int]]] = {}
+        for hash_value, first, last in prints:
+            by_hash.setdefault(hash_value, []).append((first, last))
+        if not by_hash:
+            return []
+
+        with self.lock:
+            total = self.db.execute("SELECT COUNT(*) FROM submissions").fetchone()[0]
+            max_frequency = total if total < MIN_COMMON_SUBMISSIONS else max(1, int(total * MAX_DOCUMENT_FREQUENCY))
+            hashes = list(by_hash)
+            postings = []
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                postings.extend(self.db.execute(
+                    "SELECT p.hash, p.submission, p.first_line, p.last_line FROM postings p "
+                    "JOIN frequencies f ON f.hash = p.hash "
+                    f"WHERE p.hash IN ({','.join('?' * len(batch))}) AND f.submissions <= ?",
+                    (*batch, max_frequency)
+                ).fetchall())
+
+            candidates: Dict[int, Dict] = {}
+            for hash_value, submission_id, first, last in postings:
+                candidate = candidates.setdefault(submission_id, {"hashes": set(), "matched": []})
+                candidate["hashes"].add(hash_value)
+                candidate["matched"].append((first, last))
+
+            ids = list(candidates)
+            details = {}
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                for submission_id, name, count in self.db.execute(
+                    f"SELECT id, name, fingerprints FROM submissions WHERE id IN ({','.join('?' * len(batch))})",
+                    batch
+                ):
+                    details[submission_id] = (name, count)
+
+        results = []
+        for submission_id, candidate in candidates.items():
+            name, count = details[submission_id]
+            if name == exclude:
+                continue
+            shared = len(candidate["hashes"])
+            score = shared / max(1, min(len(by_hash), count))
+            if score < min_score:
+                continue
+            results.append({
+                "name": name,
+                "score": round(min(1.0, score), 4),
+                "shared_fingerprints": shared,
+                "lines": merge_ranges(lines for hash_value in candidate["hashes"] for lines in by_hash[hash_value]),
+                "matched_lines": merge_ranges(candidate["matched"])
+            })
+        results.sort(key=lambda result: (-result["score"], -result["shared_fingerprints"], result["name"]))
+        return results[:limit]
+
+    def stats(self) -> Dict:
+        with self.lock:
+            submissions, = self.db.execute("SELECT COUNT(*) FROM submissions").fetchone()
+            postings, = self.db.execute("SELECT COUNT(*) FROM postings").fetchone()
+        return {"submissions": submissions, "postings": postings}
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None and self.pid == os.getpid():
+                self.connection.close()
+            self.connection = None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="similarity", description="Find near-duplicate SOOP submissions")
+    parser.add_argument("index", help="Index file (created if missing)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="Index files, replacing earlier versions with the same path")
+    add.add_argument("paths", nargs="+", help="Files or directories")
+    check = commands.add_parser("check", help="List indexed submissions similar to files")
+    check.add_argument("paths", nargs="+", help="Files or directories")
+    check.add_argument("--limit", type=int, default=10, help="Candidates per file (default: 10)")
+    check.add_argument("--min-score", type=float, default=0.3, help="Lowest score reported (default: 0.3)")
+    args = parser.parse_args(argv)
+
+    index = SimilarityIndex(args.index)
+    try:
+        for path in find_files(args.paths):
+            with open(path, encoding="utf-8", errors="replace") as source:
+                tokens = tokenize(source.read())
+            if args.command == "add":
+                print(f"{path}: {index.add(path, tokens)} fingerprints")
+            else:
+                matches = index.query(tokens, args.limit, args.min_score, exclude=path)
+                print(json.dumps({"path": path, "candidates": matches}))
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
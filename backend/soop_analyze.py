@@ -0,0 +1,246 @@
+"""
+soop-analyze: batch analysis of .soop files from the command line.
+
+    python soop_analyze.py src/ tests/sample.soop --format ndjson
+
+Directories are walked for .soop files and the files are analyzed across a
+process pool with the same lexical, syntax and semantic analyzers as
+/analyze. Results are kept in a SQLite cache keyed by path: a file whose
+mtime and size are unchanged is not read at all, and one whose content hash
+is unchanged is not analyzed again. Cached results are dropped when the
+analyzer sources change. Exits with 1 if any file has errors.
+"""
+import argparse
+import ast
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple, Iterator
+
+from lexical_analyzer import LexicalAnalyzer
+from syntax_analyzer import SyntaxAnalyzer
+from semantic_analyzer import SemanticAnalyzer
+from error import SyntaxError, SyntaxErrorType, AnalysisCancelled
+
+EXTENSION = ".soop"
+DEFAULT_CACHE = ".soop-analyze-cache"
+MMAP_THRESHOLD = 1024 * 1024  # Files from this size are read through mmap
+ANALYZER_MODULES = ("lexical_analyzer.py", "syntax_analyzer.py", "semantic_analyzer.py")
+
+
+def analyzer_sources() -> List[str]:
+    """The analyzer modules and every module next to them that they import, transitively"""
+    folder = os.path.dirname(os.path.abspath(__file__))
+    sources = set()
+    pending = list(ANALYZER_MODULES)
+    while pending:
+        name = pending.pop()
+        if name in sources:
+            continue
+        sources.add(name)
+        with open(os.path.join(folder, name), "rb") as source:
+            tree = ast.parse(source.read(), name)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                imported = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                imported = [node.module]
+            else:
+                continue
+            for module in imported:
+                path = module.split(".")[0] + ".py"
+                if os.path.exists(os.path.join(folder, path)):
+                    pending.append(path)
+    return sorted(sources)
+
+
+def analyzer_version() -> str:
+    """Digest of the analyzer sources; cached results from other versions are ignored"""
+    digest = hashlib.sha256()
+    folder = os.path.dirname(os.path.abspath(__file__))
+    for name in analyzer_sources():
+        with open(os.path.join(folder, name), "rb") as source:
+            digest.update(source.read())
+    return digest.hexdigest()[:16]
+
+
+def find_files(paths: List[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for root, directories, files in os.walk(path):
+                directories[:] = sorted(directory for directory in directories if not directory.startswith("."))
+                for name in sorted(files):
+                    if name.endswith(EXTENSION):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def read_source(path: str, size: int) -> Tuple[str, str]:
+    """(code, content digest); large files are hashed and decoded straight from an mmap"""
+    with open(path, "rb") as source:
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return str(mapped, "utf-8", "replace"), hashlib.sha256(mapped).hexdigest()
+        data = source.read()
+    return data.decode("utf-8", "replace"), hashlib.sha256(data).hexdigest()
+
+
+def analyze_code(code: str, deadline: float) -> List[Dict]:
+    tokens, lexical_errors = LexicalAnalyzer(code).tokenize()
+    if lexical_errors:
+        return [{
+            "type": "Lexical Error",
+            "line": error["line"],
+            "message": error["message"]
+        } for error in lexical_errors]
+    stop = time.monotonic() + deadline
+    try:
+        errors = SyntaxAnalyzer(tokens, lambda: time.monotonic() > stop).analyze()
+    except AnalysisCancelled:
+        errors = [SyntaxError(
+            SyntaxErrorType.INCOMPLETE_STATEMENT, 0, f"Syntax analysis stopped after {deadline} seconds"
+        ).to_dict()]
+    return errors + SemanticAnalyzer(tokens).analyze()
+
+
+def analyze_file(job: Tuple[str, int, Optional[str], float]) -> Tuple[str, str, Optional[List[Dict]]]:
+    """
+    Worker task: (path, digest, errors). errors is None when the content
+    matches the cached digest and the cached result still applies.
+    """
+    path, size, cached_digest, deadline = job
+    try:
+        code, digest = read_source(path, size)
+    except OSError as e:
+        return path, "", [{"type": "System Error", "line": 0, "message": f"Cannot read file: {e.strerror}"}]
+    if digest == cached_digest:
+        return path, digest, None
+    try:
+        return path, digest, analyze_code(code, deadline)
+    except Exception as e:
+        return path, digest, [{"type": "System Error", "line": 0, "message": f"Analysis failed: {str(e)}"}]
+
+
+class ResultCache:
+    def __init__(self, path: Optional[str], version: str):
+        self.version = version
+        self.db = sqlite3.connect(path or ":memory:")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, digest TEXT, version TEXT, errors TEXT)"
+        )
+
+    def get(self, path: str) -> Optional[Tuple[int, int, str, List[Dict]]]:
+        row = self.db.execute(
+            "SELECT mtime_ns, size, digest, errors FROM results WHERE path = ? AND version = ?",
+            (path, self.version)
+        ).fetchone()
+        return (row[0], row[1], row[2], json.loads(row[3])) if row else None
+
+    def put(self, path: str, mtime_ns: int, size: int, digest: str, errors: List[Dict]):
+        self.db.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+            (path, mtime_ns, size, digest, self.version, json.dumps(errors))
+        )
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+def run(paths: List[str], workers: int, cache: ResultCache, deadline: float) -> Iterator[Dict]:
+    """Result of every file, cached ones first, then analyzed ones as they finish"""
+    jobs = []
+    stats: Dict[str, Tuple[int, int]] = {}
+    cached_errors: Dict[str, List[Dict]] = {}
+    for path in find_files(paths):
+        key = os.path.abspath(path)
+        try:
+            status = os.stat(path)
+        except OSError as e:
+            yield {"path": path, "errors": [{"type": "System Error", "line": 0,
+                                             "message": f"Cannot read file: {e.strerror}"}], "cached": False}
+            continue
+        entry = cache.get(key)
+        if entry and entry[0] == status.st_mtime_ns and entry[1] == status.st_size:
+            yield {"path": path, "errors": entry[3], "cached": True}
+            continue
+        stats[path] = (status.st_mtime_ns, status.st_size)
+        if entry:
+            cached_errors[path] = entry[3]
+        jobs.append((path, status.st_size, entry[2] if entry else None, deadline))
+
+    if workers > 1 and len(jobs) > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(analyze_file, jobs, chunksize=max(1, min(64, len(jobs) // (workers * 4))))
+    else:
+        executor = None
+        results = map(analyze_file, jobs)
+    try:
+        for path, digest, errors in results:
+            cached = errors is None
+            if cached:
+                errors = cached_errors[path]
+            if digest:
+                mtime_ns, size = stats[path]
+                cache.put(os.path.abspath(path), mtime_ns, size, digest, errors)
+            yield {"path": path, "errors": errors, "cached": cached}
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def format_text(result: Dict) -> str:
+    return "\n".join(
+        f"{result['path']}:{error['line']}: {error['type']}: {error['message']}" for error in result["errors"]
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="soop-analyze", description="Analyze .soop files")
+    parser.add_argument("paths", nargs="+", help="Files or directories to analyze")
+    parser.add_argument("--format", choices=("text", "json", "ndjson"), default="text")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Analyzer processes (default: one per CPU)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help=f"Cache file (default: {DEFAULT_CACHE})")
+    parser.add_argument("--no-cache", action="store_true", help="Analyze every file and keep no cache")
+    parser.add_argument("--deadline", type=float, default=5.0, help="Seconds the parser may spend on one file")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    cache = ResultCache(None if args.no_cache else args.cache, analyzer_version())
+    files = errors = cached = 0
+    collected = []
+    try:
+        for result in run(args.paths, args.workers, cache, args.deadline):
+            files += 1
+            errors += len(result["errors"])
+            cached += result["cached"]
+            if args.format == "ndjson":
+                print(json.dumps(result))
+            elif args.format == "json":
+                collected.append(result)
+            elif result["errors"]:
+                print(format_text(result))
+    finally:
+        cache.close()
+
+    summary = {"files": files, "errors": errors, "cached": cached,
+               "seconds": round(time.perf_counter() - started, 3)}
+    if args.format == "json":
+        print(json.dumps({"files": collected, "summary": summary}, indent=2))
+    elif args.format == "ndjson":
+        print(json.dumps({"summary": summary}))
+    else:
+        print(f"{files} files, {errors} errors ({cached} cached) in {summary['seconds']}s")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
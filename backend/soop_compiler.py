@@ -0,0 +1,281 @@
+"""
+SOOP to Python compiler.
+Validated SOOP is translated line by line into Python source and compiled
+once with compile(), so programs run as native code objects instead of being
+interpreted. Every loop body and function body starts with a __step__()
+call, which lets the sandbox enforce an instruction budget. SOOP identifiers
+may not start with '__', so the hook cannot be shadowed, and may not name
+the frame, code, generator or traceback attributes that lead from a program
+object back to the worker's frames. 'for' is only accepted as a statement,
+since an inline generator expression is the way to get a running frame.
+"""
+import hashlib
+import keyword
+import threading
+from collections import OrderedDict
+from types import CodeType
+from typing import List, Dict, Optional, Tuple
+
+FILENAME = "<soop>"
+
+# Tokens translated to a fixed piece of Python
+DIRECT = {
+    "PRINT": "print", "INPUT": "input", "RANGE": "range", "IN": "in",
+    "IF": "if", "ELSE": "else", "FOR": "for", "WHILE": "while",
+    "BREAK": "break", "CONTINUE": "continue", "RETURN": "return",
+    "TRY": "try", "FINALLY": "finally",
+    "BOOL_TRUE": "True", "BOOL_FALSE": "False", "NULL": "None",
+    "THIS": "self",
+    "LOGICAL_AND": "and", "LOGICAL_OR": "or", "LOGICAL_NOT": "not",
+    "TYPE_INT": "int", "TYPE_DOUBLE": "float", "TYPE_FLOAT": "float", "TYPE_BOOL": "bool",
+    "TYPE_LIST": "list", "TYPE_DICT": "dict", "TYPE_STRING": "str",
+}
+DATA_TYPE_TOKENS = {"TYPE_INT", "TYPE_DOUBLE", "TYPE_FLOAT", "TYPE_BOOL", "TYPE_LIST", "TYPE_DICT", "TYPE_STRING"}
+MODIFIERS = {"OVERRIDE", "PUBLIC", "PRIVATE", "RESTRICTED"}
+UNSUPPORTED = {
+    "SWITCH", "ASYNC", "AWAIT", "CONCURRENT", "THREAD", "DELEGATE", "YIELD", "TEMPLATE",
+    "CREATE", "DELETE", "IMPORT", "IMMUTABLE", "DEF", "QUOTE", "ERROR", "UNKNOWN"
+}
+LOOP_TOKENS = {"FOR", "WHILE"}
+# Escapes the lexer keeps in string values
+ESCAPES = {"n": "\n", "r": "\r", "t": "\t", "\\": "\\", "'": "'", '"': '"'}
+STEP = "__step__()"
+# Attributes that reach interpreter frames and their globals and builtins
+BLOCKED_NAMES = {
+    "gi_frame", "gi_code", "gi_yieldfrom", "cr_frame", "cr_code", "cr_await", "cr_origin",
+    "ag_frame", "ag_code", "ag_await", "f_back", "f_globals", "f_builtins", "f_locals", "f_code",
+    "f_trace", "tb_frame", "tb_next", "mro", "format", "format_map",
+}
+
+
+def unescape(value: str) -> str:
+    if "\\" not in value:
+        return value
+    chars = []
+    index = 0
+    while index < len(value):
+        char = value[index]
+        if char == "\\" and index + 1 < len(value):
+            chars.append(ESCAPES.get(value[index + 1], value[index + 1]))
+            index += 2
+        else:
+            chars.append(char)
+            index += 1
+    return "".join(chars)
+
+
+class CompileError(Exception):
+    def __init__(self, line: int, message: str):
+        super().__init__(message)
+        self.line = line
+        self.message = message
+
+    def to_dict(self) -> Dict:
+        return {"type": "Compile Error", "line": self.line, "message": self.message}
+
+
+class CompiledProgram:
+    def __init__(self, source: str, line_map: List[int]):
+        self.source = source
+        self.line_map = line_map  # Python line - 1 -> SOOP line
+        self.code: CodeType = compile(source, FILENAME, "exec")
+
+    def soop_line(self, python_line: int) -> int:
+        if 1 <= python_line <= len(self.line_map):
+            return self.line_map[python_line - 1]
+        return 0
+
+
+class SoopCompiler:
+    def __init__(self, tokens: List[Dict]):
+        self.tokens = tokens
+        self.lines: List[str] = []
+        self.line_map: List[int] = []
+
+    def emit(self, depth: int, text: str, line: int):
+        self.lines.append("    " * depth + text)
+        self.line_map.append(line)
+
+    def compile(self) -> CompiledProgram:
+        depth = 0
+        class_depths: List[int] = []  # depth of each enclosing class body
+        pending_block: Optional[str] = None  # first statement of the block opened by the last header
+        logical: List[Dict] = []
+
+        for token in self.tokens:
+            token_type = token["type"]
+            if token_type in ("NEWLINE", "EOF", "DEDENT"):
+                # The last line of a file may be closed by DEDENT without a NEWLINE
+                if logical:
+                    pending_block = self.translate_line(logical, depth, class_depths)
+                    logical = []
+                if token_type != "DEDENT":
+                    continue
+            if token_type == "INDENT":
+                depth += 1
+                if pending_block:
+                    self.emit(depth, pending_block, token["line"])
+                    pending_block = None
+                continue
+            if token_type == "DEDENT":
+                depth -= 1
+                while class_depths and class_depths[-1] > depth:
+                    class_depths.pop()
+                continue
+            if token_type == "COMMENT":
+                continue
+            logical.append(token)
+
+        if not self.lines:
+            self.emit(0, "pass", 1)
+        source = "\n".join(self.lines) + "\n"
+        try:
+            return CompiledProgram(source, self.line_map)
+        except SyntaxError as e:
+            line = self.line_map[e.lineno - 1] if e.lineno and e.lineno <= len(self.line_map) else 0
+            raise CompileError(line, f"Unsupported construct: {e.msg}")
+
+    def name(self, token: Dict) -> str:
+        value = token["value"]
+        if value.startswith("__") or value in BLOCKED_NAMES:
+            raise CompileError(token["line"], f"Identifier '{value}' is reserved")
+        if keyword.iskeyword(value) or value in ("self", "super"):
+            return f"_k_{value}"
+        return value
+
+    def translate_line(self, tokens: List[Dict], depth: int, class_depths: List[int]) -> Optional[str]:
+        """Emit one logical line; returns the statement that must open the block it starts, if any"""
+        line = tokens[0]["line"]
+        first = tokens[0]["type"]
+        in_class = bool(class_depths) and class_depths[-1] == depth
+
+        while tokens and tokens[0]["type"] in MODIFIERS:
+            tokens = tokens[1:]
+        if not tokens:
+            return None
+        first = tokens[0]["type"]
+
+        if first == "CLASS":
+            if len(tokens) < 3 or tokens[1]["type"] != "IDENTIFIER":
+                raise CompileError(line, "Invalid class definition")
+            text = f"class {self.name(tokens[1])}"
+            if tokens[2]["type"] == "INHERITS" and len(tokens) > 3:
+                text += f"({self.name(tokens[3])})"
+            self.emit(depth, text + ":", line)
+            class_depths.append(depth + 1)
+            return "pass"
+
+        if first in ("SETUP", "ACTION", "STATIC", "DEFINE"):
+            static = first == "STATIC"
+            if static:
+                tokens = tokens[1:]
+                first = tokens[0]["type"] if tokens else None
+            if first == "SETUP":
+                name, rest = "__init__", tokens[1:]
+            elif first in ("ACTION", "DEFINE") and len(tokens) > 1 and tokens[1]["type"] == "IDENTIFIER":
+                name, rest = self.name(tokens[1]), tokens[2:]
+            else:
+                raise CompileError(line, "Invalid method definition")
+            params = [self.name(token) for token in rest if token["type"] == "IDENTIFIER"]
+            if in_class and first != "DEFINE":
+                if static:
+                    self.emit(depth, "@staticmethod", line)
+                else:
+                    params.insert(0, "self")
+            self.emit(depth, f"def {name}({', '.join(params)}):", line)
+            return STEP
+
+        if first == "ELSE" and len(tokens) > 1 and tokens[1]["type"] == "IF":
+            self.emit(depth, "elif " + self.expression(tokens[2:]), line)
+            return "pass"
+
+        if first == "CATCH":
+            if len(tokens) > 1 and tokens[1]["type"] == "IDENTIFIER":
+                self.emit(depth, f"except Exception as {self.name(tokens[1])}:", line)
+            else:
+                self.emit(depth, "except Exception:", line)
+            return "pass"
+
+        if first == "RAISE":
+            self.emit(depth, f"raise SoopError({self.expression(tokens[1:])})", line)
+            return None
+
+        if first in DATA_TYPE_TOKENS and len(tokens) > 1 and tokens[1]["type"] == "IDENTIFIER":
+            # Typed declaration: int x = 5
+            tokens = tokens[1:]
+            first = "IDENTIFIER"
+
+        if len(tokens) == 2 and first == "IDENTIFIER" and tokens[1]["type"] in ("INCREMENT", "DECREMENT"):
+            operator = "+=" if tokens[1]["type"] == "INCREMENT" else "-="
+            self.emit(depth, f"{self.name(tokens[0])} {operator} 1", line)
+            return None
+
+        self.emit(depth, self.expression(tokens, statement=True), line)
+        if tokens[-1]["type"] == "COLON":
+            return STEP if first in LOOP_TOKENS else "pass"
+        return None
+
+    def expression(self, tokens: List[Dict], statement: bool = False) -> str:
+        """Python for tokens; with statement, tokens are a whole line and may start with 'for'"""
+        parts = []
+        count = len(tokens)
+        index = 0
+        while index < count:
+            token = tokens[index]
+            token_type = token["type"]
+            following = tokens[index + 1]["type"] if index + 1 < count else None
+            if token_type == "IDENTIFIER":
+                parts.append(self.name(token))
+            elif token_type in ("INTEGER_LITERAL", "FLOAT_LITERAL"):
+                parts.append(str(token["value"]))
+            elif token_type == "STRING_LITERAL":
+                parts.append(repr(unescape(token["value"])))
+            elif token_type == "NEW":
+                pass
+            elif token_type == "PARENT":
+                # parent.method(...) goes through super(); parent.attribute is the inherited attribute on self
+                member = tokens[index + 2] if index + 2 < count and following == "DOT" else None
+                calls = member is not None and index + 3 < count and tokens[index + 3]["type"] == "LPAREN"
+                if member is not None and member["type"] == "SETUP":
+                    parts.append("super().__init__")
+                    index += 3
+                    continue
+                parts.append("super()" if calls else "self")
+            elif token_type == "SETUP":
+                parts.append("__init__")
+            elif token_type == "FOR" and not (statement and index == 0):
+                raise CompileError(token["line"], "'for' is only supported as a loop statement")
+            elif token_type in DIRECT:
+                parts.append(DIRECT[token_type])
+            elif token_type in UNSUPPORTED:
+                raise CompileError(token["line"], f"'{token['value']}' is not supported by the execution engine")
+            elif token_type in ("INCREMENT", "DECREMENT"):
+                raise CompileError(token["line"], "'++' and '--' are only supported as statements")
+            else:
+                parts.append(token["value"])
+            index += 1
+        return " ".join(parts)
+
+
+class CompileCache:
+    """Compiled programs keyed by the digest of their SOOP source"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, CompiledProgram]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_or_compile(self, code: str, tokens: List[Dict]) -> Tuple[CompiledProgram, bool]:
+        """(program, whether it came from the cache)"""
+        digest = hashlib.sha256(code.encode("utf-8", "surrogatepass")).hexdigest()
+        with self.lock:
+            program = self.entries.get(digest)
+            if program is not None:
+                self.entries.move_to_end(digest)
+                return program, True
+        program = SoopCompiler(tokens).compile()
+        with self.lock:
+            self.entries[digest] = program
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return program, False
@@ -0,0 +1,196 @@
+"""
+In-memory static asset serving for the bundled frontend.
+The dist folder is indexed once at startup by the app factory. Small files
+are kept in memory together with gzip (and, when the brotli package is
+installed, brotli) variants; variants the build already wrote next to a
+file (app.js.br, app.js.gz) are used as they are. Assets are answered by a WSGI middleware in
+front of Flask, so asset requests never reach routing, the request context
+or the filesystem. Content-hashed build output (assets/name-[hash].js) is
+cached forever as immutable; everything else, index.html included, is
+revalidated with its ETag.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from typing import Dict, Optional, List, Tuple
+
+from werkzeug.wsgi import wrap_file
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only build-time .br files are served
+    brotli = None
+
+# Vite names build output assets/<name>-<hash>.<ext>
+HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml",
+                      "application/xml", "application/wasm", "font/ttf", "font/otf")
+ENCODINGS = (("br", ".br", "-br"), ("gzip", ".gz", "-gz"))  # preference order: name, file suffix, ETag suffix
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def brotli_available() -> bool:
+    return brotli is not None
+
+
+class Variant:
+    def __init__(self, path: str, size: int, body: Optional[bytes]):
+        self.path = path
+        self.size = size
+        self.body = body  # None if served from disk
+
+
+class Asset:
+    def __init__(self, path: str, content_type: str, etag: str, cache_control: str):
+        self.path = path
+        self.content_type = content_type
+        self.etag = etag
+        self.cache_control = cache_control
+        self.variants: Dict[str, Variant] = {}  # 'identity', 'br', 'gzip'
+
+
+def accepted_encodings(header: str) -> set:
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q=") and quality[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class StaticAssets:
+    def __init__(self, folder: str, memory_limit: int = 1024 * 1024, compress_min_size: int = 1024):
+        self.folder = os.path.abspath(folder)
+        self.memory_limit = memory_limit  # Larger files are streamed from disk
+        self.compress_min_size = compress_min_size
+        self.assets: Dict[str, Asset] = {}
+        self.memory_bytes = 0
+        self.lock = threading.Lock()
+        self.counters = {"identity": 0, "br": 0, "gzip": 0, "not_modified": 0}
+
+    def index(self):
+        """Scan the folder; requests for paths missing from the index fall through to the app"""
+        assets: Dict[str, Asset] = {}
+        memory_bytes = 0
+        if os.path.isdir(self.folder):
+            for root, _, files in os.walk(self.folder):
+                names = set(files)
+                for name in files:
+                    if any(name.endswith(suffix) and name[:-len(suffix)] in names for _, suffix, _ in ENCODINGS):
+                        continue
+                    path = os.path.join(root, name)
+                    url = os.path.relpath(path, self.folder).replace(os.sep, "/")
+                    asset = self._load(path, url, names)
+                    assets[url] = asset
+                    memory_bytes += sum(len(variant.body) for variant in asset.variants.values() if variant.body)
+        self.assets = assets
+        self.memory_bytes = memory_bytes
+
+    def _load(self, path: str, url: str, siblings: set) -> Asset:
+        size = os.path.getsize(path)
+        in_memory = size <= self.memory_limit
+        body = None
+        digest = hashlib.sha256()
+        with open(path, "rb") as source:
+            if in_memory:
+                body = source.read()
+                digest.update(body)
+            else:
+                for block in iter(lambda: source.read(1024 * 1024), b""):
+                    digest.update(block)
+
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type == "application/javascript":
+            content_type += "; charset=utf-8"
+        hashed = url.startswith("assets/") and HASHED_NAME.search(url) is not None
+        asset = Asset(path, content_type, digest.hexdigest()[:20], IMMUTABLE if hashed else REVALIDATE)
+        asset.variants["identity"] = Variant(path, size, body)
+
+        name = os.path.basename(path)
+        for encoding, suffix, _ in ENCODINGS:
+            if name + suffix in siblings:
+                variant_path = path + suffix
+                variant_size = os.path.getsize(variant_path)
+                variant_body = None
+                if variant_size <= self.memory_limit:
+                    with open(variant_path, "rb") as source:
+                        variant_body = source.read()
+                asset.variants[encoding] = Variant(variant_path, variant_size, variant_body)
+            elif in_memory and size >= self.compress_min_size and content_type.startswith(COMPRESSIBLE_TYPES):
+                compressed = self._compress(encoding, body)
+                # Only worth a variant if it saves at least a tenth
+                if compressed is not None and len(compressed) < size * 0.9:
+                    asset.variants[encoding] = Variant(path, len(compressed), compressed)
+        return asset
+
+    @staticmethod
+    def _compress(encoding: str, body: bytes) -> Optional[bytes]:
+        if encoding == "gzip":
+            return gzip.compress(body, compresslevel=9, mtime=0)
+        if encoding == "br" and brotli is not None:
+            return brotli.compress(body, quality=11)
+        return None
+
+    def lookup(self, path: str) -> Optional[Asset]:
+        path = path.lstrip("/")
+        return self.assets.get(path or "index.html")
+
+    def wrap(self, wsgi_app):
+        """WSGI middleware answering indexed GET/HEAD asset requests before the app sees them"""
+        def middleware(environ, start_response):
+            if environ.get("REQUEST_METHOD") in ("GET", "HEAD"):
+                asset = self.lookup(environ.get("PATH_INFO", ""))
+                if asset is not None:
+                    return self.serve(asset, environ, start_response)
+            return wsgi_app(environ, start_response)
+        return middleware
+
+    def serve(self, asset: Asset, environ, start_response):
+        accepted = accepted_encodings(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        encoding, etag = "identity", f'"{asset.etag}"'
+        for name, _, etag_suffix in ENCODINGS:
+            if name in asset.variants and name in accepted:
+                encoding, etag = name, f'"{asset.etag}{etag_suffix}"'
+                break
+        variant = asset.variants[encoding]
+
+        headers: List[Tuple[str, str]] = [
+            ("ETag", etag),
+            ("Cache-Control", asset.cache_control),
+            ("Vary", "Accept-Encoding"),
+        ]
+        if_none_match = environ.get("HTTP_IF_NONE_MATCH")
+        if if_none_match and (if_none_match.strip() == "*" or etag in
+                              [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]):
+            with self.lock:
+                self.counters["not_modified"] += 1
+            start_response("304 Not Modified", headers)
+            return [b""]
+
+        headers.append(("Content-Type", asset.content_type))
+        headers.append(("Content-Length", str(variant.size)))
+        if encoding != "identity":
+            headers.append(("Content-Encoding", encoding))
+        with self.lock:
+            self.counters[encoding] += 1
+        start_response("200 OK", headers)
+        if environ.get("REQUEST_METHOD") == "HEAD":
+            return [b""]
+        if variant.body is not None:
+            return [variant.body]
+        return wrap_file(environ, open(variant.path, "rb"))
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "files": len(self.assets),
+                "memory_bytes": self.memory_bytes,
+                "brotli": brotli_available(),
+                "responses": dict(self.counters)
+            }
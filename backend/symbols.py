@@ -0,0 +1,19 @@
+"""
+Word lookup shared by the lexers.
+RESERVED_WORDS resolves keywords, data types and boolean literals with one
+dict lookup, with the precedence match_identifier always had (keywords
+first). The lexers pass identifiers through sys.intern: every occurrence
+of a name refers to the same string object instead of a fresh slice of the
+line, so token lists hold one copy per distinct name, and the parser's and
+later passes' comparisons and set/dict lookups on names hit the identity
+fast path with a cached hash.
+"""
+from typing import Dict
+
+from token_definitions import KEYWORDS, DATA_TYPES, BOOL_VALUES
+
+# word -> token type; later mappings win, so KEYWORDS take precedence
+RESERVED_WORDS: Dict[str, str] = {**BOOL_VALUES, **DATA_TYPES, **KEYWORDS}
+
+# word -> the word itself, so reserved-word tokens share one string object too
+RESERVED_VALUES: Dict[str, str] = {word: word for word in RESERVED_WORDS}
@@ -1,9 +1,10 @@
-from typing import List, Dict
-from error import SyntaxError, SyntaxErrorType
+from typing import List, Dict, Optional, Callable
+from error import SyntaxError, SyntaxErrorType, AnalysisCancelled
 
 class SyntaxAnalyzer:
-    def __init__(self, tokens: List[Dict]):
+    def __init__(self, tokens: List[Dict], cancel_check: Optional[Callable[[], bool]] = None):
         self.tokens = tokens
+        self.cancel_check = cancel_check
         self.current = 0
         self.errors = []
         self.scope_level = 0
@@ -12,6 +13,7 @@ class SyntaxAnalyzer:
         self.has_setup = False
         self.current_class = None
         self.defined_classes = {}
+        self.declared_classes = set()
         self.in_loop = False
 
     def current_token(self) -> Dict:
@@ -41,11 +43,20 @@ class SyntaxAnalyzer:
         self.errors.append(SyntaxError(error_type, line, message).to_dict())
 
     def analyze(self) -> List[Dict]:
+        # Classes may be instantiated before their definition appears
+        self.declared_classes = {
+            self.tokens[index + 1]["value"]
+            for index in range(len(self.tokens) - 1)
+            if self.tokens[index]["type"] == "CLASS" and self.tokens[index + 1]["type"] == "IDENTIFIER"
+        }
         while self.current_token() and self.current_token()["type"] != "EOF":
             self.parse_statement()
         return self.errors
     
     def parse_statement(self):
+        if self.cancel_check and self.cancel_check():
+            raise AnalysisCancelled()
+            
         token = self.current_token()
         
         if not token:
@@ -169,7 +180,7 @@ class SyntaxAnalyzer:
             return
             
         class_name = self.tokens[self.current - 1]["value"]
-        if class_name not in self.defined_classes:
+        if class_name not in self.defined_classes and class_name not in self.declared_classes:
             self.add_error(
                 SyntaxErrorType.INVALID_OBJECT_CREATION,
                 f"Cannot instantiate undefined class '{class_name}'"
@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def make_controller(**overrides):
+    settings = dict(max_concurrency=2, cost_budget=100, small_cost=10, max_queue=4, max_wait=0.05)
+    settings.update(overrides)
+    return AdmissionController(**settings)
+
+
+def test_small_requests_use_the_reserved_slot():
+    controller = make_controller()
+    large = controller.acquire("a", 50)
+    small = controller.acquire("b", 5)
+    assert controller.stats()["in_flight"] == 2
+    controller.release(small, 0.01)
+    controller.release(large, 0.01)
+    assert controller.stats()["in_flight"] == 0
+
+
+def test_waiting_request_times_out_and_is_shed():
+    controller = make_controller()
+    held = controller.acquire("a", 50)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire("b", 50)
+    assert rejected.value.reason == "queue_timeout"
+    assert rejected.value.retry_after >= 1
+    stats = controller.stats()
+    assert stats["queue_depth"] == 0 and stats["queued_users"] == 0
+    assert stats["shed_by_reason"] == {"queue_timeout": 1}
+    controller.release(held, 0.01)
+
+
+def test_one_user_cannot_fill_the_queue():
+    controller = make_controller(max_wait=1.0)
+    held = controller.acquire("a", 50)
+    waiter = threading.Thread(target=lambda: controller.release(controller.acquire("a", 50), 0.01))
+    waiter.start()
+    while controller.stats()["queue_depth"] == 0:
+        pass
+    # max_queue 4 leaves each user a single queued request
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire("a", 50)
+    assert rejected.value.reason == "user_queue_full"
+    controller.release(held, 0.01)
+    waiter.join()
+    assert controller.stats()["in_flight"] == 0
+
+
+def test_full_queue_sheds_new_requests():
+    controller = make_controller(max_queue=0)
+    held = controller.acquire("a", 50)
+    with pytest.raises(AdmissionRejected) as rejected:
+        with controller.admit("b", 50):
+            pass
+    assert rejected.value.reason == "queue_full"
+    controller.release(held, 0.01)
@@ -0,0 +1,81 @@
+import pytest
+
+pytest.importorskip("flask")
+
+import app as server  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    return server.app.test_client()
+
+
+def test_live_update_rejects_non_string_code(client):
+    session = client.post("/live").get_json()["session"]
+    response = client.post(f"/live/{session}", json={"version": 1, "code": 123})
+    assert response.status_code == 400
+    assert client.delete(f"/live/{session}").status_code == 200
+
+
+def test_execute_releases_analysis_slot_before_running(client, monkeypatch):
+    seen = []
+
+    def run_many(program, inputs):
+        seen.append(server.admission.stats()["in_flight"])
+        return [{"status": "ok", "stdout": stdin, "error": None, "steps": 0, "duration": 0.0} for stdin in inputs]
+
+    monkeypatch.setattr(server.sandbox_pool, "run_many", run_many)
+    response = client.post("/execute", json={"code": "x = 1\nprint(x)\n", "inputs": ["a", "b"]})
+    assert response.status_code == 200
+    assert [run["stdout"] for run in response.get_json()["runs"]] == ["a", "b"]
+    assert seen == [0]
+
+
+def test_parser_deadline_returns_a_syntax_error(monkeypatch):
+    monkeypatch.setattr(server.Config, "PARSE_DEADLINE", 0.1)
+    result = server.connect_analyzers('# new totpublical(_tmp)\nvalue2 =this "template""doc"""\n')
+    assert result["status"] == "error"
+    assert result["errors"][0]["message"] == "Syntax analysis stopped after 0.1 seconds"
+
+
+def test_cancelled_analysis_still_raises():
+    with pytest.raises(server.AnalysisCancelled):
+        server.connect_analyzers("x = 1\nprint(x)\n", cancel_check=lambda: True)
+
+
+@pytest.mark.parametrize("path", ["/analyze", "/xref", "/similarity", "/transpile", "/execute"])
+def test_memory_budget_rejects_large_analyses(client, monkeypatch, path):
+    monkeypatch.setattr(server.memory_accountant, "limit", 64 * 1024)
+    response = client.post(path, json={"code": "x = 1\n" * 2000})
+    assert response.status_code == 413
+    assert response.get_json()["error"] == "Memory budget exceeded"
+
+
+def test_memory_budget_covers_projects(client, monkeypatch):
+    monkeypatch.setattr(server.memory_accountant, "limit", 64 * 1024)
+    response = client.post("/project/budget", json={"modules": {"main.soop": "x = 1\n" * 2000}})
+    assert response.status_code == 413
+    assert response.get_json()["stage"] == "project"
+
+
+def test_project_over_the_module_limit_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(server.projects, "max_modules", 2)
+    modules = {f"m{index}.soop": "x = 1\n" for index in range(3)}
+    response = client.post("/project/too-many", json={"modules": modules})
+    assert response.status_code == 413
+    assert response.get_json()["error"] == "Project too large"
+
+
+def test_similarity_names_are_scoped_per_user(client, monkeypatch, tmp_path):
+    from similarity import SimilarityIndex
+    index = SimilarityIndex(str(tmp_path / "index.sqlite3"))
+    monkeypatch.setattr(server, "similarity_index", index)
+    code = "define count(n):\n    total = 0\n    for i in range(0, n):\n        total += i\n    return total\n" * 3
+    try:
+        client.post("/similarity", json={"code": code, "name": "hw1"}, headers={"X-User": "alice"})
+        client.post("/similarity", json={"code": "x = 1\n", "name": "hw1"}, headers={"X-User": "mallory"})
+        response = client.post("/similarity", json={"code": code}, headers={"X-User": "bob"})
+        assert [candidate["name"] for candidate in response.get_json()["candidates"]] == ["alice/hw1"]
+        assert index.stats()["submissions"] == 2
+    finally:
+        index.close()
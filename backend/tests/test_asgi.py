@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("flask")
+
+import asgi  # noqa: E402
+
+
+def call(application, method, path, body=b"", headers=()):
+    """Run one request through the ASGI app; returns (status, headers, body)"""
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "headers": list(headers)}
+    asyncio.run(application(scope, receive, send))
+    start = sent[0]
+    return start["status"], dict(start["headers"]), b"".join(message.get("body", b"") for message in sent[1:])
+
+
+@pytest.fixture
+def application():
+    return asgi.AsyncApp(None, workers=1, max_streams=1)
+
+
+def post_json(application, path, data):
+    return call(application, "POST", path, json.dumps(data).encode(), [(b"content-type", b"application/json")])
+
+
+def test_health_answers_while_every_slot_is_busy(application):
+    async def scenario():
+        application.slots = asyncio.Semaphore(0)
+        application.streams = asyncio.Semaphore(0)
+    asyncio.run(scenario())
+    status, _, body = call(application, "GET", "/health")
+    assert status == 200
+    assert json.loads(body)["status"] == "healthy"
+    status, headers, _ = post_json(application, "/analyze", {"code": "x = 1\n"})
+    assert status == 503
+    assert headers[b"retry-after"] == b"1"
+
+
+def test_export_streams_a_csv_report(application):
+    status, headers, body = post_json(application, "/export", {"code": "x = 1\n", "format": "csv"})
+    assert status == 200
+    assert headers[b"content-disposition"] == b'attachment; filename="soop-analysis.csv"'
+    assert b"IDENTIFIER" in body
+
+
+def test_export_releases_the_analysis_slot_before_streaming(application, monkeypatch):
+    seen = []
+
+    def chunks():
+        seen.append(application.slots._value)
+        yield "a"
+
+    monkeypatch.setattr(asgi, "export_request", lambda load, user: (chunks(), 200, {}))
+    status, _, body = post_json(application, "/export", {"code": "x = 1\n"})
+    assert (status, body) == (200, b"a")
+    assert seen == [1]
+
+
+@pytest.mark.parametrize("path", ["/analyze", "/export"])
+def test_non_object_json_body_is_a_bad_request(application, path):
+    status, _, _ = post_json(application, path, [1])
+    assert status == 400
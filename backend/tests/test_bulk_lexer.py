@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from bulk_lexer import BulkLexicalAnalyzer  # noqa: E402
+from differential import collect_inputs  # noqa: E402
+from lexical_analyzer import LexicalAnalyzer  # noqa: E402
+
+SAMPLES = [
+    "",
+    "x = 1\n",
+    "class Dog inherits Animal:\n    setup(name):\n        parent.setup(name, 3)\n",
+    "h = 0x1F + 0b101 + 1_000 + 2.5e3\ns = 'it\\'s' + \"ok\"\n",
+    "bad = \"unclosed\nweird = $ @ ~\n  x = 1\n\tdedent\n",
+    "naïve = 'ünïcode'  # comment\r\ny = x >= 1 && !false\x0cz //= 2",
+]
+
+
+@pytest.mark.parametrize("code", SAMPLES)
+def test_bulk_lexer_matches_the_reference(code):
+    assert BulkLexicalAnalyzer(code).tokenize() == LexicalAnalyzer(code).tokenize()
+
+
+def test_bulk_lexer_matches_the_reference_on_fuzzed_inputs():
+    for _, code in collect_inputs([], 200, 11, True):
+        assert BulkLexicalAnalyzer(code).tokenize() == LexicalAnalyzer(code).tokenize(), code
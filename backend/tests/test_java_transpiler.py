@@ -0,0 +1,42 @@
+import shutil
+import subprocess
+
+import pytest
+
+from java_transpiler import BlockCache, JavaTranspiler, TranspileError, split_blocks
+from lexical_analyzer import LexicalAnalyzer
+
+ADD = ("define add(a, b):\n"
+       "    total = a + b * 2\n"
+       "    return total\n"
+       "define greet(name, times):\n"
+       "    for i in range(0, times):\n"
+       "        print(\"hi \" + name)\n"
+       "print(add(1, 2))\n"
+       "greet(\"soop\", 2)\n")
+
+
+def transpile(code: str) -> str:
+    tokens, errors = LexicalAnalyzer(code).tokenize()
+    assert not errors
+    return JavaTranspiler(BlockCache(16)).transpile(code, tokens)[0]
+
+
+def test_numeric_parameters_are_typed():
+    java = transpile(ADD)
+    assert "static Object add(double a, double b) {" in java
+    assert "static void greet(Object name, double times) {" in java
+
+
+@pytest.mark.skipif(shutil.which("javac") is None, reason="javac is not installed")
+def test_output_compiles(tmp_path):
+    (tmp_path / "Main.java").write_text(transpile(ADD))
+    subprocess.run(["javac", "Main.java"], cwd=tmp_path, check=True)
+
+
+@pytest.mark.parametrize("code", ["class", "x = 1\nclass", "for", "for i in"])
+def test_header_at_end_of_input(code):
+    tokens, _ = LexicalAnalyzer(code).tokenize()
+    assert list(split_blocks(code, tokens))
+    with pytest.raises(TranspileError):
+        transpile(code)
@@ -0,0 +1,58 @@
+import pytest
+
+from lexical_analyzer import LexicalAnalyzer
+from lint import LintEngine
+
+
+def lint(code, **kwargs):
+    tokens, errors = LexicalAnalyzer(code).tokenize()
+    assert not errors
+    return [(finding["rule"], finding["line"]) for finding in LintEngine(**kwargs).run(tokens)]
+
+
+def test_naming_rule():
+    code = (
+        "class shape:\n"
+        "    setup(n):\n"
+        "        this.n = n\n"
+        "    action Area():\n"
+        "        return 0\n"
+        "define Twice(x):\n"
+        "    return x * 2\n"
+        "MAX_SIZE = 3\n"
+        "Total = 1\n"
+    )
+    assert lint(code) == [("naming", 1), ("naming", 4), ("naming", 6), ("naming", 9)]
+
+
+def test_unused_variable_rule_checks_function_locals():
+    code = (
+        "define f(x):\n"
+        "    unused = 1\n"
+        "    used = x\n"
+        "    total = 0\n"
+        "    total += used\n"
+        "    for i in range(0, 3):\n"
+        "        print(i)\n"
+        "    return total\n"
+        "top = 1\n"
+    )
+    assert lint(code) == [("unused-variable", 2)]
+
+
+def test_long_method_rule_uses_the_configured_limit():
+    code = "define f(x):\n" + "    print(x)\n" * 4
+    assert lint(code, options={"max_method_lines": 5}) == []
+    assert lint(code, options={"max_method_lines": 4}) == [("long-method", 1)]
+
+
+def test_class_without_setup_is_left_to_the_parser():
+    assert lint("class Shape:\n    action area():\n        return 0\n") == []
+
+
+def test_rules_can_be_disabled():
+    code = "define F(x):\n    y = 1\n    return x\n"
+    assert lint(code) == [("naming", 1), ("unused-variable", 2)]
+    assert lint(code, disabled=["naming"]) == [("unused-variable", 2)]
+    with pytest.raises(KeyError):
+        LintEngine(disabled=["missing-setup"])
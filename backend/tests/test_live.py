@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+from error import AnalysisCancelled
+from live import LiveChannel, SessionLimitReached
+
+
+def next_event(session, timeout=5.0):
+    event = session.events.get(timeout=timeout)
+    assert event is not None
+    return event
+
+
+def test_newer_version_cancels_running_analysis():
+    started = threading.Event()
+
+    def analyze(user, code, cancel_check):
+        if code == "slow":
+            started.set()
+            while not cancel_check():
+                pass
+            raise AnalysisCancelled()
+        return {"code": code}
+
+    channel = LiveChannel(analyze, debounce=0.0, session_timeout=60)
+    session = channel.create("alice")
+    session.submit(1, "slow")
+    assert started.wait(5)
+    session.submit(2, "fast")
+    event = next_event(session)
+    assert (event["event"], event["version"], event["result"]) == ("result", 2, {"code": "fast"})
+    assert not session.submit(1, "old")
+    channel.close(session.id)
+
+
+def test_failed_analysis_reports_error_and_session_keeps_working():
+    def analyze(user, code, cancel_check):
+        return {"length": len(code)}
+
+    channel = LiveChannel(analyze, debounce=0.0, session_timeout=60)
+    session = channel.create("alice")
+    session.submit(1, 123)
+    event = next_event(session)
+    assert event["event"] == "error" and event["version"] == 1
+    assert "TypeError" in event["error"]["message"] or "len()" in event["error"]["message"]
+    session.submit(2, "abc")
+    event = next_event(session)
+    assert (event["event"], event["result"]) == ("result", {"length": 3})
+    channel.close(session.id)
+
+
+def test_session_limits():
+    channel = LiveChannel(lambda user, code, check: {}, debounce=0.0, session_timeout=60,
+                          max_sessions=3, max_sessions_per_user=2)
+    sessions = [channel.create("alice"), channel.create("alice")]
+    with pytest.raises(SessionLimitReached):
+        channel.create("alice")
+    sessions.append(channel.create("bob"))
+    with pytest.raises(SessionLimitReached):
+        channel.create("carol")
+    channel.close(sessions[0].id)
+    sessions[0] = channel.create("carol")
+    for session in sessions:
+        channel.close(session.id)
+
+
+def test_idle_sessions_expire_on_lookup():
+    channel = LiveChannel(lambda user, code, check: {}, debounce=0.0, session_timeout=0)
+    session = channel.create("alice")
+    channel._next_expiry = 0.0
+    assert channel.get("missing") is None
+    assert session.closed
+    assert channel.stats() == {"sessions": 0}
@@ -0,0 +1,61 @@
+import io
+import json
+
+from lexical_analyzer import LexicalAnalyzer
+from lsp_server import Document, LanguageServer, _split_lines
+
+
+def sent(writer: io.BytesIO):
+    messages = []
+    for chunk in writer.getvalue().split(b"Content-Length: ")[1:]:
+        messages.append(json.loads(chunk.split(b"\r\n\r\n", 1)[1]))
+    return messages
+
+
+def test_split_lines_follows_lsp_line_ends():
+    assert _split_lines("a\r\nb\rc\x0cd e") == ["a", "b", "c\x0cd e"]
+    assert _split_lines("a\n") == ["a", ""]
+    assert _split_lines("") == [""]
+
+
+def test_diagnostics_use_editor_lines():
+    document = Document("file:///a.soop", 1, "x = 1\x0cy = \"open\n")
+    (diagnostic,) = document.diagnostics()
+    # The lexer reports line 2, column 5; the editor has it after the form feed on line 0
+    assert diagnostic["range"]["start"] == {"line": 0, "character": 10}
+
+
+def test_edits_around_form_feeds_match_a_full_lex():
+    document = Document("file:///a.soop", 1, "x = 1\x0c\ny = 2\n")
+    document.apply_change({"range": {"start": {"line": 1, "character": 0}, "end": {"line": 1, "character": 0}},
+                           "text": "if x > 0:\x0c    z = 3\n"})
+    text = "x = 1\x0c\nif x > 0:\x0c    z = 3\ny = 2\n"
+    assert document.lines == _split_lines(text)
+    assert document.token_stream() == LexicalAnalyzer(text).tokenize()
+
+
+def test_malformed_messages_get_a_parse_error():
+    body = b'{"jsonrpc": "2.0", "method": "exit"}'
+    reader = io.BytesIO(
+        b"Content-Type: x\r\n\r\n"
+        + b"Content-Length: 5\r\n\r\n{oops"
+        + b"Content-Length: %d\r\n\r\n" % len(body) + body
+    )
+    writer = io.BytesIO()
+    LanguageServer(reader, writer).serve()
+    errors = [message["error"]["code"] for message in sent(writer)]
+    assert errors == [-32700, -32700]
+
+
+def test_failing_notification_is_logged_and_server_keeps_running():
+    writer = io.BytesIO()
+    server = LanguageServer(io.BytesIO(), writer)
+    assert server.handle({"method": "textDocument/didOpen", "params": {"textDocument": {"uri": "file:///a.soop"}}})
+    assert server.handle({"method": "textDocument/didOpen", "params": {
+        "textDocument": {"uri": "file:///b.soop", "version": 1, "text": "x = 1\n"}
+    }})
+    messages = sent(writer)
+    assert messages[0]["method"] == "window/logMessage"
+    assert "textDocument/didOpen" in messages[0]["params"]["message"]
+    assert messages[1]["method"] == "textDocument/publishDiagnostics"
+    assert messages[1]["params"]["uri"] == "file:///b.soop"
@@ -0,0 +1,37 @@
+import pytest
+
+from project import Project, ProjectTooLarge
+
+MODULES = {
+    "shapes.soop": "class Shape:\n    setup(n):\n        this.n = n\n",
+    "util.soop": "define twice(x):\n    return x * 2\n",
+    "main.soop": "import shapes\nimport util\ns = new Shape(1)\nprint(util.twice(2))\n",
+    "broken.soop": "x = 'unterminated\n",
+}
+
+
+def test_parallel_wave_matches_serial():
+    serial = Project(workers=0).update(MODULES)
+    parallel = Project(workers=2).update(MODULES)
+    assert parallel["modules"] == serial["modules"]
+    assert parallel["modules"]["broken"]["errors"][0]["type"] == "Lexical Error"
+
+
+def test_unchanged_exports_cut_off_dependents_on_the_pool():
+    project = Project(workers=2)
+    project.update(MODULES)
+    result = project.update({"util.soop": "define twice(x):\n    return x + x\n"})
+    assert result["analyzed"] == ["util"]
+
+
+def test_updates_over_the_limits_are_rejected_unchanged():
+    project = Project(max_modules=4, max_size=200)
+    project.update(MODULES)
+    with pytest.raises(ProjectTooLarge):
+        project.update({"extra.soop": "x = 1\n"})
+    with pytest.raises(ProjectTooLarge):
+        project.update({"util.soop": "x = 1\n" * 40})
+    assert sorted(project.modules) == ["broken", "main", "shapes", "util"]
+    # Removing a module in the same update makes room for another
+    result = project.update({"extra.soop": "x = 1\n"}, removed=["broken.soop"])
+    assert "extra" in result["modules"] and "broken" not in result["modules"]
@@ -0,0 +1,19 @@
+import gzip
+import json
+
+from replay import load_requests
+
+
+def write_capture(path, records):
+    with gzip.open(path, "wt", encoding="utf-8") as capture:
+        for record in records:
+            capture.write(json.dumps(record) + "\n")
+
+
+def test_requests_of_several_files_are_merged_by_time(tmp_path):
+    first, second = str(tmp_path / "a.ndjson.gz"), str(tmp_path / "b.ndjson.gz")
+    write_capture(first, [{"t": 1.0, "user": "u1", "body": {"n": 1}}, {"t": 4.0, "user": "u1", "body": {"n": 4}}])
+    write_capture(second, [{"t": 3.0, "user": "u2", "body": {"n": 3}}, {"t": 2.0, "user": "u2", "body": {"n": 2}}])
+    requests = load_requests([first, second])
+    assert [json.loads(body)["n"] for _, body in requests] == [1, 2, 3, 4]
+    assert [user for user, _ in requests] == ["u1", "u2", "u2", "u1"]
@@ -0,0 +1,44 @@
+import csv
+import io
+
+import report_export
+
+TOKENS = [
+    {"type": "IDENTIFIER", "value": "total", "line": 1},
+    {"type": "ASSIGN", "value": "=", "line": 1},
+    {"type": "STRING", "value": "\"a, <b>\"", "line": 2},
+]
+ERRORS = [{"type": "LexicalError", "message": "Bad <char>", "line": 3, "column": 4}]
+
+
+def test_csv_has_one_row_per_error_and_token():
+    rows = list(csv.reader(io.StringIO("".join(report_export.render("csv", TOKENS, ERRORS)))))
+    assert rows[0] == ["section", "type", "value", "line", "column"]
+    assert rows[1] == ["error", "LexicalError", "Bad <char>", "3", "4"]
+    assert rows[4] == ["token", "STRING", "\"a, <b>\"", "2", ""]
+    assert len(rows) == 1 + len(ERRORS) + len(TOKENS)
+
+
+def test_html_escapes_values():
+    document = "".join(report_export.render("html", TOKENS, ERRORS, title="<Report>"))
+    assert "<title>&lt;Report&gt;</title>" in document
+    assert "Bad &lt;char&gt;" in document
+    assert "<td>\"a, &lt;b&gt;\"</td>" in document
+    assert "<h2>Tokens (3)</h2>" in document
+
+
+def test_print_repeats_the_header_on_every_page(monkeypatch):
+    monkeypatch.setattr(report_export, "PRINT_ROWS_PER_PAGE", 2)
+    document = "".join(report_export.render("print", TOKENS, []))
+    assert "No errors found." in document
+    assert "Tokens, page 2 of 2" in document
+    assert document.count(report_export.TOKEN_HEADER) == 2
+
+
+def test_output_is_chunked(monkeypatch):
+    monkeypatch.setattr(report_export, "CHUNK_SIZE", 100)
+    tokens = [{"type": "IDENTIFIER", "value": f"name{i}", "line": i} for i in range(50)]
+    chunks = list(report_export.render("csv", tokens, []))
+    assert len(chunks) > 1
+    assert all(len(chunk) < 200 for chunk in chunks)
+    assert "".join(chunks).count("\n") == 51
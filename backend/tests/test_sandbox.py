@@ -0,0 +1,83 @@
+import pytest
+
+from lexical_analyzer import LexicalAnalyzer
+from sandbox import SandboxPool
+from soop_compiler import SoopCompiler, CompileError
+
+FRAME_ESCAPE = """class Box:
+    setup():
+        this.g = list()
+    action store(v):
+        this.g = v
+c = new Box()
+b = new Box()
+c.store((c.g.gi_frame.f_back.f_back.f_globals for i in range(1)))
+b.g.extend(c.g)
+b.store(b.g.pop().get("os").getcwd())
+print(b.g)
+"""
+
+
+def compile_soop(code: str):
+    tokens, errors = LexicalAnalyzer(code).tokenize()
+    assert not errors
+    return SoopCompiler(tokens).compile()
+
+
+@pytest.fixture
+def pool():
+    pool = SandboxPool(1, 128 * 1024 * 1024, 2.0, 100000, 10000)
+    yield pool
+    pool.shutdown()
+
+
+def test_runs_program(pool):
+    result = pool.run(compile_soop("for i in range(0, 3):\n    print(i)\nprint(input())\n"), "done")
+    assert result["status"] == "ok"
+    assert result["stdout"] == "0\n1\n2\ndone\n"
+
+
+def test_frame_escape_is_rejected():
+    with pytest.raises(CompileError) as error:
+        compile_soop(FRAME_ESCAPE)
+    assert error.value.line == 8
+
+
+@pytest.mark.parametrize("expression", ["x.gi_frame", "x.f_back", "x.f_globals", "x.f_builtins", "x.tb_frame",
+                                        "x.cr_frame", "x.gi_code", "(x for i in range(1))"])
+def test_frame_access_is_rejected(expression):
+    with pytest.raises(CompileError):
+        compile_soop(f"x = 1\ny = {expression}\n")
+
+
+def test_worker_frames_hold_no_modules(pool):
+    class Program:
+        # Compiled directly, as if a frame had been reached past the compiler
+        code = compile(
+            "try:\n"
+            "    1 / 0\n"
+            "except Exception as e:\n"
+            "    frame = e.__traceback__.tb_frame\n"
+            "while frame is not None:\n"
+            "    print(sorted(frame.f_globals), '__import__' in frame.f_builtins, 'open' in frame.f_builtins)\n"
+            "    frame = frame.f_back\n",
+            "<soop>", "exec"
+        )
+
+        @staticmethod
+        def soop_line(line):
+            return line
+
+    result = pool.run(Program())
+    assert result["status"] == "ok"
+    for line in result["stdout"].splitlines():
+        assert "'os'" not in line and "'subprocess'" not in line and "'sys'" not in line
+        assert line.endswith("false false")
+
+
+def test_run_many_keeps_input_order(pool):
+    program = compile_soop("print(input())\n")
+    pool.workers = 2
+    pool.idle.put(None)
+    runs = pool.run_many(program, [str(index) for index in range(6)])
+    assert [run["stdout"] for run in runs] == [f"{index}\n" for index in range(6)]
@@ -0,0 +1,29 @@
+from lexical_analyzer import LexicalAnalyzer
+from semantic_analyzer import SemanticAnalyzer
+from xref import XrefIndex
+
+
+def analyze(code: str, xref=None):
+    tokens, errors = LexicalAnalyzer(code).tokenize()
+    assert not errors
+    return SemanticAnalyzer(tokens, xref=xref).analyze()
+
+
+def test_nested_class_reference_is_indexed():
+    code = ("class Outer:\n"
+            "    class Inner:\n"
+            "        setup():\n"
+            "            this.v = 1\n"
+            "    setup():\n"
+            "        this.i = new Inner()\n")
+    xref = XrefIndex()
+    assert analyze(code, xref) == []
+    inner = xref.lookup("Outer.Inner")
+    assert inner["kind"] == "class"
+    assert inner["references"][0] == 6
+
+
+def test_top_level_class_reference_is_indexed():
+    xref = XrefIndex()
+    assert analyze("class Dog:\n    setup():\n        this.n = 1\nd = new Dog()\n", xref) == []
+    assert xref.lookup("Dog")["references"][0] == 4
@@ -0,0 +1,48 @@
+from similarity import SimilarityIndex, tokenize
+
+BLOCKS = [
+    "define area(w, h):\n    return w * h\n",
+    "class Animal:\n    setup(name, age):\n        this.name = name\n        this.age = age\n",
+    "define count(n):\n    total = 0\n    for i in range(0, n):\n        if i > 5:\n            break\n        total += i\n    return total\n",
+    "flag = (x >= 1 && y != 2) || !true\n",
+    "try:\n    raise \"bad\"\ncatch e:\n    print(e)\n",
+    "define greet(name):\n    print(\"hello \" + name, 3, 4.5)\n",
+    "h = 0x1F + 0b101 + 1_000\nx //= 2\n",
+    "while x < 10:\n    x = x + 1\n    if x == 3:\n        continue\n",
+]
+OTHER = [
+    "define mean(values):\n    return sum(values) / len(values)\n",
+    "items = [1, 2, 3]\nfor item in items:\n    print(item)\n",
+    "class Box:\n    setup(size):\n        this.size = size\n    action grow(by):\n        return this.size * by\n",
+    "s = 'it' + \"ok\"\nz = -y % 7\n",
+]
+ORIGINAL = "".join(BLOCKS)
+RENAMED = ORIGINAL.replace("total", "result").replace("name", "label")
+PARTIAL = "".join(BLOCKS[:4] + OTHER)
+UNRELATED = "".join(OTHER * 2)
+
+
+def test_query_ranks_closer_copies_first(tmp_path):
+    index = SimilarityIndex(str(tmp_path / "index.sqlite3"))
+    try:
+        index.add("renamed", tokenize(RENAMED))
+        index.add("partial", tokenize(PARTIAL))
+        index.add("unrelated", tokenize(UNRELATED))
+        results = index.query(tokenize(ORIGINAL), min_score=0.3)
+        assert [result["name"] for result in results] == ["renamed", "partial"]
+        assert results[0]["score"] == 1.0
+        assert results[1]["score"] < 1.0
+        assert index.query(tokenize(ORIGINAL), min_score=0.3, exclude="renamed")[0]["name"] == "partial"
+    finally:
+        index.close()
+
+
+def test_adding_a_name_again_replaces_the_submission(tmp_path):
+    index = SimilarityIndex(str(tmp_path / "index.sqlite3"))
+    try:
+        index.add("one", tokenize(ORIGINAL))
+        index.add("one", tokenize(UNRELATED))
+        assert index.stats()["submissions"] == 1
+        assert index.query(tokenize(ORIGINAL), min_score=0.3) == []
+    finally:
+        index.close()
@@ -0,0 +1,14 @@
+from soop_analyze import analyzer_sources
+
+
+def test_analyzer_sources_follow_imports():
+    sources = analyzer_sources()
+    assert {"lexical_analyzer.py", "syntax_analyzer.py", "semantic_analyzer.py"} <= set(sources)
+    # Imported by the semantic analyzer and the lexer
+    assert {"xref.py", "soop_token.py", "class_hierarchy.py", "error.py"} <= set(sources)
+    assert "app.py" not in sources
+
+
+def test_reserved_word_table_invalidates_the_cache():
+    # The lexer takes its reserved words from symbols.py
+    assert "symbols.py" in analyzer_sources()
@@ -0,0 +1,89 @@
+import gzip
+
+import pytest
+
+pytest.importorskip("werkzeug")
+
+from static_assets import IMMUTABLE, REVALIDATE, StaticAssets, accepted_encodings  # noqa: E402
+
+SCRIPT = ("console.log('soop');\n" * 200).encode()
+
+
+@pytest.fixture
+def assets(tmp_path):
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_text("<!doctype html><div id=app></div>")
+    (tmp_path / "assets" / "main-a1b2c3d4.js").write_bytes(SCRIPT)
+    (tmp_path / "assets" / "style-e5f6a7b8.css").write_text("body{}" * 400)
+    (tmp_path / "assets" / "style-e5f6a7b8.css.br").write_bytes(b"prebuilt brotli")
+    static = StaticAssets(str(tmp_path))
+    static.index()
+    return static
+
+
+def get(static, path, **environ):
+    environ.setdefault("REQUEST_METHOD", "GET")
+    environ["PATH_INFO"] = path
+    response = {}
+
+    def start_response(status, headers):
+        response["status"] = status
+        response["headers"] = dict(headers)
+
+    def fallback(environ, start_response):
+        start_response("404 NOT FOUND", [])
+        return [b"app"]
+
+    body = b"".join(static.wrap(fallback)(environ, start_response))
+    return response["status"], response["headers"], body
+
+
+def test_accepted_encodings_drops_zero_quality():
+    assert accepted_encodings("gzip, br;q=0, deflate;q=0.5") == {"gzip", "deflate"}
+
+
+def test_gzip_is_chosen_when_brotli_is_not_accepted(assets):
+    status, headers, body = get(assets, "/assets/main-a1b2c3d4.js", HTTP_ACCEPT_ENCODING="gzip")
+    assert status == "200 OK"
+    assert headers["Content-Encoding"] == "gzip"
+    assert headers["ETag"].endswith('-gz"')
+    assert headers["Cache-Control"] == IMMUTABLE
+    assert gzip.decompress(body) == SCRIPT
+
+
+def test_prebuilt_brotli_variant_is_preferred(assets):
+    status, headers, body = get(assets, "/assets/style-e5f6a7b8.css", HTTP_ACCEPT_ENCODING="gzip, br")
+    assert headers["Content-Encoding"] == "br"
+    assert body == b"prebuilt brotli"
+    assert "assets/style-e5f6a7b8.css.br" not in assets.assets
+
+
+def test_identity_without_accept_encoding(assets):
+    status, headers, body = get(assets, "/assets/main-a1b2c3d4.js")
+    assert "Content-Encoding" not in headers
+    assert headers["Vary"] == "Accept-Encoding"
+    assert body == SCRIPT
+
+
+def test_matching_etag_answers_304_per_encoding(assets):
+    _, headers, _ = get(assets, "/", HTTP_ACCEPT_ENCODING="gzip")
+    assert headers["Cache-Control"] == REVALIDATE
+    etag = headers["ETag"]
+
+    status, _, body = get(assets, "/", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=f"W/{etag}")
+    assert status == "304 Not Modified"
+    assert body == b""
+    assert assets.stats()["responses"]["not_modified"] == 1
+
+    # The index is too small to compress, so every encoding shares the identity ETag
+    status, _, _ = get(assets, "/", HTTP_ACCEPT_ENCODING="br", HTTP_IF_NONE_MATCH=etag)
+    assert status == "304 Not Modified"
+
+    _, gzip_headers, _ = get(assets, "/assets/main-a1b2c3d4.js", HTTP_ACCEPT_ENCODING="gzip")
+    status, _, _ = get(assets, "/assets/main-a1b2c3d4.js", HTTP_IF_NONE_MATCH=gzip_headers["ETag"])
+    assert status == "200 OK"
+
+
+def test_unknown_paths_and_posts_fall_through_to_the_app(assets):
+    assert get(assets, "/analyze")[2] == b"app"
+    assert get(assets, "/index.html", REQUEST_METHOD="POST")[2] == b"app"
@@ -0,0 +1,18 @@
+import os
+
+from tracing import Tracer
+
+
+def test_opening_prunes_files_of_earlier_processes(tmp_path):
+    for pid in range(100, 130):
+        path = tmp_path / f"traces-{pid}.otlp.ndjson"
+        path.touch()
+        os.utime(path, (pid, pid))
+    tracer = Tracer(str(tmp_path), 1.0, 0, max_files=5)
+    trace = tracer.start("POST /analyze")
+    with trace.root():
+        pass
+    trace.finish()
+    tracer.close()
+    expected = {f"traces-{pid}.otlp.ndjson" for pid in [*range(125, 130), os.getpid()]}
+    assert set(os.listdir(tmp_path)) == expected
@@ -0,0 +1,23 @@
+import os
+import time
+
+from traffic_capture import TrafficCapture, read_corpus
+
+
+def test_records_wall_clock_time_and_prunes_old_files(tmp_path):
+    for index in range(30):
+        path = tmp_path / f"analyze-20260101-0000{index:02d}-{100 + index}.ndjson.gz"
+        path.touch()
+        os.utime(path, (index, index))
+    capture = TrafficCapture(str(tmp_path), 1.0, salt="test", max_files=5)
+    before = time.time()
+    capture.maybe_record("alice", {"code": "x = 1"})
+    capture.close()
+
+    names = os.listdir(tmp_path)
+    assert len(names) == 6
+    own = [name for name in names if name.endswith(f"-{os.getpid()}.ndjson.gz")]
+    records = list(read_corpus(str(tmp_path / own[0])))
+    assert records[0]["body"] == {"code": "x = 1"}
+    assert records[0]["user"] == capture.anonymize("alice") != "alice"
+    assert before - 1 <= records[0]["t"] <= time.time() + 1
@@ -0,0 +1,266 @@
+"""
+Per-request trace spans written to a local file in OTLP JSON.
+Each line of the file is one ExportTraceServiceRequest holding the spans of
+one request, the layout the OpenTelemetry collector's file exporter reads
+and writes, so traces can be loaded into any OTLP backend later without the
+server ever talking to the network.
+
+Spans of every request are recorded as plain tuples, which costs a few
+clock reads per request. Whether a trace is kept is decided when it ends:
+head sampling keeps a random fraction of requests, tail sampling keeps
+every request slower than a threshold or ending in an error. Only kept
+traces are serialized.
+
+Each worker process writes its own file, named by PID. When a process opens
+its file it deletes the oldest files left by earlier processes beyond
+max_files, so recycled workers do not accumulate files.
+"""
+import glob
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+SERVICE_NAME = "soop-analyzer"
+SCOPE_NAME = "soop.tracing"
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+def _attribute(key: str, value: Any) -> Dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}  # OTLP JSON encodes int64 as a string
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Span:
+    """Timing and attributes of one step; use as a context manager"""
+
+    __slots__ = ("trace", "name", "parent", "index", "start", "end", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent: int):
+        self.trace = trace
+        self.name = name
+        self.parent = parent
+        self.index = 0
+        self.start = 0
+        self.end = 0
+        self.attributes: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+
+    def __setitem__(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        self.index = len(self.trace.spans)
+        self.trace.spans.append(self)
+        self.trace.current = self.index
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter_ns()
+        self.trace.current = self.parent
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        return False
+
+
+class _NoSpan:
+    """Span stand-in when tracing is off"""
+
+    def __setitem__(self, key: str, value: Any):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+class Trace:
+    """Spans of one request; the first span opened is the root"""
+
+    def __init__(self, tracer: Optional["Tracer"], name: str, head_sampled: bool):
+        self.tracer = tracer
+        self.name = name
+        self.head_sampled = head_sampled
+        self.spans: List[Span] = []
+        self.current = -1
+        self.wall_start = time.time_ns()
+        self.perf_start = time.perf_counter_ns()
+
+    def span(self, name: str) -> Span:
+        if self.tracer is None:
+            return NO_SPAN
+        return Span(self, name, self.current)
+
+    def root(self) -> Span:
+        return self.span(self.name)
+
+    def finish(self):
+        if self.tracer is not None and self.spans:
+            self.tracer.finish(self)
+
+    def to_otlp(self) -> Dict:
+        trace_id = os.urandom(16).hex()
+        span_ids = [os.urandom(8).hex() for _ in self.spans]
+        offset = self.wall_start - self.perf_start
+        spans = []
+        for span, span_id in zip(self.spans, span_ids):
+            record = {
+                "traceId": trace_id,
+                "spanId": span_id,
+                "name": span.name,
+                "kind": SPAN_KIND_SERVER if span.parent < 0 else SPAN_KIND_INTERNAL,
+                "startTimeUnixNano": str(span.start + offset),
+                "endTimeUnixNano": str((span.end or span.start) + offset),
+                "attributes": [_attribute(key, value) for key, value in span.attributes.items()],
+                "status": {"code": STATUS_ERROR, "message": span.error} if span.error else {"code": STATUS_OK}
+            }
+            if span.parent >= 0:
+                record["parentSpanId"] = span_ids[span.parent]
+            spans.append(record)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    _attribute("service.name", SERVICE_NAME),
+                    _attribute("process.pid", os.getpid())
+                ]},
+                "scopeSpans": [{"scope": {"name": SCOPE_NAME}, "spans": spans}]
+            }]
+        }
+
+
+NO_TRACE = Trace(None, "", False)
+
+
+def _modified(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+class Tracer:
+    """
+    Keeps a trace if it was head-sampled (sample_rate), took at least
+    slow_threshold seconds, or its root span ended in an error. With both
+    sample_rate and slow_threshold at 0 tracing is off and start() returns
+    NO_TRACE. The file is rotated at max_bytes, keeping `backups` old files;
+    at most max_files files (rotated ones included) of other processes are kept.
+    """
+
+    def __init__(self, folder: str, sample_rate: float, slow_threshold: float,
+                 max_bytes: int = 64 * 1024 * 1024, backups: int = 3, max_files: int = 20):
+        self.folder = folder
+        self.sample_rate = sample_rate
+        self.slow_threshold_ns = int(slow_threshold * 1e9)
+        self.enabled = sample_rate > 0 or slow_threshold > 0
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.max_files = max_files
+        self.lock = threading.Lock()
+        self.file = None
+        self.pid = 0
+        self.written_bytes = 0
+        self.traces = 0
+        self.kept: Dict[str, int] = {"sampled": 0, "slow": 0, "error": 0}
+
+    def start(self, name: str) -> Trace:
+        if not self.enabled:
+            return NO_TRACE
+        return Trace(self, name, self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def _reason(self, trace: Trace) -> Optional[str]:
+        root = trace.spans[0]
+        if trace.head_sampled:
+            return "sampled"
+        if self.slow_threshold_ns and root.end - root.start >= self.slow_threshold_ns:
+            return "slow"
+        if root.error or root.attributes.get("http.status_code", 200) >= 500:
+            return "error"
+        return None
+
+    def finish(self, trace: Trace):
+        reason = self._reason(trace)
+        with self.lock:
+            self.traces += 1
+            if reason is None:
+                return
+            self.kept[reason] += 1
+        trace.spans[0]["sampling.reason"] = reason
+        line = json.dumps(trace.to_otlp(), separators=(",", ":")) + "\n"
+        with self.lock:
+            self._open()
+            if self.written_bytes + len(line) > self.max_bytes and self.written_bytes:
+                self._rotate()
+            self.file.write(line)
+            self.file.flush()
+            self.written_bytes += len(line)
+
+    def path(self) -> str:
+        return os.path.join(self.folder, f"traces-{self.pid}.otlp.ndjson")
+
+    def _open(self):
+        # Workers forked from a preloaded app must not share the parent's file
+        if self.file is not None and self.pid == os.getpid():
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        self.pid = os.getpid()
+        self._prune()
+        self.file = open(self.path(), "a", encoding="utf-8")
+        self.written_bytes = self.file.tell()
+
+    def _prune(self):
+        own = self.path()
+        others = [path for path in glob.glob(os.path.join(self.folder, "traces-*.otlp.ndjson*"))
+                  if path != own and not path.startswith(own + ".")]
+        others.sort(key=_modified, reverse=True)
+        for path in others[self.max_files:]:
+            try:
+                os.remove(path)
+            except OSError:  # Already pruned by another worker
+                pass
+
+    def _rotate(self):
+        self.file.close()
+        path = self.path()
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{index}"):
+                os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+        self.file = open(path, "a", encoding="utf-8")
+        self.written_bytes = 0
+
+    def close(self):
+        with self.lock:
+            if self.file is not None and self.pid == os.getpid():
+                self.file.close()
+            self.file = None
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "enabled": self.enabled,
+                "sample_rate": self.sample_rate,
+                "slow_threshold_ms": self.slow_threshold_ns // 1000000,
+                "traces": self.traces,
+                "kept": dict(self.kept),
+                "file": self.path() if self.file is not None else None
+            }
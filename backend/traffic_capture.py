@@ -0,0 +1,122 @@
+"""
+Sampled capture of /analyze traffic for replay load tests (see replay.py).
+Captured requests are appended as JSON lines to a gzip file per worker
+process. The X-User header is replaced by a keyed hash, so one user's
+requests keep a common pseudonym within a capture without the name being
+stored. Each record holds the arrival time (Unix seconds, so captures of
+several workers can be merged), the pseudonym and the request body.
+A process opening its capture file deletes the oldest files of earlier
+processes beyond max_files, so recycled workers do not accumulate files.
+"""
+import glob
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+FLUSH_EVERY = 64  # Records between flushes; a crashed worker loses at most this many
+
+
+def read_corpus(path: str) -> Iterator[Dict]:
+    """Records of a capture file; a file cut short by a crash yields everything before the cut"""
+    with gzip.open(path, "rt", encoding="utf-8") as corpus:
+        try:
+            for line in corpus:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, json.JSONDecodeError):
+            return
+
+
+def _modified(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+class TrafficCapture:
+    """Opt-in: nothing is written while sample_rate is 0"""
+
+    def __init__(self, folder: str, sample_rate: float, salt: str = "", max_bytes: int = 256 * 1024 * 1024,
+                 max_files: int = 20):
+        self.folder = folder
+        self.sample_rate = sample_rate
+        # Without a configured salt pseudonyms are only stable within one process
+        self.salt = (salt or os.urandom(16).hex()).encode("utf-8")
+        self.max_bytes = max_bytes  # Uncompressed bytes per capture file
+        self.max_files = max_files  # Capture files of earlier processes kept
+        self.lock = threading.Lock()
+        self.file: Optional[gzip.GzipFile] = None
+        self.pid = 0
+        self.written_bytes = 0
+        self.pending = 0
+        self.captured = 0
+        self.dropped = 0  # Sampled but not written because the file is full
+
+    def anonymize(self, user: str) -> str:
+        return "user-" + hmac.new(self.salt, user.encode("utf-8", "surrogatepass"), hashlib.sha256).hexdigest()[:12]
+
+    def maybe_record(self, user: str, body: Dict):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return
+        line = None
+        with self.lock:
+            if self.written_bytes >= self.max_bytes:
+                self.dropped += 1
+                return
+            self._open()
+            line = json.dumps({
+                "t": round(time.time(), 6),
+                "user": self.anonymize(user),
+                "body": body
+            }, ensure_ascii=False).encode("utf-8", "surrogatepass") + b"\n"
+            self.file.write(line)
+            self.written_bytes += len(line)
+            self.captured += 1
+            self.pending += 1
+            if self.pending >= FLUSH_EVERY:
+                self.file.flush()
+                self.pending = 0
+
+    def _open(self):
+        # Workers forked from a preloaded app must not share the parent's file
+        if self.file is not None and self.pid == os.getpid():
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        self.pid = os.getpid()
+        self._prune()
+        name = f"analyze-{time.strftime('%Y%m%d-%H%M%S')}-{self.pid}.ndjson.gz"
+        self.file = gzip.open(os.path.join(self.folder, name), "wb", compresslevel=6)
+        self.written_bytes = 0
+        self.pending = 0
+
+    def _prune(self):
+        paths = glob.glob(os.path.join(self.folder, "analyze-*.ndjson.gz"))
+        paths.sort(key=_modified, reverse=True)
+        for path in paths[self.max_files:]:
+            try:
+                os.remove(path)
+            except OSError:  # Already pruned by another worker
+                pass
+
+    def close(self):
+        with self.lock:
+            if self.file is not None and self.pid == os.getpid():
+                self.file.close()
+            self.file = None
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "sample_rate": self.sample_rate,
+                "captured": self.captured,
+                "dropped": self.dropped,
+                "written_bytes": self.written_bytes,
+                "file": self.file.name if self.file is not None else None
+            }
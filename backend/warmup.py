@@ -0,0 +1,75 @@
+"""
+Warm-up run for preloading servers.
+Runs the analysis pipeline and a few cheap endpoints over a small corpus in
+the master process, so lazily built state (compiled regexes, the JSON
+provider, the URL map, analyzer code paths) exists before workers fork.
+Nothing here may start threads or processes: they would not survive fork.
+"""
+import time
+from typing import Callable, Dict
+
+from flask import Flask
+
+from lint import LintEngine
+from xref import XrefIndex
+from lexical_analyzer import LexicalAnalyzer
+from semantic_analyzer import SemanticAnalyzer
+
+WARMUP_CORPUS = [
+    '''# classes, inheritance and methods
+class Animal:
+    setup(name, age):
+        this.name = name
+        this.age = age
+    action speak():
+        print("generic " + this.name)
+
+class Dog inherits Animal:
+    setup(name):
+        parent.setup(name, 3)
+    override action speak():
+        print("woof")
+
+define add(a, b):
+    total = a + b * 2
+    for i in range(0, 10):
+        if i > 5:
+            break
+    return total
+
+d = new Dog("rex")
+d.speak()
+''',
+    '''# literals and operators
+x, y = 1, 2.5e3
+s = 'it\\'s' + "ok"
+h = 0x1F + 0b101 + 1_000
+flag = (x >= 1 && y != 2) || !true
+x += 1
+x //= 2
+try:
+    raise "bad"
+catch e:
+    print(e)
+''',
+    '''# errors
+bad = "unclosed
+weird = $ @ ~
+class :
+''',
+]
+
+
+def warm_up(app: Flask, analyze: Callable[[str], Dict]) -> float:
+    """Run the corpus through the analyzers and the app; returns the seconds spent"""
+    started = time.perf_counter()
+    for code in WARMUP_CORPUS:
+        result = analyze(code)
+        if result["tokens"]:
+            tokens, _ = LexicalAnalyzer(code).tokenize()
+            SemanticAnalyzer(tokens, xref=XrefIndex()).analyze()
+            LintEngine().run(tokens)
+    with app.test_client() as client:
+        client.get("/health")
+        client.get("/metrics")
+    return time.perf_counter() - started
@@ -1,4 +1,7 @@
-from app import app
+from app import create_app
+
+# Production entry point: gunicorn --config gunicorn.conf.py wsgi:app
+app = create_app(production=True)
 
 if __name__ == "__main__":
-    app.run()
\ No newline at end of file
+    app.run()
@@ -0,0 +1,108 @@
+"""
+Cross-reference index built by the semantic pass.
+Symbols are keyed by their scope-qualified name: 'Dog' (class),
+'Dog.bark' (method or attribute), 'add' (function), 'add.total' (local of
+add), 'Dog.bark.times' (parameter of Dog.bark), 'x' (module variable).
+Positions are (line, token index) pairs into the analyzed token list.
+
+Compact encoding returned by encode():
+    symbols      [key, ...]                         symbol id = position in this list
+    kinds        [kind, ...]                        per symbol id
+    definitions  [line, token, line, token, ...]    flat, two entries per symbol id
+    references   [[line, token, line, token, ...]]  flat list per symbol id
+    outline      [[id, [child outline...]], ...]    classes, members and functions
+"""
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional
+
+# Kinds shown in the outline (locals and parameters are left out)
+OUTLINE_KINDS = {"class", "function", "method", "attribute"}
+
+
+class XrefIndex:
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.keys: List[str] = []
+        self.kinds: List[str] = []
+        self.definitions: List[int] = []
+        self.references: List[List[int]] = []
+        self.parents: List[Optional[int]] = []
+        # Unqualified name -> symbol ids, for lookups without a scope
+        self.names: Dict[str, List[int]] = {}
+
+    def define(self, key: str, kind: str, line: int, position: int, parent: Optional[str] = None) -> int:
+        symbol_id = self.ids.get(key)
+        if symbol_id is not None:
+            return symbol_id
+        symbol_id = len(self.keys)
+        self.ids[key] = symbol_id
+        self.keys.append(key)
+        self.kinds.append(kind)
+        self.definitions.extend((line, position))
+        self.references.append([])
+        self.parents.append(self.ids.get(parent) if parent else None)
+        self.names.setdefault(key.rsplit(".", 1)[-1], []).append(symbol_id)
+        return symbol_id
+
+    def reference(self, key: str, line: int, position: int):
+        symbol_id = self.ids.get(key)
+        if symbol_id is not None:
+            self.references[symbol_id].extend((line, position))
+
+    def outline(self) -> List:
+        children: Dict[Optional[int], List] = {}
+        for symbol_id, kind in enumerate(self.kinds):
+            if kind in OUTLINE_KINDS:
+                children.setdefault(self.parents[symbol_id], []).append(symbol_id)
+
+        def build(parent: Optional[int]) -> List:
+            return [[symbol_id, build(symbol_id)] for symbol_id in children.get(parent, [])]
+        return build(None)
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        symbol_id = self.ids.get(key)
+        if symbol_id is None:
+            return None
+        return {
+            "symbol": key,
+            "kind": self.kinds[symbol_id],
+            "definition": self.definitions[2 * symbol_id:2 * symbol_id + 2],
+            "references": self.references[symbol_id]
+        }
+
+    def find(self, name: str) -> List[str]:
+        """Qualified keys of every symbol with this unqualified name"""
+        return [self.keys[symbol_id] for symbol_id in self.names.get(name, [])]
+
+    def encode(self) -> Dict:
+        return {
+            "symbols": self.keys,
+            "kinds": self.kinds,
+            "definitions": self.definitions,
+            "references": self.references,
+            "outline": self.outline()
+        }
+
+
+class XrefCache:
+    """Most recently built indexes, keyed by the digest of the analyzed code"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, XrefIndex]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, digest: str) -> Optional[XrefIndex]:
+        with self.lock:
+            index = self.entries.get(digest)
+            if index is not None:
+                self.entries.move_to_end(digest)
+            return index
+
+    def put(self, digest: str, index: XrefIndex):
+        with self.lock:
+            self.entries[digest] = index
+            self.entries.move_to_end(digest)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
@@ -5,7 +5,7 @@ import { python } from '@codemirror/lang-python';
 import { dracula } from '@uiw/codemirror-theme-dracula';
 import "bootstrap/dist/css/bootstrap.min.css";
 import './index.css';
-import ExportPDFButton from './export';
+import ExportPDFButton, { ServerExportButtons, CLIENT_PDF_MAX_TOKENS } from './export';
 
 export const BASE_URL = import.meta.env.MODE === "development" ? "http://127.0.0.1:5000/api" : "/api";
 
@@ -94,7 +94,8 @@ const App = () => {
                       "Analyze Code"
                     )}
                   </button>
-                  {tokens.length > 0 && <ExportPDFButton tokens={tokens} />}
+                  {tokens.length > 0 && tokens.length <= CLIENT_PDF_MAX_TOKENS && <ExportPDFButton tokens={tokens} />}
+                  {tokens.length > 0 && <ServerExportButtons code={code} />}
                 </div>
                 </div>
             </div>
@@ -84,4 +84,35 @@ const ExportPDFButton = ({ tokens }) => (
   </PDFDownloadLink>
 );
 
+// Larger results are rendered and streamed by the server instead of in the browser
+export const CLIENT_PDF_MAX_TOKENS = 2000;
+
+// A plain form submission lets the browser download the streamed response as it arrives
+const exportOnServer = (code, format) => {
+  const form = document.createElement('form');
+  form.method = 'POST';
+  form.action = 'http://127.0.0.1:5000/export';
+  for (const [name, value] of Object.entries({ code, format })) {
+    const input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = name;
+    input.value = value;
+    form.appendChild(input);
+  }
+  document.body.appendChild(form);
+  form.submit();
+  form.remove();
+};
+
+export const ServerExportButtons = ({ code }) => (
+  <>
+    <button className="btn btn-secondary px-4 py-2 ms-2" onClick={() => exportOnServer(code, 'csv')}>
+      Export to CSV
+    </button>
+    <button className="btn btn-secondary px-4 py-2 ms-2" onClick={() => exportOnServer(code, 'print')}>
+      Printable Report
+    </button>
+  </>
+);
+
 export default ExportPDFButton;
\ No newline at end of file